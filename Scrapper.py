@@ -1,5 +1,5 @@
-from bs4 import BeautifulSoup
-from seleniumwire import webdriver
+from seleniumwire import webdriver as wire_webdriver
+from seleniumwire.utils import decode as decode_wire_body
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -8,12 +8,13 @@ from selenium.common.exceptions import TimeoutException, ElementClickIntercepted
 import json
 from datetime import datetime, timedelta
 import time
+import heapq
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import concurrent.futures
 import os
+import re
 import random
-from fake_useragent import UserAgent
 import requests
 import threading
 import pickle
@@ -22,129 +23,73 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+from src.scraping.config import (
+    RETRY_DELAY, ERROR_RETRY_DELAY, MAX_RETRIES, DELAY_BETWEEN_REQUESTS, PROXY_BLACKLIST_DURATION,
+    PROXY_CHECK_WORKERS, PROXY_CACHE_FILE, PROXY_CACHE_TTL, PROXY_BACKOFF_BASE,
+    PROXY_DEFAULT_LATENCY, MAX_WORKERS, DRIVER_MAX_PAGES, DRIVER_MAX_AGE,
+    EXTRACTION_MODE, MAX_FLIGHT_CARDS, CAPTURE_RESULTS_XHR, RESULTS_XHR_PATTERN,
+    RESULTS_XHR_TIMEOUT, RESOURCE_BLOCKING_PROFILE, RESOURCE_BLOCKING_PROFILES, METRICS_FOLDER,
+    REPLAY_CAPTURE_FOLDER,
+    DESTINATIONS, CUSTOM_PROXIES, SELECTORS,
+    DATA_FOLDER, RESCRAPE_INTERVAL_DAYS
+)
+from src.scraping.manifest import (
+    ScrapeManifest, get_output_path, STATUS_DONE, STATUS_EMPTY, STATUS_FAILED
+)
+from src.scraping.urls import generate_dates, get_kayak_url
+from src.scraping.parsing import (
+    EXTRACT_CARDS_SCRIPT, build_flight_from_card, is_empty_flight, parse_flight_cards,
+    parse_results_payload
+)
 
-# Configuration des User Agents
-USER_AGENTS = UserAgent()
-
-# Ajouter ces constantes en haut du fichier
-RETRY_DELAY = (400, 600)  # Délai en secondes avant de réessayer en cas de captcha
-MAX_RETRIES = 3  # Nombre maximum de tentatives par URL
-DELAY_BETWEEN_REQUESTS = (25, 45)  # Dlais un peu plus longs
-MAX_CONCURRENT_SESSIONS = 3  # Augmenté de 3 à 5
-SESSION_TIMEOUT = 150  # timeout en secondes
-PROXY_BLACKLIST_DURATION = 1800  # 30 minutes en secondes
-
-
-# Ajouter en haut du fichier après les imports
-DESTINATIONS = {
-    # Europe
-    'LON': 'Londres',
-    'MAD': 'Madrid',
-    'BCN': 'Barcelone',
-    'ROM': 'Rome',
-    'AMS': 'Amsterdam',
-    'BER': 'Berlin',
-    'LIS': 'Lisbonne',
-    'DUB': 'Dublin',
-    'CPH': 'Copenhague',
-    'VIE': 'Vienne',
-    'PRG': 'Prague',
-    'BRU': 'Bruxelles',
-    'ATH': 'Athènes',
-    'WAW': 'Varsovie',
-    'BUD': 'Budapest',
-    'ZRH': 'Zurich',
-    'OSL': 'Oslo',
-    'STO': 'Stockholm',
-    'HEL': 'Helsinki',
-    'IST': 'Istanbul',
-    'MXP': 'Milan',
-    
-    # Amérique du Nord
-    'NYC': 'New York',
-    'LAX': 'Los Angeles',
-    'SFO': 'San Francisco',
-    'MIA': 'Miami',
-    'CHI': 'Chicago',
-    'YUL': 'Montréal',
-    'YYZ': 'Toronto',
-    'YVR': 'Vancouver',
-    'MEX': 'Mexico',
-    'CUN': 'Cancún',
-    
-    # Amérique du Sud
-    'GRU': 'São Paulo',
-    'EZE': 'Buenos Aires',
-    'SCL': 'Santiago',
-    'BOG': 'Bogota',
-    'LIM': 'Lima',
-    'RIO': 'Rio de Janeiro',
-    
-    # Asie
-    'DXB': 'Dubai',
-    'DOH': 'Doha',
-    'AUH': 'Abu Dhabi',
-    'SIN': 'Singapour',
-    'HKG': 'Hong Kong',
-    'BKK': 'Bangkok',
-    'KUL': 'Kuala Lumpur',
-    'NRT': 'Tokyo',
-    'ICN': 'Séoul',
-    'PEK': 'Pékin',
-    'PVG': 'Shanghai',
-    'DEL': 'New Delhi',
-    'BOM': 'Mumbai',
-    
-    # Océanie
-    'SYD': 'Sydney',
-    'MEL': 'Melbourne',
-    'AKL': 'Auckland',
-    'BNE': 'Brisbane',
-    'PER': 'Perth',
-    
-    # Afrique
-    'JNB': 'Johannesburg',
-    'CPT': 'Le Cap',
-    'CAI': 'Le Caire',
-    'CMN': 'Casablanca',
-    'DKR': 'Dakar',
-    'NBO': 'Nairobi'                                                                            
-}
-# Ajouter votre liste de proxies ici
-CUSTOM_PROXIES = [
-    "52.143.141.88:3128", 
-    "4.178.185.235:3128",
-    "20.199.91.99:3128",
-    "20.199.94.172:3128",
-    "4.251.124.194:3128",
-    "4.251.123.247:3128",
-    "4.178.175.105:3128",
-    "4.212.8.170:3128",
-    "4.251.113.113:3128",
-    "4.212.15.184:3128",
-    "4.251.116.117:3128",
-    "4.211.104.4:3128",
-    "4.211.105.36:3128",
-    "4.211.105.71:3128",
-    "4.178.189.175:3128",
-    "4.178.189.213:3128",
-    "4.178.189.160:3128",
-    "4.251.113.80:3128"
-]
-
-def verify_proxy_list():
-    print("Vérification des proxies...")
+
+# Les User Agents et le rotateur de proxies sont créés au premier scraping :
+# importer ce module ne déclenche aucun accès réseau.
+_lazy_lock = threading.Lock()
+_user_agents = None
+_proxy_rotator = None
+
+def get_user_agents():
+    """Source de User Agents, créée au premier appel"""
+    global _user_agents
+    with _lazy_lock:
+        if _user_agents is None:
+            from fake_useragent import UserAgent
+            _user_agents = UserAgent()
+        return _user_agents
+
+def verify_proxy_list(proxies=None, health_store=None, max_workers=PROXY_CHECK_WORKERS):
+    """Teste les proxies en parallèle et enregistre latence et succès de chaque test"""
+    proxies = list(CUSTOM_PROXIES if proxies is None else proxies)
+    print(f"Vérification de {len(proxies)} proxies ({max_workers} en parallèle)...")
     working_proxies = []
-    total = len(CUSTOM_PROXIES)
+    total = len(proxies)
+    if not total:
+        return working_proxies
     
-    for i, proxy in enumerate(CUSTOM_PROXIES, 1):
-        print(f"\nTest du proxy {i}/{total}")
-        if test_proxy(proxy):
-            working_proxies.append(proxy)
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+        future_to_proxy = {executor.submit(probe_proxy, proxy): proxy for proxy in proxies}
+        for future in as_completed(future_to_proxy):
+            proxy = future_to_proxy[future]
+            ok, latency = future.result()
+            if health_store is not None:
+                health_store.record_check(proxy, ok, latency)
+            if ok:
+                working_proxies.append(proxy)
     
+    # Conserver l'ordre de la liste d'origine
+    working_proxies.sort(key=proxies.index)
+    if health_store is not None:
+        health_store.save()
     print(f"\nProxies fonctionnels trouvés : {len(working_proxies)}/{total}")
     return working_proxies
 
+def probe_proxy(proxy):
+    """Teste un proxy et retourne (fonctionnel, latence en secondes)"""
+    start = time.time()
+    ok = test_proxy(proxy)
+    return ok, time.time() - start
+
 def test_proxy(proxy):
     """Teste si un proxy est fonctionnel"""
     print(f"Test du proxy : {proxy}")
@@ -165,7 +110,7 @@ def test_proxy(proxy):
             timeout=(10, 30),  # (connect timeout, read timeout)
             verify=False,
             headers={
-                'User-Agent': USER_AGENTS.random,
+                'User-Agent': get_user_agents().random,
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
                 'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
                 'Connection': 'keep-alive'
@@ -196,71 +141,230 @@ def test_proxy(proxy):
         if 'session' in locals():
             session.close()
 
-def cache_proxies(proxies):
-    with open('proxy_cache.pkl', 'wb') as f:
+def cache_proxies(proxies, health=None):
+    with open(PROXY_CACHE_FILE, 'wb') as f:
         pickle.dump({
             'timestamp': datetime.now(),
-            'proxies': proxies
+            'proxies': proxies,
+            'health': health or {}
         }, f)
 
-def get_cached_proxies():
+def load_proxy_cache():
+    """Charge le cache brut des proxies, quel que soit son âge"""
     try:
-        with open('proxy_cache.pkl', 'rb') as f:
-            data = pickle.load(f)
-            if datetime.now() - data['timestamp'] < timedelta(hours=1):
-                return data['proxies']
+        with open(PROXY_CACHE_FILE, 'rb') as f:
+            return pickle.load(f)
     except:
-        pass
+        return None
+
+def get_cached_proxies():
+    data = load_proxy_cache()
+    if data and datetime.now() - data['timestamp'] < PROXY_CACHE_TTL:
+        return data['proxies']
     return None
 
-class ProxyRotator:
+class ProxyHealthStore:
+    """Historique de santé des proxies (latence, taux de succès), persisté dans PROXY_CACHE_FILE"""
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self.health = {}
+        self.timestamp = None
+
+    def load(self):
+        data = load_proxy_cache()
+        if data:
+            with self.lock:
+                self.health = data.get('health', {})
+                self.timestamp = data['timestamp']
+        return self
+
+    def _entry(self, proxy):
+        return self.health.setdefault(proxy, {
+            'checks': 0,
+            'successes': 0,
+            'latency': None,
+            'last_check': None,
+            'last_ok': False
+        })
+
+    def record_check(self, proxy, ok, latency):
+        with self.lock:
+            entry = self._entry(proxy)
+            entry['checks'] += 1
+            entry['last_check'] = datetime.now()
+            entry['last_ok'] = ok
+            if ok:
+                entry['successes'] += 1
+                # Moyenne mobile exponentielle de la latence
+                if entry['latency'] is None:
+                    entry['latency'] = latency
+                else:
+                    entry['latency'] = 0.7 * entry['latency'] + 0.3 * latency
+
+    def success_rate(self, proxy):
+        with self.lock:
+            entry = self.health.get(proxy)
+            if not entry or not entry['checks']:
+                return None
+            return entry['successes'] / entry['checks']
+
+    def healthy_proxies(self, candidates):
+        """Proxies dont le dernier test en cache a réussi, triés par latence"""
+        with self.lock:
+            healthy = [p for p in candidates if self.health.get(p, {}).get('last_ok')]
+            return sorted(healthy, key=lambda p: self.health[p]['latency'] or float('inf'))
+
+    def is_fresh(self):
+        return self.timestamp is not None and datetime.now() - self.timestamp < PROXY_CACHE_TTL
+
+    def save(self):
+        with self.lock:
+            health = {proxy: dict(entry) for proxy, entry in self.health.items()}
+            working = [proxy for proxy, entry in health.items() if entry['last_ok']]
+            self.timestamp = datetime.now()
+        cache_proxies(working, health)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                proxy: {
+                    'latency': round(entry['latency'], 3) if entry['latency'] is not None else None,
+                    'success_rate': round(entry['successes'] / entry['checks'], 3) if entry['checks'] else None,
+                    'checks': entry['checks'],
+                    'last_ok': entry['last_ok'],
+                }
+                for proxy, entry in self.health.items()
+            }
+
+class ProxyRotator:
+    def __init__(self, background_refresh=True):
         self.proxies = []
         self.current_index = 0
         self.lock = threading.Lock()
         self.last_refresh = datetime.now()
         self.refresh_interval = timedelta(minutes=30)
-        self.blacklist = {}
+        self.stats = {}
+        self.health = ProxyHealthStore().load()
+        self.stop_event = threading.Event()
+        
+        # Démarrer depuis le cache de santé, sans bloquer sur un test réseau
+        cached = self.health.healthy_proxies(CUSTOM_PROXIES)
+        if cached:
+            print(f"{len(cached)} proxies repris du cache de santé")
+            self.proxies = cached
+            if not self.health.is_fresh():
+                self.last_refresh = datetime.min
+        else:
+            # Pas de cache exploitable : vérification immédiate (en parallèle)
+            self.proxies = verify_proxy_list(health_store=self.health)
+            self.last_refresh = datetime.now()
         
-        # Initialisation immédiate des proxies
-        working_proxies = verify_proxy_list()
-        self.proxies = working_proxies
+        if background_refresh:
+            self.refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self.refresh_thread.start()
     
-    def blacklist_proxy(self, proxy):
-        """Ajoute un proxy à la liste noire temporairement"""
+    def refresh(self):
+        """Re-teste tous les proxies et met à jour la liste active"""
+        working = verify_proxy_list(health_store=self.health)
         with self.lock:
-            print(f"Ajout du proxy {proxy} à la liste noire")
-            self.blacklist[proxy] = datetime.now()
-            if proxy in self.proxies:
-                self.proxies.remove(proxy)
-                print(f"Proxy {proxy} retiré de la liste des proxies actifs")
+            self.proxies = working
+            self.last_refresh = datetime.now()
+        print(f"Liste des proxies rafraîchie : {len(self.proxies)} actifs")
+        self.print_scores()
+    
+    def _refresh_loop(self):
+        """Re-teste les proxies en arrière-plan toutes les refresh_interval"""
+        while not self.stop_event.is_set():
+            if datetime.now() - self.last_refresh >= self.refresh_interval:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Erreur lors du rafraîchissement des proxies: {str(e)}")
+                    self.last_refresh = datetime.now()
+            self.stop_event.wait(30)
+    
+    def stop(self):
+        self.stop_event.set()
     
-    def get_next_proxy(self):
-        """Retourne uniquement un proxy fonctionnel"""
+    def _stats(self, proxy):
+        return self.stats.setdefault(proxy, {
+            'pages': 0,
+            'captchas': 0,
+            'failures': 0,
+            'cards': 0,
+            'reward': 0.0,
+            'latency': None,
+            'consecutive_failures': 0,
+            'backoff_until': None
+        })
+    
+    def record_result(self, proxy, latency=None, cards=0, captcha=False, failed=False):
+        """Enregistre le résultat d'une page servie par un proxy.
+
+        La récompense d'une page est la part de cartes extraites (0 sur captcha
+        ou échec). Chaque échec consécutif double la mise à l'écart du proxy.
+        """
+        if not proxy:
+            return
+        with self.lock:
+            stats = self._stats(proxy)
+            stats['pages'] += 1
+            if latency is not None:
+                if stats['latency'] is None:
+                    stats['latency'] = latency
+                else:
+                    stats['latency'] = 0.7 * stats['latency'] + 0.3 * latency
+            
+            if captcha or failed:
+                stats['captchas'] += 1 if captcha else 0
+                stats['failures'] += 1 if failed else 0
+                stats['consecutive_failures'] += 1
+                backoff = min(PROXY_BACKOFF_BASE * 2 ** (stats['consecutive_failures'] - 1),
+                              PROXY_BLACKLIST_DURATION)
+                stats['backoff_until'] = datetime.now() + timedelta(seconds=backoff)
+                print(f"Proxy {proxy} mis à l'écart {backoff:.0f}s "
+                      f"({stats['consecutive_failures']} échecs consécutifs)")
+            else:
+                stats['cards'] += cards
+                stats['reward'] += min(cards / MAX_FLIGHT_CARDS, 1.0)
+                stats['consecutive_failures'] = 0
+                stats['backoff_until'] = None
+    
+    def blacklist_proxy(self, proxy):
+        """Met un proxy à l'écart, avec un délai qui double à chaque échec consécutif"""
+        print(f"Ajout du proxy {proxy} à la liste noire")
+        self.record_result(proxy, failed=True)
+    
+    def _in_backoff(self, proxy, now):
+        until = self.stats.get(proxy, {}).get('backoff_until')
+        return until is not None and until > now
+    
+    def _sample_score(self, proxy, in_use):
+        """Échantillonnage de Thompson : débit utile espéré du proxy"""
+        stats = self._stats(proxy)
+        success = random.betavariate(1 + stats['reward'], 1 + stats['pages'] - stats['reward'])
+        latency = stats['latency'] or PROXY_DEFAULT_LATENCY
+        return success / max(latency, 1.0) / (1 + in_use)
+    
+    def get_next_proxy(self, in_use=None):
+        """Choisit un proxy fonctionnel selon son débit utile observé.
+
+        `in_use` compte les drivers déjà ouverts par proxy, pour répartir la charge.
+        """
+        in_use = in_use or {}
         try:
             with self.lock:
                 print("Obtention du prochain proxy...")
                 
-                # Nettoyer la liste noire des proxies expirés
-                current_time = datetime.now()
-                expired_proxies = [
-                    proxy for proxy, blacklist_time in self.blacklist.items()
-                    if (current_time - blacklist_time).total_seconds() > PROXY_BLACKLIST_DURATION
-                ]
+                now = datetime.now()
+                candidates = [p for p in self.proxies if not self._in_backoff(p, now)]
                 
-                # Réactiver les proxies expirés
-                for proxy in expired_proxies:
-                    if proxy not in self.proxies:
-                        self.proxies.append(proxy)
-                    del self.blacklist[proxy]
-                
-                if not self.proxies:
+                if not candidates:
                     print("Aucun proxy disponible!")
                     return None
                 
-                # Sélection simple du prochain proxy
-                proxy = self.proxies[self.current_index % len(self.proxies)]
-                self.current_index = (self.current_index + 1) % len(self.proxies)
+                proxy = max(candidates, key=lambda p: self._sample_score(p, in_use.get(p, 0)))
                 
                 print(f"Proxy sélectionné : {proxy}")
                 return proxy
@@ -268,12 +372,59 @@ class ProxyRotator:
         except Exception as e:
             print(f"Erreur dans get_next_proxy: {str(e)}")
             return None
+    
+    def get_scores(self):
+        """Scores courants des proxies, du plus au moins productif"""
+        with self.lock:
+            now = datetime.now()
+            scores = []
+            for proxy in set(self.proxies) | set(self.stats):
+                stats = self._stats(proxy)
+                success = (1 + stats['reward']) / (2 + stats['pages'])
+                latency = stats['latency'] or PROXY_DEFAULT_LATENCY
+                until = stats['backoff_until']
+                scores.append({
+                    'proxy': proxy,
+                    'active': proxy in self.proxies,
+                    'pages': stats['pages'],
+                    'cards': stats['cards'],
+                    'cards_per_page': round(stats['cards'] / stats['pages'], 2) if stats['pages'] else 0,
+                    'captcha_rate': round(stats['captchas'] / stats['pages'], 3) if stats['pages'] else 0,
+                    'latency': round(stats['latency'], 2) if stats['latency'] is not None else None,
+                    'score': round(success / max(latency, 1.0), 4),
+                    'backoff_seconds': round((until - now).total_seconds()) if until and until > now else 0
+                })
+        return sorted(scores, key=lambda x: x['score'], reverse=True)
+    
+    def print_scores(self):
+        print("\n=== Scores des proxies ===")
+        for s in self.get_scores():
+            print(f"{s['proxy']}: score={s['score']} pages={s['pages']} cartes/page={s['cards_per_page']} "
+                  f"captchas={s['captcha_rate']:.0%} latence={s['latency']}s "
+                  f"{'(en pause ' + str(s['backoff_seconds']) + 's)' if s['backoff_seconds'] else ''}")
 
-# Initialisation du rotateur de proxies
-proxy_rotator = ProxyRotator()
+def get_proxy_rotator():
+    """Rotateur de proxies partagé, créé (et les proxies vérifiés) au premier appel"""
+    global _proxy_rotator
+    with _lazy_lock:
+        if _proxy_rotator is None:
+            _proxy_rotator = ProxyRotator()
+        return _proxy_rotator
 
-@contextmanager
-def create_driver():
+# Verrou pour n'installer ChromeDriver qu'une seule fois par exécution
+_chromedriver_lock = threading.Lock()
+_chromedriver_path = None
+
+def get_chromedriver_path():
+    """Installe ChromeDriver une seule fois et retourne son chemin"""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            _chromedriver_path = ChromeDriverManager().install()
+        return _chromedriver_path
+
+def build_driver(proxy):
+    """Crée un driver Chrome configuré pour le proxy donné"""
     driver = None
     try:
         print("Initialisation du driver Chrome...")
@@ -296,30 +447,43 @@ def create_driver():
         options.add_argument('--disable-gpu')
         options.add_argument('--disable-extensions')
         options.add_argument('--start-minimized') 
-
-
         
         # Appliquer les headers fixes
         options.add_argument(f'user-agent={headers["User-Agent"]}')
         options.add_argument(f'--accept-language={headers["Accept-Language"]}')
         
-        # Obtention du proxy uniquement
-        proxy = proxy_rotator.get_next_proxy()
-        
-        if not proxy:
-            raise RuntimeError("Impossible d'obtenir un proxy valide")
-
-        # Configuration du proxy
-        options.add_argument(f'--proxy-server={proxy}')
+        # Configuration du proxy : avec selenium-wire, Chrome passe par le proxy
+        # local de selenium-wire, qui relaie vers le proxy choisi
+        wire_options = None
+        if CAPTURE_RESULTS_XHR:
+            wire_options = {
+                'proxy': {
+                    'http': f'http://{proxy}',
+                    'https': f'http://{proxy}',
+                    'no_proxy': 'localhost,127.0.0.1'
+                }
+            }
+        else:
+            options.add_argument(f'--proxy-server={proxy}')
         
         # Désactiver la détection de l'automatisation
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         
+        # Profil de blocage des ressources (images, polices, trackers)
+        blocking = RESOURCE_BLOCKING_PROFILES[RESOURCE_BLOCKING_PROFILE]
+        if blocking['block_images']:
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        
         print(f"Configuration du proxy : {proxy}")
 
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        service = Service(get_chromedriver_path())
+        if wire_options:
+            driver = wire_webdriver.Chrome(service=service, options=options, seleniumwire_options=wire_options)
+            # Ne conserver que les réponses de recherche : les autres requêtes transitent sans être stockées
+            driver.scopes = [RESULTS_XHR_PATTERN]
+        else:
+            driver = webdriver.Chrome(service=service, options=options)
         
         # Appliquer les headers via CDP
         driver.execute_cdp_cmd('Network.setUserAgentOverride', {
@@ -329,12 +493,17 @@ def create_driver():
         
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
+        if blocking['blocked_urls']:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocking['blocked_urls']})
+            print(f"Profil de blocage '{RESOURCE_BLOCKING_PROFILE}' : {len(blocking['blocked_urls'])} motifs bloqués")
+        
         # Configuration des timeouts
         driver.set_page_load_timeout(30)
         driver.set_script_timeout(30)
         
         print("Driver créé avec succès.")
-        yield driver
+        return driver
 
     except Exception as e:
         print(f"Erreur détaillée lors de la création du driver : {str(e)}")
@@ -344,6 +513,20 @@ def create_driver():
             except:
                 pass
         raise
+
+@contextmanager
+def create_driver():
+    """Crée un driver Chrome jetable sur le prochain proxy disponible"""
+    driver = None
+    try:
+        # Obtention du proxy uniquement
+        proxy = get_proxy_rotator().get_next_proxy()
+        
+        if not proxy:
+            raise RuntimeError("Impossible d'obtenir un proxy valide")
+
+        driver = build_driver(proxy)
+        yield driver
     finally:
         if driver:
             try:
@@ -351,6 +534,194 @@ def create_driver():
             except:
                 pass
 
+class PooledDriver:
+    """Session Chrome réutilisable, liée à un proxy unique"""
+    _next_id = 1
+    _id_lock = threading.Lock()
+
+    def __init__(self, driver, proxy):
+        with PooledDriver._id_lock:
+            self.id = PooledDriver._next_id
+            PooledDriver._next_id += 1
+        self.driver = driver
+        self.proxy = proxy
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.pages_served = 0
+        self.captchas = 0
+        self.errors = 0
+        self.needs_recycle = False
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+    def mark_page_served(self):
+        self.pages_served += 1
+        self.last_used = time.time()
+
+    def mark_captcha(self):
+        """Un captcha rend la session inutilisable : elle sera recyclée"""
+        self.captchas += 1
+        self.needs_recycle = True
+
+    def mark_error(self):
+        self.errors += 1
+        self.needs_recycle = True
+
+    def is_expired(self, max_pages, max_age):
+        return self.pages_served >= max_pages or self.age >= max_age
+
+    def is_alive(self):
+        """Vérifie que le navigateur répond encore"""
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except:
+            pass
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'proxy': self.proxy,
+            'pages_served': self.pages_served,
+            'captchas': self.captchas,
+            'errors': self.errors,
+            'age_seconds': round(self.age, 1),
+        }
+
+class DriverPool:
+    """Pool borné de drivers Chrome réutilisés d'une URL à l'autre.
+
+    Chaque driver est lié au proxy avec lequel il a été lancé. Il est recyclé
+    après `max_pages` pages, après `max_age` secondes, sur captcha ou s'il ne
+    répond plus.
+    """
+
+    def __init__(self, size=MAX_WORKERS, max_pages=DRIVER_MAX_PAGES, max_age=DRIVER_MAX_AGE):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = []
+        self.active = {}
+        self.retired = []
+        self.closed = False
+
+    def _retire(self, pooled, reason):
+        print(f"Recyclage du driver #{pooled.id} ({reason}) : "
+              f"{pooled.pages_served} pages servies en {pooled.age:.0f}s")
+        pooled.quit()
+        with self.lock:
+            self.retired.append(dict(pooled.to_dict(), reason=reason))
+
+    def acquire(self):
+        """Retourne un driver sain, en réutilisant une session inactive si possible"""
+        self.slots.acquire()
+        try:
+            while True:
+                with self.lock:
+                    if self.closed:
+                        raise RuntimeError("Le pool de drivers est fermé")
+                    pooled = self.idle.pop() if self.idle else None
+                if pooled is None:
+                    break
+                if pooled.is_expired(self.max_pages, self.max_age):
+                    self._retire(pooled, 'expiré')
+                elif not pooled.is_alive():
+                    self._retire(pooled, 'ne répond plus')
+                else:
+                    with self.lock:
+                        self.active[pooled.id] = pooled
+                    return pooled
+
+            proxy = get_proxy_rotator().get_next_proxy(in_use=self.proxies_in_use())
+            if not proxy:
+                raise RuntimeError("Impossible d'obtenir un proxy valide")
+            pooled = PooledDriver(build_driver(proxy), proxy)
+            with self.lock:
+                self.active[pooled.id] = pooled
+            return pooled
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, pooled, recycle=False):
+        """Rend un driver au pool, ou le ferme s'il doit être recyclé"""
+        try:
+            with self.lock:
+                self.active.pop(pooled.id, None)
+                closed = self.closed
+            if recycle or pooled.needs_recycle:
+                self._retire(pooled, 'captcha' if pooled.captchas else 'erreur')
+            elif closed or pooled.is_expired(self.max_pages, self.max_age):
+                self._retire(pooled, 'expiré' if not closed else 'fermeture')
+            else:
+                with self.lock:
+                    self.idle.append(pooled)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def session(self):
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception:
+            pooled.mark_error()
+            raise
+        finally:
+            self.release(pooled)
+
+    def proxies_in_use(self):
+        """Nombre de drivers ouverts par proxy"""
+        with self.lock:
+            in_use = {}
+            for pooled in list(self.active.values()) + self.idle:
+                in_use[pooled.proxy] = in_use.get(pooled.proxy, 0) + 1
+            return in_use
+
+    def metrics(self):
+        """Métriques par driver : pages servies, âge, captchas"""
+        with self.lock:
+            live = [dict(p.to_dict(), state='actif') for p in self.active.values()]
+            live += [dict(p.to_dict(), state='inactif') for p in self.idle]
+            retired = list(self.retired)
+        pages = sum(d['pages_served'] for d in live + retired)
+        return {
+            'drivers_started': len(live) + len(retired),
+            'pages_served': pages,
+            'pages_per_driver': round(pages / max(len(live) + len(retired), 1), 2),
+            'live': live,
+            'retired': retired,
+        }
+
+    def print_metrics(self):
+        metrics = self.metrics()
+        print(f"\n=== Pool de drivers : {metrics['drivers_started']} drivers lancés, "
+              f"{metrics['pages_served']} pages servies "
+              f"({metrics['pages_per_driver']} pages/driver) ===")
+        for d in metrics['live'] + metrics['retired']:
+            print(f"Driver #{d['id']} [{d.get('state', d.get('reason'))}] proxy={d['proxy']} "
+                  f"pages={d['pages_served']} captchas={d['captchas']} âge={d['age_seconds']}s")
+
+    def close_all(self):
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for pooled in idle:
+            self._retire(pooled, 'fermeture')
+
+# Initialisation du pool de drivers
+driver_pool = DriverPool()
+
 def add_random_delays():
     """Ajoute des délais aléatoires pour simuler un comportement humain"""
     time.sleep(random.uniform(2, 5))
@@ -368,24 +739,6 @@ def simulate_human_behavior(driver):
         print(f"Erreur dans simulate_human_behavior: {str(e)}")
         pass
 
-# Définir les sélecteurs en haut du fichier
-SELECTORS = {
-    # Mise à jour des sélecteurs existants et ajout de nouveaux
-    'flight_card': "//div[contains(@class, 'nrc6')]",
-    'times': ".//div[contains(@class, 'vmXl-mod-variant-large')]",
-    'duration': ".//div[contains(@class, 'xdW8')]//div[contains(@class, 'vmXl')]",
-    'price': ".//div[contains(@class, 'f8F1-price-text')]",
-    'fare_class': "//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'M_JD-large-display')]//div[contains(@class, 'DOum-name')]",
-    'hand_baggage': ".//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[1]//div[2]",
-    'checked_baggage': ".//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[2]//div[2]",
-    'airlines': ".//div[contains(@class, 'c5iUd-leg-carrier')]//img",
-    'layover': ".//div[contains(@class, 'JWEO-stops-text')]",
-    'layover_info': """
-        return document.querySelector("#listWrapper > div > div:nth-child(3) > div.Fxw9 > div:nth-child(" + arguments[0] + ") > div > div > div > div.nrc6-content-section > div.nrc6-main > div > ol > li > div > div > div.JWEO > div.c_cgF.c_cgF-mod-variant-full-airport > span > span")?.textContent || 'N/A';
-    """,
-    'airports': ".//span[contains(@class, 'jLhY-airport-info')]/span[1]",
-}
-
 def handle_cookie_popup(driver, wait):
     try:
         # Attendre que le bouton "Tout refuser" apparaisse et cliquer dessus
@@ -398,400 +751,258 @@ def handle_cookie_popup(driver, wait):
     except Exception as e:
         print(f"Erreur lors de la gestion du popup des cookies : {str(e)}")
 
+def extract_flights_js(driver, limit=MAX_FLIGHT_CARDS):
+    """Extrait toutes les cartes de vol en un seul appel execute_script.
+
+    Retourne None si l'extraction échoue, pour laisser la place au mode BeautifulSoup.
+    """
+    try:
+        cards = json.loads(driver.execute_script(EXTRACT_CARDS_SCRIPT, limit))
+    except Exception as e:
+        print(f"Erreur lors de l'extraction JavaScript des cartes : {str(e)}")
+        return None
+
+    print(f"Nombre de cartes de vol extraites en une passe : {len(cards)}")
+    flights = []
+    for index, card in enumerate(cards):
+        try:
+            flight = build_flight_from_card(card)
+        except Exception as e:
+            print(f"Erreur lors de l'extraction du vol {index + 1}: {str(e)}")
+            continue
+        if not is_empty_flight(flight):
+            flights.append(flight)
+    return flights
+
+def extract_flights_soup(driver):
+    """Extraction BeautifulSoup sur le HTML de la page (mode de secours)"""
+    flights = parse_flight_cards(driver.page_source)
+    print(f"Nombre de vols extraits avec BeautifulSoup : {len(flights)}")
+    return flights
+
+def save_replay_page(driver, url, folder=REPLAY_CAPTURE_FOLDER):
+    """Sauvegarde le HTML de la page de résultats pour le banc de rejeu hors navigateur"""
+    if not folder:
+        return None
+    try:
+        os.makedirs(folder, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9-]+', '_', url.split('/flights/')[-1]).strip('_')
+        file_path = os.path.join(folder, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(driver.page_source)
+        return file_path
+    except Exception as e:
+        print(f"Erreur lors de la sauvegarde de la page de rejeu : {str(e)}")
+        return None
+
+def read_results_payloads(driver):
+    """Décode les réponses JSON de recherche capturées par selenium-wire, de la plus récente à la plus ancienne"""
+    payloads = []
+    for request in reversed(driver.requests):
+        response = request.response
+        if not response or response.status_code != 200 or not response.body:
+            continue
+        try:
+            body = decode_wire_body(response.body, response.headers.get('Content-Encoding', 'identity'))
+            payloads.append(json.loads(body.decode('utf-8')))
+        except Exception as e:
+            print(f"Réponse XHR illisible ({request.url}): {str(e)}")
+    return payloads
+
+def extract_flights_xhr(driver, timeout=RESULTS_XHR_TIMEOUT):
+    """Extrait les vols de la réponse XHR de recherche, ou None si elle n'est pas disponible.
+
+    Kayak interroge le endpoint de recherche jusqu'à ce que son statut soit
+    'complete' ; on attend cette réponse au plus `timeout` secondes.
+    """
+    deadline = time.time() + timeout
+    payload = None
+    while time.time() < deadline:
+        payloads = read_results_payloads(driver)
+        complete = [p for p in payloads if p.get('status') == 'complete' and p.get('results')]
+        if complete:
+            payload = complete[0]
+            break
+        if payloads and any(p.get('results') for p in payloads):
+            payload = next(p for p in payloads if p.get('results'))
+        time.sleep(0.5)
+
+    if not payload:
+        print("Aucune réponse XHR de recherche exploitable, extraction depuis la page")
+        return None
+    try:
+        return parse_results_payload(payload)
+    except Exception as e:
+        print(f"Erreur lors de l'analyse de la réponse XHR : {str(e)}")
+        return None
+
+class CaptchaDetected(Exception):
+    """Levée quand Kayak sert un captcha : le job doit être replanifié, sur un autre proxy"""
+
+    def __init__(self, proxy):
+        super().__init__(f"Captcha détecté via le proxy {proxy}")
+        self.proxy = proxy
+
 def scrape_kayak_flights(url):
-    max_attempts = MAX_RETRIES
-    attempt = 0
-    current_proxy = None
+    """Une tentative de scraping d'une URL, sans attente ni nouvelle tentative.
+
+    Lève CaptchaDetected sur captcha ; les autres erreurs remontent telles quelles.
+    Les nouvelles tentatives sont replanifiées par le scheduler (voir process_job).
+    """
+    print(f"\nScraping de {url}")
     
-    while attempt < max_attempts:
-        try:
-            print(f"\nTentative de scraping #{attempt + 1} pour {url}")
-            
-            if attempt > 0:
-                delay = random.uniform(*RETRY_DELAY)
-                print(f"Attente de {delay:.2f} secondes avant la nouvelle tentative...")
-                time.sleep(delay)
-            
-            # Obtenir le proxy avant de créer le driver
-            # Modification ici : on ne décompresse plus qu'une seule valeur
-            current_proxy = proxy_rotator.get_next_proxy()
-            
-            if not current_proxy:
-                print("Impossible d'obtenir un proxy valide")
-                attempt += 1
-                continue
-            
-            with create_driver() as driver:
-                print("Driver créé, accès à l'URL...")
-                driver.set_page_load_timeout(30)
+    # Réutiliser un driver du pool, lié à son propre proxy
+    with driver_pool.session() as session:
+        driver = session.driver
+        current_proxy = session.proxy
+        print(f"Driver #{session.id} obtenu ({session.pages_served} pages servies), accès à l'URL...")
+        driver.set_page_load_timeout(30)
                 
-                try:
-                    driver.get(url)
-                    print("Page chargée avec succès")
-                except Exception as e:
-                    print(f"Erreur lors du chargement de la page: {str(e)}")
-                    if "captcha" in str(e).lower() or "timeout" in str(e).lower():
-                        if current_proxy:
-                            proxy_rotator.blacklist_proxy(current_proxy)
-                        print("Captcha ou timeout détecté, changement de proxy...")
-                        attempt += 1
-                        continue
-                    raise
-
-                # Vérification de la présence de captcha dans le contenu
-                if "captcha" in driver.page_source.lower() or "verify you're a human" in driver.page_source.lower():
-                    if current_proxy:
-                        proxy_rotator.blacklist_proxy(current_proxy)
-                    print("Captcha détecté dans le contenu, changement de proxy...")
-                    attempt += 1
-                    continue
-
-                # Ajouter des comportements humains aléatoires
-                simulate_human_behavior(driver)
+        # Respecter le débit maximal du proxy plutôt qu'un sleep par thread
+        proxy_limiter.wait(current_proxy)
+        
+        # Le driver est réutilisé : oublier les réponses capturées sur la page précédente
+        if CAPTURE_RESULTS_XHR:
+            del driver.requests
                 
-                # Créer un wait plus long pour les éléments critiques
-                wait = WebDriverWait(driver, 15)
-                short_wait = WebDriverWait(driver, 10)
+        try:
+            load_start = time.time()
+            driver.get(url)
+            load_time = time.time() - load_start
+            session.mark_page_served()
+            print("Page chargée avec succès")
+        except Exception as e:
+            print(f"Erreur lors du chargement de la page: {str(e)}")
+            if "captcha" in str(e).lower():
+                session.mark_captcha()
+                get_proxy_rotator().record_result(current_proxy, captcha=True)
+                raise CaptchaDetected(current_proxy) from e
+            if "timeout" in str(e).lower():
+                session.mark_error()
+                get_proxy_rotator().record_result(current_proxy, failed=True)
+            raise
 
-                # Gérer le popup des cookies
-                handle_cookie_popup(driver, wait)
-                time.sleep(2)  # Attendre après la gestion des cookies
+        page_metrics.record(current_proxy, load_time, collect_page_metrics(driver))
 
-                # Vérifier si un captcha est présent
-                try:
-                    captcha_present = driver.find_element(By.CLASS_NAME, "WZTU-wrap")
-                    if captcha_present:
-                        print("Captcha détecté, changement de session...")
-                        time.sleep(random.uniform(30, 60))
-                        return scrape_kayak_flights(url)
-                except:
-                    pass
-
-                # Attendre que les éléments principaux soient chargés avec des conditions explicites
-                try:
-                    wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "nrc6")))
-                    wait.until(lambda driver: len(driver.find_elements(By.CLASS_NAME, "nrc6")) > 0)
-                    wait.until(lambda driver: driver.find_element(By.CLASS_NAME, "nrc6").is_displayed())
+        # Vérification de la présence de captcha dans le contenu
+        if "captcha" in driver.page_source.lower() or "verify you're a human" in driver.page_source.lower():
+            session.mark_captcha()
+            get_proxy_rotator().record_result(current_proxy, load_time, captcha=True)
+            print("Captcha détecté dans le contenu, changement de proxy...")
+            raise CaptchaDetected(current_proxy)
+
+        # Voie rapide : les vols sont lus directement dans la réponse XHR de recherche,
+        # sans popup de cookies, délais de simulation ni parsing du DOM
+        if CAPTURE_RESULTS_XHR:
+            flights = extract_flights_xhr(driver)
+            if flights:
+                print(f"\nNombre total de vols extraits (XHR) : {len(flights)}")
+                get_proxy_rotator().record_result(current_proxy, load_time, cards=len(flights))
+                return {
+                    "flights": flights,
+                    "headers_used": {'User-Agent': 'Chrome/133.0.0.0', 'Accept-Language': 'fr-FR'},
+                    "proxy_used": current_proxy,
+                    "source": "xhr"
+                }
+
+        # Ajouter des comportements humains aléatoires
+        simulate_human_behavior(driver)
+                
+        # Créer un wait plus long pour les éléments critiques
+        wait = WebDriverWait(driver, 15)
+        short_wait = WebDriverWait(driver, 10)
+
+        # Gérer le popup des cookies
+        handle_cookie_popup(driver, wait)
+        time.sleep(2)  # Attendre après la gestion des cookies
+
+        # Vérifier si un captcha est présent
+        captcha_present = driver.find_elements(By.CLASS_NAME, "WZTU-wrap")
+        if captcha_present:
+            print("Captcha détecté, changement de session...")
+            session.mark_captcha()
+            get_proxy_rotator().record_result(current_proxy, load_time, captcha=True)
+            raise CaptchaDetected(current_proxy)
+
+        # Attendre que les éléments principaux soient chargés avec des conditions explicites
+        try:
+            wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "nrc6")))
+            wait.until(lambda driver: len(driver.find_elements(By.CLASS_NAME, "nrc6")) > 0)
+            wait.until(lambda driver: driver.find_element(By.CLASS_NAME, "nrc6").is_displayed())
                     
-                    # Attendre spécifiquement que les horaires soient chargés
-                    wait.until(EC.presence_of_element_located((By.XPATH, SELECTORS['times'])))
-                    wait.until(lambda driver: driver.find_element(By.XPATH, SELECTORS['times']).text != '')
-                except TimeoutException as e:
-                    print(f"Timeout lors du chargement des éléments principaux : {str(e)}")
-                    return None
+            # Attendre spécifiquement que les horaires soient chargés
+            wait.until(EC.presence_of_element_located((By.XPATH, SELECTORS['times'])))
+            wait.until(lambda driver: driver.find_element(By.XPATH, SELECTORS['times']).text != '')
+        except TimeoutException as e:
+            print(f"Timeout lors du chargement des éléments principaux : {str(e)}")
+            get_proxy_rotator().record_result(current_proxy, load_time, cards=0)
+            return None
 
-                # Faire défiler la page avant de chercher le bouton
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight * 0.7);")
-                time.sleep(2)
+        # Faire défiler la page avant de chercher le bouton
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight * 0.7);")
+        time.sleep(2)
 
-                # Cliquer sur "Plus de résultats" avec une attente conditionnelle
-                try:
-                    # Attendre que les résultats initiaux soient chargés
-                    wait.until(EC.presence_of_element_located((By.CLASS_NAME, "ULvh")))
-                    time.sleep(2)  # Petit délai pour s'assurer que tout est chargé
+        # Cliquer sur "Plus de résultats" avec une attente conditionnelle
+        try:
+            # Attendre que les résultats initiaux soient chargés
+            wait.until(EC.presence_of_element_located((By.CLASS_NAME, "ULvh")))
+            time.sleep(2)  # Petit délai pour s'assurer que tout est chargé
                     
-                    # Utiliser le sélecteur JavaScript exact
-                    more_results_button = driver.execute_script(
-                        'return document.querySelector("#listWrapper > div > div.ULvh > div")'
-                    )
+            # Utiliser le sélecteur JavaScript exact
+            more_results_button = driver.execute_script(
+                'return document.querySelector("#listWrapper > div > div.ULvh > div")'
+            )
                     
-                    if more_results_button:
-                        print("Bouton 'Plus de résultats' trouvé")
-                        
-                        # Faire défiler jusqu'au bouton
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", more_results_button)
-                        time.sleep(2)
-                        
-                        # Tenter le clic avec JavaScript
-                        driver.execute_script("arguments[0].click();", more_results_button)
-                        print("Clic sur 'Plus de résultats' effectué")
-                        
-                        # Attendre que les nouveaux résultats soient chargés
-                        time.sleep(3)
-                        wait.until(lambda driver: len(driver.find_elements(By.CLASS_NAME, "nrc6")) > 0)
-                    else:
-                        print("Bouton 'Plus de résultats' non trouvé")
+            if more_results_button:
+                print("Bouton 'Plus de résultats' trouvé")
                         
-                except Exception as e:
-                    print(f"Erreur lors du clic sur 'Plus de résultats': {str(e)}")
-
-                # Attendre un peu plus longtemps pour s'assurer que tout est chargé
+                # Faire défiler jusqu'au bouton
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", more_results_button)
                 time.sleep(2)
-
-                print("Analyse du contenu de la page...")
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                flights = []
-                
-                # Limiter à 20 résultats
-                flight_cards = soup.find_all('div', {'class': 'nrc6'})[:25]
-                print(f"Nombre de cartes de vol à analyser : {len(flight_cards)}")
-                
-                # Récupérer les headers actuels
-                headers = {
-                    'User-Agent': 'Chrome/133.0.0.0',
-                    'Accept-Language': 'fr-FR',
-                    'Referer': 'https://www.google.com',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'same-origin',
-                    'Sec-Fetch-User': '?1'
-                }
-                
-                for index, card in enumerate(flight_cards):
-                    try:
-                        print(f"\nAnalyse du vol {index + 1}...")
-                        
-                        # Extraction des horaires et détection des escales
-                        times = card.find_all('div', {'class': 'vmXl'})
-                        departure_time = times[0].text if times else "N/A"
-                        
-                        # Vérification si c'est un vol avec escale
-                        is_direct = "escale" not in (times[1].text if len(times) > 1 else "")
-                        
-                        # Si c'est un vol avec escale, chercher l'heure d'arrivée réelle
-                        if not is_direct:
-                            try:
-                                arrival_time = driver.find_element(
-                                    By.XPATH, 
-                                    f"(//div[contains(@class, 'nrc6')])[{index + 1}]//div[contains(@class, 'vmXl')][last()]"
-                                ).text
-                            except:
-                                arrival_time = "N/A"
-                        else:
-                            arrival_time = times[1].text if len(times) > 1 else "N/A"
-
-                        # Extraction de la durée
-                        duration = "N/A"
-                        try:
-                            duration_element = card.find('div', {'class': 'xdW8'})
-                            duration = duration_element.text if duration_element else "N/A"
-                        except:
-                            pass
-
-                        # Extraction du prix
-                        price = "N/A"
-                        try:
-                            price_element = card.find('div', {'class': 'f8F1'})
-                            price = price_element.text if price_element else "N/A"
-                        except:
-                            pass
-
-                        # Extraction de la classe tarifaire avec JavaScript
-                        fare_class_script = """
-                            return Array.from(document.querySelectorAll("#listWrapper > div > div:nth-child(3) > div.Fxw9 > div:nth-child(" + arguments[0] + ") > div > div > div > div.nrc6-price-section > div > div.Oihj-bottom-booking > div > div.M_JD-large-display > div:nth-child(2) > div > div > div > div > div"))
-                            .map(el => el.textContent.trim())
-                            .filter(text => text !== '')[0] || 'N/A';
-                        """
-                        fare_class = driver.execute_script(fare_class_script, index + 1)
                         
-                        # Si JavaScript échoue, essayer avec XPath comme fallback
-                        if fare_class == 'N/A':
-                            fare_class_element = driver.find_element(
-                                By.XPATH,
-                                SELECTORS['fare_class']
-                            )
-                            fare_class = fare_class_element.text.strip() if fare_class_element else "N/A"
-                            
-                        # Nettoyage et normalisation de la classe tarifaire
-                        fare_class = fare_class.replace('Tarif ', '').strip()
+                # Tenter le clic avec JavaScript
+                driver.execute_script("arguments[0].click();", more_results_button)
+                print("Clic sur 'Plus de résultats' effectué")
                         
-                        # Mapping des classes tarifaires pour normalisation
-                        fare_class_mapping = {
-                            'LIGHT': 'Light',
-                            'STANDARD': 'Standard',
-                            'FLEX': 'Flex',
-                            'BUSINESS': 'Business',
-                            'PREMIÈRE': 'First',
-                            'BASIC': 'Basic',           # Ajout de Basic
-                            'ÉCONOMIQUE': 'Economy',    # Ajout de Économique -> Economy
-                            'ECONOMIQUE': 'Economy'     # Pour gérer le cas sans accent
-                        }
+                # Attendre que les nouveaux résultats soient chargés
+                time.sleep(3)
+                wait.until(lambda driver: len(driver.find_elements(By.CLASS_NAME, "nrc6")) > 0)
+            else:
+                print("Bouton 'Plus de résultats' non trouvé")
                         
-                        fare_class = fare_class_mapping.get(fare_class.upper(), fare_class)
-                        
-                        # Nouvelle logique pour les bagages
-                        try:
-                            # Attendre que les éléments de bagages soient chargés
-                            wait = WebDriverWait(driver, 2)
-                            
-                            # Bagage à main
-                            hand_baggage_element = wait.until(
-                                EC.presence_of_element_located((
-                                    By.XPATH,
-                                    f"(//div[contains(@class, 'nrc6')])[{index + 1}]//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[1]//div[2]"
-                                ))
-                            )
-                            # Petit délai pour s'assurer que le texte est chargé
-                            time.sleep(0.5)
-                            hand_baggage = hand_baggage_element.text.strip() if hand_baggage_element else "N/A"
-                            
-                            # Bagage en soute
-                            checked_baggage_element = wait.until(
-                                EC.presence_of_element_located((
-                                    By.XPATH,
-                                    f"(//div[contains(@class, 'nrc6')])[{index + 1}]//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[2]//div[2]"
-                                ))
-                            )
-                            # Petit délai pour s'assurer que le texte est chargé
-                            time.sleep(0.5)
-                            checked_baggage = checked_baggage_element.text.strip() if checked_baggage_element else "N/A"
-                            
-                            # Vérification supplémentaire pour s'assurer que les valeurs ne sont pas vides
-                            if not hand_baggage or hand_baggage.isspace():
-                                hand_baggage = "N/A"
-                            if not checked_baggage or checked_baggage.isspace():
-                                checked_baggage = "N/A"
-                                
-                        except TimeoutException:
-                            print(f"Timeout lors de l'extraction des bagages pour le vol {index + 1}")
-                            hand_baggage = "N/A"
-                            checked_baggage = "N/A"
-                        except Exception as e:
-                            print(f"Erreur lors de l'extraction des bagages pour le vol {index + 1}: {str(e)}")
-                            hand_baggage = "N/A"
-                            checked_baggage = "N/A"
-
-                        # Extraction de la destination
-                        try:
-                            # Utiliser BeautifulSoup pour trouver tous les éléments d'aéroport
-                            airport_elements = card.find_all('span', {'class': 'jLhY-airport-info'})
-                            if airport_elements:
-                                # Prendre le dernier élément (destination) et extraire le premier span
-                                last_airport = airport_elements[-1]
-                                destination_airport = last_airport.find('span').text.strip()
-                            else:
-                                destination_airport = "N/A"
-                        except Exception as e:
-                            print(f"Erreur lors de l'extraction de la destination : {str(e)}")
-                            destination_airport = "N/A"
-
-                        # Extraction des compagnies aériennes
-                        try:
-                            airline_elements = driver.find_elements(
-                                By.XPATH,
-                                f"(//div[contains(@class, 'nrc6')])[{index + 1}]//div[contains(@class, 'c5iUd-leg-carrier')]//img"
-                            )
-                            airlines = [element.get_attribute('alt') for element in airline_elements if element.get_attribute('alt')]
-                            
-                            if not airlines:  # Backup method using BeautifulSoup
-                                airline_elements = card.find_all('div', {'class': 'c5iUd-leg-carrier'})
-                                airlines = [img.get('alt') for element in airline_elements if element.find('img') for img in [element.find('img')] if img and img.get('alt')]
-                            
-                            if not airlines:
-                                airlines = ["N/A"]
-                        except Exception as e:
-                            print(f"Erreur lors de l'extraction des compagnies aériennes : {str(e)}")
-                            airlines = ["N/A"]
-
-                        # Initialisation des variables d'escale
-                        layover_info = "N/A"
-                        layover_duration = "N/A"
-
-                        # Si ce n'est pas un vol direct, essayer d'extraire les informations d'escale
-                        if not is_direct:
-                            try:
-                                # Utiliser le nouveau sélecteur JavaScript pour l'escale
-                                layover_info = driver.execute_script(SELECTORS['layover_info'], index + 1)
-                                
-                                if layover_info != 'N/A':
-                                    # Essayer d'obtenir la durée d'escale via l'attribut title
-                                    layover_duration_element = driver.execute_script("""
-                                        return document.querySelector("#listWrapper > div > div:nth-child(3) > div.Fxw9 > div:nth-child(" + arguments[0] + ") > div > div > div > div.nrc6-content-section > div.nrc6-main > div > ol > li > div > div > div.JWEO > div.c_cgF.c_cgF-mod-variant-full-airport > span > span")?.getAttribute('title') || 'N/A';
-                                    """, index + 1)
-                                    
-                                    if layover_duration_element != 'N/A':
-                                        # Nettoyer la durée d'escale
-                                        layover_duration = layover_duration_element.split('escale de ')[1].split(' à')[0] if 'escale de ' in layover_duration_element else layover_duration_element
-                                    else:
-                                        layover_duration = "N/A"
-                                else:
-                                    # Fallback vers l'ancien sélecteur XPath si nécessaire
-                                    try:
-                                        layover_element = driver.find_element(
-                                            By.XPATH, 
-                                            f"(//div[contains(@class, 'nrc6')])[{index + 1}]//div[contains(@class, 'JWEO')]//div[contains(@class, 'c_cgF')]//span/span"
-                                        )
-                                        if layover_element:
-                                            layover_info = layover_element.text
-                                            layover_duration = layover_element.get_attribute('title')
-                                            if layover_duration:
-                                                layover_duration = layover_duration.split('escale de ')[1].split(' à')[0]
-                                    except:
-                                        layover_info = "N/A"
-                                        layover_duration = "N/A"
-                            except Exception as e:
-                                print(f"Erreur lors de l'extraction de l'escale : {str(e)}")
-                                layover_info = "N/A"
-                                layover_duration = "N/A"
-
-                        flight = {
-                            "departure_time": departure_time,
-                            "arrival_time": arrival_time,
-                            "duration": duration,
-                            "price": price,
-                            "origin_airport": "BOD",
-                            "destination_airport": destination_airport,
-                            "is_direct": is_direct,
-                            "checked_baggage": checked_baggage,
-                            "hand_baggage": hand_baggage,
-                            "layover_airport": layover_info,
-                            "layover_duration": layover_duration,
-                            "airlines": airlines,
-                            "fare_class": fare_class
-                        }
-                        
-                        if not all(v == "N/A" for v in flight.values()):
-                            flights.append(flight)
-                            print(f"Vol ajouté avec succès: {flight}")
-                        else:
-                            print("Vol ignoré car toutes les valeurs sont N/A")
-                            
-                    except Exception as e:
-                        print(f"Erreur lors de l'extraction du vol {index + 1}: {str(e)}")
-                        continue
-                
-                print(f"\nNombre total de vols extraits : {len(flights)}")
-                return {
-                    "flights": flights,
-                    "headers_used": headers,
-                    "proxy_used": proxy_rotator.get_next_proxy()
-                }
-                
         except Exception as e:
-            print(f"Erreur détaillée lors de la tentative #{attempt + 1}: {str(e)}")
-            if "captcha" in str(e).lower():
-                if current_proxy:
-                    proxy_rotator.blacklist_proxy(current_proxy)
-                print("Captcha détecté, changement de proxy...")
-                attempt += 1
-                continue
-            attempt += 1
-            continue
-            
-        break
-    
-    if attempt >= max_attempts:
-        print(f"Échec après {max_attempts} tentatives")
-        return None
-
-def generate_dates(start_date_str, end_date_str=None, num_days=None):
-    """Genère une liste de dates entre start_date et end_date (ou pour num_days)"""
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-    
-    if end_date_str:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-        delta = (end_date - start_date).days + 1
-        return [(start_date + timedelta(days=x)).strftime('%Y-%m-%d') for x in range(delta)]
-    else:
-        num_days = num_days or 30  # utilise 30 jours par défaut si non spécifié
-        return [(start_date + timedelta(days=x)).strftime('%Y-%m-%d') for x in range(num_days)]
+            print(f"Erreur lors du clic sur 'Plus de résultats': {str(e)}")
 
+        # Attendre un peu plus longtemps pour s'assurer que tout est chargé
+        time.sleep(2)
 
-def get_kayak_url(date, destination):
-    """Génère l'URL Kayak pour une date et une destination données"""
-    return f"https://www.kayak.fr/flights/BOD-{destination}/{date}?sort=bestflight_a"
+        print("Analyse du contenu de la page...")
+        # Récupérer les headers actuels
+        headers = {
+            'User-Agent': 'Chrome/133.0.0.0',
+            'Accept-Language': 'fr-FR',
+            'Referer': 'https://www.google.com',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'same-origin',
+            'Sec-Fetch-User': '?1'
+        }
+                
+        save_replay_page(driver, url)
+        flights = None
+        if EXTRACTION_MODE == 'js':
+            flights = extract_flights_js(driver)
+        if not flights:
+            flights = extract_flights_soup(driver)
+                
+        print(f"\nNombre total de vols extraits : {len(flights)}")
+        get_proxy_rotator().record_result(current_proxy, load_time, cards=len(flights))
+        return {
+            "flights": flights,
+            "headers_used": headers,
+            "proxy_used": current_proxy
+        }
 
-# Ajouter cette fonction pour nettoyer les fichiers temporaires
 def cleanup_chrome_files():
     import shutil
     import os
@@ -836,69 +1047,303 @@ def manual_chromedriver_setup():
     6. Modifiez le chemin dans le code pour pointer vers ce dossier
     """)
 
-# Ajouter après la fonction scrape_kayak_flights et avant la fonction main
+class ScrapeJob:
+    """Un couple (destination, date de vol) à scraper pour un jour de recherche"""
+
+    def __init__(self, destination, date, search_date=None):
+        self.destination = destination
+        self.date = date
+        self.attempts = 0
+        self.search_date = search_date or datetime.now().strftime("%Y-%m-%d")
+        self.url = get_kayak_url(date, destination)
+
+    @property
+    def key(self):
+        return (self.search_date, self.destination, self.date)
+
+    def __repr__(self):
+        return f"ScrapeJob({self.destination}, {self.date}, recherche du {self.search_date})"
+
+class ProxyRateLimiter:
+    """Espace les requêtes d'un même proxy de DELAY_BETWEEN_REQUESTS.
+
+    Remplace le sleep fixe de chaque thread : un worker n'attend que si le
+    proxy de son driver a servi une page trop récemment.
+    """
+
+    def __init__(self, delay_range=DELAY_BETWEEN_REQUESTS):
+        self.delay_range = delay_range
+        self.lock = threading.Lock()
+        self.next_allowed = {}
+
+    def wait(self, proxy):
+        """Réserve le prochain créneau du proxy et attend jusqu'à celui-ci"""
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_allowed.get(proxy, now))
+            self.next_allowed[proxy] = slot + random.uniform(*self.delay_range)
+        delay = slot - time.time()
+        if delay > 0:
+            print(f"Proxy {proxy} : attente de {delay:.1f}s avant la prochaine requête")
+            time.sleep(delay)
+
+class ScrapeScheduler:
+    """File de priorité globale sur tous les couples (destination, date).
+
+    Les dates de vol les plus proches passent en premier ; à date égale, la
+    destination la moins servie au moment du retrait passe devant, ce qui entrelace les destinations
+    au lieu de laisser une destination lente bloquer un worker. Un job en échec
+    est replanifié avec une date « pas avant » : les workers continuent de
+    servir les autres jobs en attendant.
+    """
+
+    def __init__(self, jobs=()):
+        self.condition = threading.Condition()
+        self.heap = []
+        self.delayed = []
+        self.sequence = 0
+        self.served = {}
+        self.remaining = {}
+        self.in_flight = 0
+        for job in jobs:
+            self.put(job)
+
+    def _push(self, job):
+        heapq.heappush(self.heap, (job.date, self.sequence, job))
+        self.sequence += 1
 
-def process_destination_with_semaphore(destination):
-    """Traite une destination donnée avec un sémaphore pour limiter les connexions simultanées"""
+    def _pop_fairest(self):
+        """Parmi les jobs de la date la plus proche, celui de la destination la moins servie"""
+        date = self.heap[0][0]
+        candidates = []
+        while self.heap and self.heap[0][0] == date:
+            candidates.append(heapq.heappop(self.heap))
+        # Compteur lu au retrait : au remplissage initial, aucune destination n'a encore été servie
+        best = min(candidates, key=lambda entry: (self.served.get(entry[2].destination, 0), entry[1]))
+        for entry in candidates:
+            if entry is not best:
+                heapq.heappush(self.heap, entry)
+        return best[2]
+
+    def put(self, job):
+        with self.condition:
+            self._push(job)
+            self.remaining[job.destination] = self.remaining.get(job.destination, 0) + 1
+            self.condition.notify()
+
+    def retry(self, job, delay):
+        """Remet un job en file, disponible dans `delay` secondes"""
+        with self.condition:
+            self.in_flight -= 1
+            heapq.heappush(self.delayed, (time.time() + delay, self.sequence, job))
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def get(self):
+        """Retourne le prochain job prêt, ou None quand tout est traité.
+
+        Tant que des jobs sont en cours ou replanifiés, attend au lieu de
+        rendre la main : ils peuvent encore revenir dans la file.
+        """
+        with self.condition:
+            while True:
+                now = time.time()
+                while self.delayed and self.delayed[0][0] <= now:
+                    _, _, job = heapq.heappop(self.delayed)
+                    self._push(job)
+                if self.heap:
+                    job = self._pop_fairest()
+                    self.served[job.destination] = self.served.get(job.destination, 0) + 1
+                    self.in_flight += 1
+                    return job
+                if not self.delayed and not self.in_flight:
+                    return None
+                timeout = self.delayed[0][0] - now if self.delayed else None
+                self.condition.wait(timeout)
+
+    def task_done(self, job):
+        """Retourne True quand c'était le dernier job de sa destination"""
+        with self.condition:
+            self.in_flight -= 1
+            self.remaining[job.destination] -= 1
+            self.condition.notify_all()
+            return self.remaining[job.destination] == 0
+
+    def __len__(self):
+        with self.condition:
+            return len(self.heap) + len(self.delayed)
+
+# Octets transférés et temps de chargement d'une page, d'après l'API Performance.
+# transferSize vaut 0 pour les ressources tierces sans Timing-Allow-Origin :
+# le total est un minorant, comparable d'un profil de blocage à l'autre.
+PAGE_METRICS_SCRIPT = """
+    const nav = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    const sum = (entries, key) => entries.reduce((total, e) => total + (e[key] || 0), 0);
+    return {
+        bytes: (nav ? nav.transferSize : 0) + sum(resources, 'transferSize'),
+        decoded_bytes: (nav ? nav.decodedBodySize : 0) + sum(resources, 'decodedBodySize'),
+        resources: resources.length,
+        dom_content_loaded_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+        load_event_ms: nav ? Math.round(nav.loadEventEnd) : null
+    };
+"""
+
+def collect_page_metrics(driver):
     try:
-        print(f"\nScraping des vols pour {DESTINATIONS[destination]}")
-        
-        # Créer le dossier pour la destination
-        destination_dir = os.path.join("data", destination)
-        os.makedirs(destination_dir, exist_ok=True)
-        
-        # Générer les dates
-        start_date = datetime.now().strftime("%Y-%m-%d")
-        end_date = "2025-05-01"
-        dates = generate_dates(start_date, end_date)
-        
+        return driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+    except Exception as e:
+        print(f"Métriques de page indisponibles : {str(e)}")
+        return {}
 
-        
+class PageMetrics:
+    """Octets transférés et temps de chargement par proxy, pour mesurer l'effet du profil de blocage"""
+
+    def __init__(self, profile=RESOURCE_BLOCKING_PROFILE):
+        self.profile = profile
+        self.lock = threading.Lock()
+        self.proxies = {}
+
+    def record(self, proxy, load_time, metrics):
+        with self.lock:
+            stats = self.proxies.setdefault(proxy, {
+                'pages': 0, 'bytes': 0, 'decoded_bytes': 0, 'resources': 0, 'load_time': 0.0
+            })
+            stats['pages'] += 1
+            stats['load_time'] += load_time
+            stats['bytes'] += metrics.get('bytes') or 0
+            stats['decoded_bytes'] += metrics.get('decoded_bytes') or 0
+            stats['resources'] += metrics.get('resources') or 0
+
+    def summary(self):
+        with self.lock:
+            per_proxy = {}
+            for proxy, stats in self.proxies.items():
+                pages = stats['pages'] or 1
+                per_proxy[proxy] = {
+                    'pages': stats['pages'],
+                    'avg_kb_per_page': round(stats['bytes'] / pages / 1024, 1),
+                    'avg_decoded_kb_per_page': round(stats['decoded_bytes'] / pages / 1024, 1),
+                    'avg_resources_per_page': round(stats['resources'] / pages, 1),
+                    'avg_load_time': round(stats['load_time'] / pages, 2),
+                    'total_mb': round(stats['bytes'] / 1024 / 1024, 2),
+                }
+            pages = sum(s['pages'] for s in self.proxies.values())
+            total_bytes = sum(s['bytes'] for s in self.proxies.values())
+            load_time = sum(s['load_time'] for s in self.proxies.values())
+        return {
+            'profile': self.profile,
+            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'pages': pages,
+            'avg_kb_per_page': round(total_bytes / max(pages, 1) / 1024, 1),
+            'avg_load_time': round(load_time / max(pages, 1), 2),
+            'proxies': per_proxy,
+        }
+
+    def save(self, folder=METRICS_FOLDER):
+        summary = self.summary()
+        os.makedirs(folder, exist_ok=True)
+        metrics_file = os.path.join(folder, f'scraper_pages_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+        with open(metrics_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        print(f"\n=== Pages ({summary['profile']}) : {summary['pages']} pages, "
+              f"{summary['avg_kb_per_page']} Ko/page, {summary['avg_load_time']}s/page ===")
+        for proxy, stats in summary['proxies'].items():
+            print(f"{proxy}: {stats['pages']} pages, {stats['avg_kb_per_page']} Ko/page, "
+                  f"{stats['avg_load_time']}s/page, {stats['total_mb']} Mo au total")
+        return metrics_file
+
+# Métriques de pages partagées par tous les workers
+page_metrics = PageMetrics()
+
+# Limiteur de débit partagé par tous les workers
+proxy_limiter = ProxyRateLimiter()
+
+def build_jobs(destinations, dates, manifest, search_date=None):
+    """Construit la liste des jobs dus d'après le manifeste"""
+    search_date = search_date or datetime.now().strftime("%Y-%m-%d")
+    min_search_date = (datetime.strptime(search_date, "%Y-%m-%d")
+                       - timedelta(days=RESCRAPE_INTERVAL_DAYS - 1)).strftime("%Y-%m-%d")
+    done = manifest.done_since(min_search_date)
+    jobs = []
+    skipped = 0
+    for destination in destinations:
         for date in dates:
-            try:
-                # Construire le nom du fichier
-                filename = os.path.join(destination_dir, f"flights_{date}.json")
-                
-                # Vérifier si le fichier existe déjà
-                if os.path.exists(filename):
-                    print(f"Données déjà existantes pour {destination} le {date}")
-                    continue
-                
-                # Construire l'URL et scraper les données
-                url = get_kayak_url(date, destination)
-                print(f"\nScraping des vols pour {DESTINATIONS[destination]} le {date}")
-                
-                results = scrape_kayak_flights(url)
-                
-                if results and results.get('flights'):
-                    # Créer le dictionnaire final avec les métadonnées
-                    final_data = {
-                        "search_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "flight_date": date,
-                        "origin": "BOD",
-                        "destination": destination,
-                        "destination_city": DESTINATIONS[destination],
-                        "url": url,
-                        "flights": results['flights']
-                    }
-                    
-                    # Sauvegarder les résultats
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(final_data, f, ensure_ascii=False, indent=4)
-                    print(f"Données sauvegardées pour {destination} le {date}")
-                else:
-                    print(f"Pas de résultats pour {destination} le {date}")
-                
-                # Attendre entre chaque requête
-                time.sleep(random.uniform(*DELAY_BETWEEN_REQUESTS))
-                
-            except Exception as e:
-                print(f"Erreur lors du traitement de {destination} pour la date {date}: {str(e)}")
+            if (destination, date) in done:
+                skipped += 1
                 continue
-                
+            jobs.append(ScrapeJob(destination, date, search_date))
+    print(f"{skipped} observations déjà scrapées depuis le {min_search_date}, ignorées")
+    return jobs
+
+def process_job(job, manifest):
+    """Scrape un couple (destination, date) et sauvegarde le résultat"""
+    destination, date, url = job.destination, job.date, job.url
+    filename = get_output_path(destination, date, job.search_date)
+    print(f"\nScraping des vols pour {DESTINATIONS[destination]} le {date}")
+    
+    manifest.start(*job.key)
+    job.attempts += 1
+    start = time.time()
+    try:
+        results = scrape_kayak_flights(url)
     except Exception as e:
-        print(f"Erreur lors du traitement de la destination {destination}: {str(e)}")
+        manifest.finish(*job.key, STATUS_FAILED, duration=time.time() - start, error=str(e))
         raise
+    
+    if results and results.get('flights'):
+        # Créer le dictionnaire final avec les métadonnées
+        final_data = {
+            # Jour de recherche du job (celui de la partition), pour les reprises et le backfill
+            "search_date": f"{job.search_date} {datetime.now().strftime('%H:%M:%S')}",
+            "flight_date": date,
+            "origin": "BOD",
+            "destination": destination,
+            "destination_city": DESTINATIONS[destination],
+            "url": url,
+            "flights": results['flights']
+        }
+        
+        # Sauvegarder les résultats
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(final_data, f, ensure_ascii=False, indent=4)
+        manifest.finish(*job.key, STATUS_DONE, duration=time.time() - start,
+                        flights=len(results['flights']), output_path=filename)
+        print(f"Données sauvegardées pour {destination} le {date}")
+    else:
+        status = STATUS_EMPTY if results is not None else STATUS_FAILED
+        manifest.finish(*job.key, status, duration=time.time() - start, flights=0)
+        print(f"Pas de résultats pour {destination} le {date}")
+
+def retry_delay(job, error):
+    """Délai avant la prochaine tentative d'un job, ou None s'il a épuisé ses tentatives"""
+    if job.attempts >= MAX_RETRIES:
+        return None
+    delay_range = RETRY_DELAY if isinstance(error, CaptchaDetected) else ERROR_RETRY_DELAY
+    return random.uniform(*delay_range)
+
+def scheduler_worker(scheduler, manifest):
+    """Boucle d'un worker : traite les jobs jusqu'à épuisement de la file"""
+    processed = 0
+    while True:
+        job = scheduler.get()
+        if job is None:
+            return processed
+        try:
+            process_job(job, manifest)
+        except Exception as e:
+            print(f"Erreur lors du traitement de {job.destination} pour la date {job.date} "
+                  f"(tentative {job.attempts}/{MAX_RETRIES}): {str(e)}")
+            delay = retry_delay(job, e)
+            if delay is not None:
+                print(f"{job} replanifié dans {delay:.0f}s")
+                scheduler.retry(job, delay)
+                continue
+            print(f"Échec après {job.attempts} tentatives pour {job}")
+        processed += 1
+        if scheduler.task_done(job):
+            print(f"Scraping terminé pour {DESTINATIONS[job.destination]}")
 
 # Modifier la fonction main pour inclure la concaténation
 def main():
@@ -912,8 +1357,9 @@ def main():
         
         while not test_success and time.time() < timeout:
             try:
-                with create_driver() as test_driver:
-                    test_driver.get("https://www.google.com")
+                # Le driver de test reste dans le pool et sera réutilisé
+                with driver_pool.session() as session:
+                    session.driver.get("https://www.google.com")
                     test_success = True
                     print("Test initial du driver réussi!")
             except Exception as e:
@@ -927,7 +1373,7 @@ def main():
         start_date = datetime.now().strftime("%Y-%m-%d")
         end_date = "2025-05-01"
         dates = generate_dates(start_date, end_date)
-        max_workers = 8  # Augmenté de 2 à 4 workers
+        max_workers = MAX_WORKERS
         
         print(f"Dates générées: {len(dates)} jours")
         print(f"Nombre de workers: {max_workers}")
@@ -936,22 +1382,31 @@ def main():
         os.makedirs("drivers", exist_ok=True)
         
         # Créer le dossier principal pour les données
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(DATA_FOLDER, exist_ok=True)
+        
+        # Le manifeste permet de reprendre un run interrompu sans re-scraper
+        manifest = ScrapeManifest()
+        if manifest.is_new:
+            manifest.backfill()
+        
+        # Une file globale sur tous les couples (destination, date)
+        scheduler = ScrapeScheduler(build_jobs(DESTINATIONS.keys(), dates, manifest))
+        print(f"Jobs à traiter: {len(scheduler)}")
         
-        # Exécuter le scraping pour chaque destination en parallèle
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_destination = {executor.submit(process_destination_with_semaphore, dest): dest 
-                                   for dest in DESTINATIONS.keys()}
+            futures = [executor.submit(scheduler_worker, scheduler, manifest) for _ in range(max_workers)]
             
-            for future in concurrent.futures.as_completed(future_to_destination):
-                destination = future_to_destination[future]
+            for future in concurrent.futures.as_completed(futures):
                 try:
-                    future.result()
-                    print(f"Scraping terminé pour {DESTINATIONS[destination]}")
+                    print(f"Worker terminé après {future.result()} jobs")
                 except Exception as e:
-                    print(f"Erreur pour {DESTINATIONS[destination]}: {str(e)}")
+                    print(f"Erreur dans un worker: {str(e)}")
 
         print("\nScraping terminé pour toutes les destinations")
+        driver_pool.print_metrics()
+        get_proxy_rotator().print_scores()
+        page_metrics.save()
+        print(f"Manifeste du jour : {manifest.summary(datetime.now().strftime('%Y-%m-%d'))}")
         
 
     except Exception as e:
@@ -960,6 +1415,8 @@ def main():
             manual_chromedriver_setup()
             return
         raise
+    finally:
+        driver_pool.close_all()
 
 # Ajouter une fonction pour vérifier si le système est prêt
 def check_system_ready():
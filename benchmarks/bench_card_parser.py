@@ -0,0 +1,117 @@
+"""Banc de rejeu du parseur de cartes de vol, sans accès à Kayak.
+
+Rejoue des pages de résultats sauvegardées (REPLAY_CAPTURE_FOLDER) et compare :
+- le parseur BeautifulSoup pur (parse_flight_cards), sans navigateur ;
+- l'extraction en une passe EXTRACT_CARDS_SCRIPT dans Chrome headless, les pages
+  étant servies par un serveur HTTP local (ignorée si Chrome n'est pas disponible).
+
+Usage : python benchmarks/bench_card_parser.py [dossier_ou_fichier ...] [--repeat N] [--no-browser]
+"""
+import argparse
+import functools
+import glob
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.scraping.config import MAX_FLIGHT_CARDS
+from src.scraping.parsing import EXTRACT_CARDS_SCRIPT, build_flight_from_card, is_empty_flight, parse_flight_cards
+
+
+DEFAULT_CORPUS = ['data/replay', 'src/data/extrait_code_source.html']
+
+
+def load_corpus(paths):
+    """Liste des fichiers HTML du corpus de rejeu"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.html'))))
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+def count_fields(flights):
+    return sum(1 for flight in flights for value in flight.values() if value not in ('N/A', []))
+
+
+def report(label, pages, flights, fields, elapsed):
+    print(f"{label:<12} {pages} pages, {flights} vols, {fields} champs en {elapsed:.3f}s "
+          f"-> {pages / elapsed:.1f} pages/s, {fields / elapsed:.0f} champs/s")
+
+
+def bench_soup(files, repeat):
+    """Parseur BeautifulSoup pur, sur le HTML lu depuis le disque"""
+    pages = [Path(f).read_text(encoding='utf-8') for f in files]
+    flights = fields = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            result = parse_flight_cards(html, MAX_FLIGHT_CARDS)
+            flights += len(result)
+            fields += count_fields(result)
+    report('soup', len(pages) * repeat, flights, fields, time.perf_counter() - start)
+
+
+def bench_browser(files, repeat):
+    """EXTRACT_CARDS_SCRIPT dans Chrome headless, pages servies en local"""
+    try:
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        print(f"browser      ignoré : Chrome indisponible ({str(e).splitlines()[0] if str(e) else type(e).__name__})")
+        return
+
+    root = os.path.commonpath([os.path.abspath(os.path.dirname(f)) for f in files])
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=root)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/{os.path.relpath(os.path.abspath(f), root)}" for f in files]
+
+    try:
+        flights = fields = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for url in urls:
+                driver.get(url)
+                cards = json.loads(driver.execute_script(EXTRACT_CARDS_SCRIPT, MAX_FLIGHT_CARDS))
+                result = [f for f in map(build_flight_from_card, cards) if not is_empty_flight(f)]
+                flights += len(result)
+                fields += count_fields(result)
+        report('browser', len(urls) * repeat, flights, fields, time.perf_counter() - start)
+    finally:
+        driver.quit()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de rejeu du parseur de cartes de vol")
+    parser.add_argument('paths', nargs='*', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=20, help="Nombre de passes sur le corpus")
+    parser.add_argument('--no-browser', action='store_true', help="Ne pas lancer Chrome headless")
+    args = parser.parse_args()
+
+    files = load_corpus(args.paths)
+    if not files:
+        print("Aucune page HTML dans le corpus de rejeu")
+        return
+    print(f"Corpus : {len(files)} pages, {args.repeat} passes")
+    bench_soup(files, args.repeat)
+    if not args.no_browser:
+        bench_browser(files, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Banc des nettoyages du concatenator : version ligne à ligne contre version vectorisée.
+
+Aplatit tous les JSON de data/ (par destination, comme concatenator.py),
+applique clean_flights_rowwise + generate_flight_id puis clean_flights + flight_id_column,
+vérifie que les CSV produits sont identiques octet par octet et affiche les temps.
+
+Usage : python benchmarks/bench_concatenator_cleaners.py [--base-folder data] [--destinations AMS LON]
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from src.data import concatenator
+from src.data.raw_store import destination_files
+
+
+def to_csv_bytes(df):
+    return df.to_csv(index=False, encoding='utf-8', quoting=csv.QUOTE_ALL,
+                     escapechar='\\', doublequote=True).encode('utf-8')
+
+
+def load_destination(base_folder, destination):
+    json_files = destination_files(base_folder, destination)
+    chunks = list(concatenator.iter_flight_chunks(json_files, destination))
+    return pd.concat(chunks, ignore_index=True) if chunks else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc des nettoyages ligne à ligne / vectorisés")
+    parser.add_argument('--base-folder', type=Path, default=concatenator.DEFAULT_BASE_FOLDER)
+    parser.add_argument('--destinations', nargs='*')
+    args = parser.parse_args()
+
+    destinations = args.destinations or concatenator.find_destination_folders(args.base_folder)
+    timings = {'flatten': 0.0, 'rowwise': 0.0, 'vectorised': 0.0}
+    rows = 0
+    mismatches = []
+
+    for destination in destinations:
+        start = time.perf_counter()
+        df = load_destination(args.base_folder, destination)
+        timings['flatten'] += time.perf_counter() - start
+        if df is None:
+            continue
+        rows += len(df)
+
+        start = time.perf_counter()
+        rowwise = concatenator.clean_flights_rowwise(df.copy())
+        rowwise['flight_id'] = rowwise.apply(concatenator.generate_flight_id, axis=1)
+        timings['rowwise'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectorised = concatenator.clean_flights(df.copy())
+        vectorised['flight_id'] = concatenator.flight_id_column(vectorised)
+        timings['vectorised'] += time.perf_counter() - start
+
+        identical = to_csv_bytes(rowwise) == to_csv_bytes(vectorised) and rowwise.dtypes.equals(vectorised.dtypes)
+        if not identical:
+            mismatches.append(destination)
+        print(f"{destination:<16} {len(df):>7} lignes  {'identique' if identical else 'DIFFÉRENT'}")
+
+    print(f"\n{rows} lignes, {len(destinations)} dossiers")
+    print(f"Aplatissement JSON : {timings['flatten']:.2f}s")
+    print(f"Ligne à ligne      : {timings['rowwise']:.2f}s ({rows / max(timings['rowwise'], 1e-9):.0f} lignes/s)")
+    print(f"Vectorisé          : {timings['vectorised']:.2f}s ({rows / max(timings['vectorised'], 1e-9):.0f} lignes/s)")
+    if timings['vectorised']:
+        print(f"Accélération       : x{timings['rowwise'] / timings['vectorised']:.1f}")
+    if mismatches:
+        print(f"Sorties différentes pour : {', '.join(mismatches)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
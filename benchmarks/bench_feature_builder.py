@@ -0,0 +1,109 @@
+"""Banc de FlightFeatureBuilder : chaîne add_*_features par destination contre traitement par lot.
+
+Charge toutes les destinations de data/ (dataset Parquet, ou à défaut CSV combinés), puis :
+    - destination par destination : add_price_features, add_temporal_features, add_route_features ;
+    - destination par destination : build_features (un seul groupby, sans copies) ;
+    - toutes les destinations en un DataFrame : build_features, comparé à la chaîne
+      add_*_features appliquée au même DataFrame ;
+    - process_destinations avec --workers processus (chargement compris).
+Vérifie que les features produites sont identiques et affiche les temps.
+
+Usage : python benchmarks/bench_feature_builder.py [--base-folder data] [--destinations AMS LON] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from src.data import concatenator
+from src.data.feature_builder import FlightFeatureBuilder
+
+
+def legacy_features(builder, df):
+    return (df
+        .pipe(builder.add_price_features)
+        .pipe(builder.add_temporal_features)
+        .pipe(builder.add_route_features)
+    )
+
+
+def same_features(expected, actual):
+    expected = expected.sort_values('flight_id', kind='stable').reset_index(drop=True)
+    actual = actual.sort_values('flight_id', kind='stable').reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc des features par destination / par lot")
+    parser.add_argument('--base-folder', type=Path, default=concatenator.DEFAULT_BASE_FOLDER)
+    parser.add_argument('--destinations', nargs='*')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    builder = FlightFeatureBuilder(args.base_folder)
+    destinations = [destination.upper() for destination in (args.destinations or builder.available_destinations())]
+    timings = {'load': 0.0, 'legacy': 0.0, 'fused': 0.0, 'batch_load': 0.0, 'batch': 0.0, 'parallel': 0.0}
+    mismatches = []
+
+    frames = {}
+    for destination in destinations:
+        start = time.perf_counter()
+        frames[destination] = builder.load_destination_data(destination)
+        timings['load'] += time.perf_counter() - start
+
+    for destination, df in frames.items():
+        start = time.perf_counter()
+        legacy = legacy_features(builder, df)
+        timings['legacy'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fused = builder.build_features(df)
+        timings['fused'] += time.perf_counter() - start
+
+        identical = same_features(legacy, fused)
+        if not identical:
+            mismatches.append(destination)
+        print(f"{destination:<16} {len(df):>7} lignes  {'identique' if identical else 'DIFFÉRENT'}")
+    rows = sum(len(df) for df in frames.values())
+    del frames
+
+    start = time.perf_counter()
+    combined = builder.load_destinations(destinations)
+    timings['batch_load'] = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = builder.build_features(combined)
+    timings['batch'] = time.perf_counter() - start
+    if not same_features(legacy_features(builder, combined), batch):
+        mismatches.append('lot complet')
+    del combined, batch
+
+    start = time.perf_counter()
+    parallel = builder.process_destinations(destinations, workers=args.workers)
+    timings['parallel'] = time.perf_counter() - start
+
+    print(f"\n{rows} lignes, {len(destinations)} destinations")
+    print(f"Chargement par destination : {timings['load']:.2f}s")
+    print(f"Chargement par lot         : {timings['batch_load']:.2f}s")
+    print(f"add_*_features             : {timings['legacy']:.2f}s ({rows / max(timings['legacy'], 1e-9):.0f} lignes/s)")
+    print(f"build_features             : {timings['fused']:.2f}s ({rows / max(timings['fused'], 1e-9):.0f} lignes/s)")
+    print(f"build_features par lot     : {timings['batch']:.2f}s ({rows / max(timings['batch'], 1e-9):.0f} lignes/s)")
+    print(f"process_destinations ({args.workers} processus, chargement compris) : {timings['parallel']:.2f}s "
+          f"({len(parallel)} lignes)")
+    if timings['batch']:
+        print(f"Accélération (lot)         : x{timings['legacy'] / timings['batch']:.1f}")
+    if mismatches:
+        print(f"Sorties différentes pour : {', '.join(mismatches)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+-- Vue standardisée des vols : une ligne par flight_id, prix renseigné et positif.
+-- SQL commun à BigQuery et DuckDB (mode local de automated_pipeline.py).
+
+with source as (
+
+    select * from {{ source('bigquery_raw', 'combined_flights') }}
+
+)
+
+select
+    flight_id,
+    search_date,
+    search_date_with_hour,
+    flight_date,
+    flight_date_with_time,
+    flight_arrival_with_time,
+    days_until_flight,
+    day_of_week,
+    departure_period,
+    origin,
+    origin_airport,
+    origin_coordinates,
+    destination,
+    destination_city,
+    destination_airport,
+    destination_coordinates,
+    distance_km,
+    departure_time,
+    arrival_time,
+    duration,
+    flight_type,
+    is_direct,
+    layover_airport,
+    layover_duration,
+    second_flight_duration,
+    airlines,
+    flight_connection_company,
+    fare_class,
+    checked_baggage,
+    hand_baggage,
+    price,
+    price_category,
+    url
+
+from source
+where flight_id is not null
+  and price > 0
+-- Sources qui se recouvrent : la dernière observation de chaque vol l'emporte
+qualify row_number() over (
+    partition by flight_id
+    order by search_date desc, search_date_with_hour desc
+) = 1
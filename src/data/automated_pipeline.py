@@ -1,14 +1,23 @@
+import argparse
 import logging
 from datetime import datetime
 from pathlib import Path
-import subprocess
 import os
-from google.cloud import bigquery
-from google.oauth2 import service_account
 import yaml
 import json
 import pandas as pd
 from typing import List, Dict
+import sys
+
+# Permet l'import de src.* quand le script est lancé directement
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.data import concatenator
+from src.data.warehouse import DEFAULT_DUCKDB_PATH, BigQueryWarehouse, DuckDBWarehouse, run_dbt_models
+
+# Les handlers sont ajoutés par setup_logger dans main() : les fonctions du module
+# restent utilisables depuis un autre programme ou un test
+logger = logging.getLogger('automated_pipeline')
 
 # Configuration du logging
 def setup_logger(base_folder):
@@ -20,8 +29,8 @@ def setup_logger(base_folder):
     log_filename = log_folder / f'automated_pipeline_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
     
     # Configuration du logger
-    logger = logging.getLogger('automated_pipeline')
     logger.setLevel(logging.INFO)
+    logger.handlers.clear()
     
     # Handler pour fichier
     file_handler = logging.FileHandler(log_filename, encoding='utf-8')
@@ -42,104 +51,75 @@ def setup_logger(base_folder):
     
     return logger
 
-def run_concatenator():
-    """Exécute le script concatenator.py"""
-    try:
-        # Définir le chemin complet vers concatenator.py
-        concatenator_path = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\src\data\concatenator.py")
-        
-        if not concatenator_path.exists():
-            raise FileNotFoundError(f"Le fichier concatenator.py n'existe pas à l'emplacement: {concatenator_path}")
-        
-        # Utiliser l'interpréteur Python de l'environnement virtuel
-        venv_python = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\.venv\Scripts\python.exe")
-        
-        # Installer les dépendances nécessaires
-        subprocess.run([str(venv_python), '-m', 'pip', 'install', 'geopy'], check=True)
-        
-        # Exécuter le script avec l'interpréteur de l'environnement virtuel
-        subprocess.run([str(venv_python), str(concatenator_path)], check=True)
-        logger.info("Concatenation des fichiers terminée avec succès")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Erreur lors de l'exécution du concatenator: {e}")
-        raise
-    except FileNotFoundError as e:
-        logger.error(f"Erreur de chemin: {e}")
-        raise
+def run_concatenator(base_folder, config=None):
+    """
+    Exécute le concatenator dans ce processus (concatenator.run).
 
-def upload_to_bigquery(project_id, dataset_id, credentials_path):
-    """Upload les fichiers CSV vers BigQuery"""
-    logger.info(f"Début de l'upload vers BigQuery - Projet: {project_id}, Dataset: {dataset_id}")
-    
-    # Configuration des credentials
+    Args:
+        config (dict): paramètres du concatenator (section concatenator de config.yaml),
+            ex. {'workers': 4, 'merge_mode': 'external'}
+
+    Returns:
+        dict: résultat de concatenator.run (CSV combinés, dossier Parquet, métriques)
+    """
+    result = concatenator.run(dict(config or {}, base_folder=base_folder))
+    rows = sum(r['rows'] for r in result['results'])
+    logger.info(f"Concatenation des fichiers terminée avec succès : {len(result['output_files'])} destinations mises à jour, "
+                f"{rows} lignes")
+    return result
+
+def bigquery_client(project_id, credentials_path):
+    """Client BigQuery authentifié par le compte de service"""
+    # Dépendances du seul mode BigQuery : le mode duckdb fonctionne sans les paquets google
+    from google.cloud import bigquery
+    from google.oauth2 import service_account
+
+    # Vérification des credentials
+    if not Path(credentials_path).exists():
+        raise FileNotFoundError(f"Le fichier de credentials n'existe pas: {credentials_path}")
     credentials = service_account.Credentials.from_service_account_file(
         credentials_path,
         scopes=["https://www.googleapis.com/auth/bigquery"]
     )
-    
-    # Initialisation du client BigQuery
-    client = bigquery.Client(credentials=credentials, project=project_id)
-    
-    # Correction du chemin vers le dossier combined
-    base_folder = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\data")
-    combined_folder = base_folder / 'combined'
-    
-    if not combined_folder.exists():
-        logger.error(f"Le dossier combined n'existe pas: {combined_folder}")
-        raise FileNotFoundError(f"Dossier introuvable: {combined_folder}")
-        
-    # Ajout d'un log pour vérifier les fichiers trouvés
-    csv_files = list(combined_folder.glob('*.csv'))
-    logger.info(f"Fichiers CSV trouvés: {[f.name for f in csv_files]}")
-    
-    # Pour chaque fichier CSV dans le dossier
-    for csv_file in combined_folder.glob('*.csv'):
-        table_name = csv_file.stem
-        table_id = f"{project_id}.{dataset_id}.{table_name}"
-        
-        # Vérification de la taille et du contenu du fichier
-        if csv_file.stat().st_size == 0:
-            logger.warning(f"Le fichier {csv_file.name} est vide, ignoré")
-            continue
-            
-        # Vérification rapide du contenu
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            first_line = f.readline()
-            if not first_line.strip():
-                
-                logger.warning(f"Le fichier {csv_file.name} semble vide ou mal formaté, ignoré")
-                continue
-        
-        logger.info(f"Traitement du fichier: {csv_file.name}")
-        
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.CSV,
-            skip_leading_rows=1,
-            autodetect=True,
-            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
-        )
-        
-        try:
-            with open(csv_file, "rb") as source_file:
-                job = client.load_table_from_file(
-                    source_file,
-                    table_id,
-                    job_config=job_config
-                )
-            
-            job.result()
-            logger.info(f"Chargement terminé pour {table_name}: {job.output_rows} lignes chargées")
-            
-        except Exception as e:
-            logger.error(f"Erreur lors du chargement de {table_name}: {e}")
-            raise
+    return bigquery.Client(credentials=credentials, project=project_id)
+
+def upload_to_bigquery(project_id, dataset_id, credentials_path, base_folder=None, client=None, full=False):
+    """
+    Charge dans BigQuery les partitions Parquet modifiées depuis le dernier chargement.
+
+    Args:
+        base_folder (Path): dossier data/ contenant parquet/ et le watermark
+        client: client BigQuery ; créé à partir de credentials_path si None (un faux
+            client peut être injecté pour tester le chargement hors ligne)
+        full (bool): ignorer le watermark et recharger tout le dataset
+
+    Returns:
+        dict: partitions chargées et supprimées, lignes et octets envoyés
+    """
+    logger.info(f"Début de l'upload vers BigQuery - Projet: {project_id}, Dataset: {dataset_id}")
+
+    if client is None:
+        client = bigquery_client(project_id, credentials_path)
+
+    if base_folder is None:
+        base_folder = concatenator.DEFAULT_BASE_FOLDER
+
+    from src.data.bigquery_loader import BigQueryLoader
+
+    loader = BigQueryLoader(client, project_id, dataset_id, base_folder)
+    stats = loader.load(full=full)
+    logger.info(f"Upload terminé : {stats['partitions']} partitions chargées ({stats['rows']} lignes, "
+                f"{stats['bytes'] / 1e6:.1f} Mo), {stats['removed']} supprimées, {stats['unchanged']} inchangées")
+    return stats
 
-def load_config():
+def load_config(required=True):
     # Obtenir le chemin du répertoire contenant le script actuel
     current_dir = Path(__file__).parent
     config_path = current_dir / 'config.yaml'
     
     if not config_path.exists():
+        if not required:
+            return {}
         raise FileNotFoundError(f"Le fichier de configuration n'existe pas à l'emplacement: {config_path}")
     
     with open(config_path, 'r') as f:
@@ -183,37 +163,77 @@ class FlightDataLoader:
             
         return pd.concat(dfs, ignore_index=True)
 
-def main():
+def create_warehouse(name, config, database=None):
+    """Entrepôt du pipeline : 'bigquery' (projet de config.yaml) ou 'duckdb' (fichier local)"""
+    if name == 'duckdb':
+        return DuckDBWarehouse(database or DEFAULT_DUCKDB_PATH)
+    project = config['project']
+    return BigQueryWarehouse(bigquery_client(project['id'], project['credentials_path']), project['id'], project['dataset'])
+
+def log_pipeline_report(stages, warehouse_name, base_folder):
+    """Temps par étape du pipeline (concatenation, chargement, modèles, tests), écrits dans data/metrics"""
+    logger.info(f"=== Rapport du pipeline ({warehouse_name}) ===")
+    for name, stage in stages.items():
+        logger.info(f"{name:<24} {stage['seconds']:8.2f}s {stage['items']:>9} él.  pic {stage['peak_rss_mb']:7.1f} Mo")
+    logger.info(f"{'total':<24} {sum(stage['seconds'] for stage in stages.values()):8.2f}s")
+
+    metrics_folder = base_folder / 'metrics'
+    metrics_folder.mkdir(exist_ok=True)
+    metrics_file = metrics_folder / f'pipeline_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(metrics_file, 'w', encoding='utf-8') as f:
+        json.dump({'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'warehouse': warehouse_name, 'stages': stages},
+                  f, indent=4, ensure_ascii=False)
+    return metrics_file
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline : concatenation, chargement dans l'entrepôt et modèles dbt de staging")
+    parser.add_argument('--warehouse', choices=['bigquery', 'duckdb'],
+                        help="Entrepôt cible (clé warehouse de config.yaml, bigquery par défaut) ; duckdb fonctionne hors ligne")
+    parser.add_argument('--database', type=Path, help=f"Fichier DuckDB du mode local (défaut : {DEFAULT_DUCKDB_PATH})")
+    parser.add_argument('--full', action='store_true', help="Recharger tout le dataset (ignorer le watermark BigQuery)")
+    parser.add_argument('--skip-concatenator', action='store_true', help="Charger les données déjà produites sans relancer le concatenator")
+    args = parser.parse_args(argv)
+
     # Initialisation du logger avec le chemin de base
-    base_folder = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\data")
-    global logger
-    logger = setup_logger(base_folder)
+    base_folder = concatenator.DEFAULT_BASE_FOLDER
+    setup_logger(base_folder)
     
     try:
-        # Chargement de la configuration
-        config = load_config()
-        
-        PROJECT_ID = config['project']['id']
-        DATASET_ID = config['project']['dataset']
-        CREDENTIALS_PATH = config['project']['credentials_path']
+        # Chargement de la configuration (facultative en mode local)
+        config = load_config(required=args.warehouse != 'duckdb')
+        warehouse_name = args.warehouse or config.get('warehouse', 'bigquery')
         
-        logger.info("Démarrage du pipeline automatisé avec configuration")
+        logger.info(f"Démarrage du pipeline automatisé avec configuration (entrepôt : {warehouse_name})")
         logger.info(f"Configuration chargée: {config}")
         
-        # Vérification des credentials
-        if not Path(CREDENTIALS_PATH).exists():
-            raise FileNotFoundError(f"Le fichier de credentials n'existe pas: {CREDENTIALS_PATH}")
-            
-        # Exécution du concatenator
-        run_concatenator()
-        
-        # Upload vers BigQuery
-        upload_to_bigquery(PROJECT_ID, DATASET_ID, CREDENTIALS_PATH)
-        
+        warehouse = create_warehouse(warehouse_name, config, args.database)
+        stages = {}
+        try:
+            # Exécution du concatenator, dans ce processus
+            if not args.skip_concatenator:
+                with concatenator.timer('concatenator', stages) as stage:
+                    result = run_concatenator(base_folder, config.get('concatenator'))
+                    stage['items'] += sum(r['rows'] for r in result['results'])
+                base_folder = result['base_folder']
+
+            # Chargement du dataset Parquet (ou des CSV combinés en local) écrit par le concatenator
+            with concatenator.timer('load', stages) as stage:
+                stats = warehouse.load(base_folder, full=args.full)
+                stage['items'] += stats.get('rows', 0)
+
+            # Modèles dbt de staging et tests de leurs schema.yml
+            dbt_result = run_dbt_models(warehouse, stages=stages)
+        finally:
+            warehouse.close()
+
+        log_pipeline_report(stages, warehouse_name, base_folder)
+        failed = [test for test in dbt_result['tests'] if test['failures']]
+        if failed:
+            logger.warning(f"{len(failed)} tests dbt en échec sur {len(dbt_result['tests'])}")
         logger.info("Pipeline terminé avec succès!")
         
     except FileNotFoundError as e:
-        logger.error(f"Erreur de credentials: {e}")
+        logger.error(f"Fichier introuvable: {e}")
         raise
     except Exception as e:
         logger.error(f"Erreur dans le pipeline: {e}")
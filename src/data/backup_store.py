@@ -0,0 +1,398 @@
+"""Sauvegardes incrémentales des CSV combinés, par lignes ajoutées ou modifiées.
+
+Chaque sauvegarde n'écrit que les lignes absentes de la sauvegarde précédente du même
+fichier, dans un pack compressé ; les lignes inchangées sont référencées par leur
+position dans les packs existants. Le coût d'une sauvegarde suit donc le delta du run
+(vols ajoutés, vols mis à jour, catégories de prix recalculées), pas la taille du fichier.
+
+Arborescence de data/backups :
+    packs/<sauvegarde>.gz             lignes nouvelles de la sauvegarde (gzip)
+    packs/<sauvegarde>.idx            empreintes xxh3 de ces lignes (uint64), pour la déduplication
+    snapshots/<sauvegarde>.json       plages [pack, première ligne, nombre de lignes] du fichier
+
+Chaque sauvegarde se restaure seule (pas de chaîne de deltas à rejouer) ; un pack est
+supprimé quand plus aucune sauvegarde conservée n'y fait référence.
+
+Usage :
+    python src/data/backup_store.py list [vols_ams_combines]
+    python src/data/backup_store.py restore vols_ams_combines_20241124_194145 [--output fichier.csv]
+    python src/data/backup_store.py prune [--keep-last 10] [--keep-daily 30]
+    python src/data/backup_store.py import-legacy [--delete]   # copies complètes *.csv existantes
+    python src/data/backup_store.py stats
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import xxhash
+
+
+KEEP_LAST = 10  # Sauvegardes les plus récentes toujours conservées, par fichier
+KEEP_DAILY = 30  # Puis la dernière sauvegarde de chaque jour sur cette période (jours)
+GC_GRACE_SECONDS = 3600  # Un pack non référencé plus récent que ce délai n'est pas supprimé (écriture en cours)
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+LINE_BATCH_SIZE = 10000  # Lignes lues et recherchées dans l'index à la fois
+
+# Ancien format : copie complète <fichier>_<YYYYMMDD_HHMMSS>.csv
+LEGACY_PATTERN = re.compile(r'^(?P<stem>.+)_(?P<timestamp>\d{8}_\d{6})\.csv$')
+
+DEFAULT_BACKUP_FOLDER = Path(__file__).resolve().parents[2] / 'data' / 'backups'
+
+
+def line_hash(line):
+    return xxhash.xxh3_64_intdigest(line)
+
+
+def append_run(runs, pack, line_no):
+    """Ajoute une ligne (pack, position) aux plages [pack, première ligne, nombre de lignes]"""
+    if runs and runs[-1][0] == pack and runs[-1][1] + runs[-1][2] == line_no:
+        runs[-1][2] += 1
+    else:
+        runs.append([pack, line_no, 1])
+
+
+def iter_line_batches(file_path, batch_size=LINE_BATCH_SIZE):
+    """Lignes d'un fichier (octets bruts) par lots, sans charger le fichier entier"""
+    batch = []
+    with open(file_path, 'rb') as f:
+        for line in f:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class PackWriter:
+    """Pack en cours d'écriture : lignes compressées au fil de l'eau, empreintes gardées pour l'index"""
+    def __init__(self, packs_path, name):
+        self.pack_file = packs_path / f'{name}.gz'
+        self.index_file = packs_path / f'{name}.idx'
+        self.tmp_file = self.pack_file.with_name(f'{self.pack_file.name}.{os.getpid()}.tmp')
+        self.stream = None
+        self.hashes = []
+        self.count = 0
+
+    def add(self, lines, hashes):
+        """Ajoute des lignes et leurs empreintes ; renvoie la position de la première dans le pack"""
+        if self.stream is None:
+            self.stream = gzip.GzipFile(self.tmp_file, 'wb', compresslevel=6, mtime=0)
+        self.stream.writelines(lines)
+        self.hashes.append(hashes)
+        position = self.count
+        self.count += len(lines)
+        return position
+
+    def close(self):
+        """Finalise le pack ; renvoie la taille occupée sur disque (0 si aucune ligne)"""
+        if self.stream is None:
+            return 0
+        self.stream.close()
+        self.tmp_file.replace(self.pack_file)
+        index_tmp = self.index_file.with_name(f'{self.index_file.name}.{os.getpid()}.tmp')
+        np.concatenate(self.hashes).tofile(index_tmp)
+        index_tmp.replace(self.index_file)
+        return self.pack_file.stat().st_size + self.index_file.stat().st_size
+
+
+class BackupManager:
+    def __init__(self, base_path):
+        self.backup_path = base_path / 'backups'
+        self.packs_path = self.backup_path / 'packs'
+        self.snapshots_path = self.backup_path / 'snapshots'
+        self.packs_path.mkdir(parents=True, exist_ok=True)
+        self.snapshots_path.mkdir(exist_ok=True)
+
+    def _read_pack(self, pack):
+        return gzip.decompress((self.packs_path / f'{pack}.gz').read_bytes()).splitlines(keepends=True)
+
+    def _read_pack_index(self, pack):
+        return np.fromfile(self.packs_path / f'{pack}.idx', dtype=np.uint64)
+
+    def _known_lines(self, snapshot):
+        """
+        Index des lignes d'une sauvegarde, trié par empreinte (tableaux numpy, ~20 octets par ligne).
+
+        Returns:
+            tuple: (empreintes triées, numéro de pack, position dans le pack, noms des packs)
+        """
+        hashes, pack_numbers, line_numbers = [], [], []
+        indexes = {}  # Pack -> (numéro, empreintes de ses lignes)
+        for pack, start, count in snapshot['runs']:
+            if pack not in indexes:
+                indexes[pack] = (len(indexes), self._read_pack_index(pack))
+            number, index = indexes[pack]
+            hashes.append(index[start:start + count])
+            pack_numbers.append(np.full(count, number, dtype=np.int32))
+            line_numbers.append(np.arange(start, start + count, dtype=np.int64))
+        packs = list(indexes)
+        if not hashes:
+            return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), packs
+        hashes = np.concatenate(hashes)
+        order = np.argsort(hashes, kind='stable')  # Stable : une ligne répétée pointe vers sa première occurrence
+        return hashes[order], np.concatenate(pack_numbers)[order], np.concatenate(line_numbers)[order], packs
+
+    def snapshots(self, stem=None):
+        """Manifestes de sauvegarde, du plus ancien au plus récent"""
+        pattern = f'{stem}_*.json' if stem else '*.json'
+        snapshots = []
+        for snapshot_file in self.snapshots_path.glob(pattern):
+            with open(snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if stem and snapshot['stem'] != stem:
+                continue
+            snapshot['name'] = snapshot_file.stem
+            snapshots.append(snapshot)
+        return sorted(snapshots, key=lambda s: (s['created_at'], s['name']))
+
+    def create_backup(self, file_path, created_at=None, stem=None):
+        """
+        Sauvegarde un fichier : seules les lignes absentes de la sauvegarde précédente sont écrites.
+
+        Args:
+            file_path (Path): fichier à sauvegarder
+            created_at (datetime): date de la sauvegarde (maintenant si None)
+            stem (str): nom du fichier sauvegardé (file_path.stem si None)
+
+        Returns:
+            Path: manifeste de la sauvegarde (celui de la précédente si le contenu n'a pas changé)
+        """
+        file_path = Path(file_path)
+        created_at = created_at or datetime.now()
+        stem = stem or file_path.stem
+
+        # Première lecture : empreinte du fichier, pour ne rien écrire s'il n'a pas changé
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                content_hash.update(block)
+        content_hash = content_hash.hexdigest()
+
+        previous = self.snapshots(stem)
+        if previous and previous[-1]['content_hash'] == content_hash:
+            return self.snapshots_path / f"{previous[-1]['name']}.json"
+
+        name = f"{stem}_{created_at.strftime(TIMESTAMP_FORMAT)}"
+        suffix = 1
+        while (self.snapshots_path / f'{name}.json').exists():
+            name = f"{stem}_{created_at.strftime(TIMESTAMP_FORMAT)}_{suffix}"
+            suffix += 1
+
+        # Seconde lecture par lots : chaque ligne est cherchée dans l'index de la sauvegarde précédente
+        known_hashes, known_packs, known_lines, packs = self._known_lines(previous[-1] if previous else {'runs': []})
+        runs = []
+        line_count = 0
+        writer = PackWriter(self.packs_path, name)
+        for batch in iter_line_batches(file_path):
+            line_count += len(batch)
+            hashes = np.array([line_hash(line) for line in batch], dtype=np.uint64)
+            positions = np.searchsorted(known_hashes, hashes)
+            positions[positions == len(known_hashes)] = 0
+            found = (known_hashes[positions] == hashes) if len(known_hashes) else np.zeros(len(batch), dtype=bool)
+            if not found.all():
+                new_position = writer.add([line for line, is_known in zip(batch, found) if not is_known], hashes[~found])
+            for is_known, position in zip(found.tolist(), positions.tolist()):
+                if is_known:
+                    append_run(runs, packs[known_packs[position]], int(known_lines[position]))
+                else:
+                    append_run(runs, name, new_position)
+                    new_position += 1
+
+        new_lines = writer.count
+        stored_bytes = writer.close()
+        snapshot = {
+            'stem': stem,
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'size': file_path.stat().st_size,
+            'lines': line_count,
+            'new_lines': new_lines,
+            'stored_bytes': stored_bytes,
+            'content_hash': content_hash,
+            'runs': runs,
+        }
+        # Fichier temporaire puis remplacement : snapshots() ne lit jamais un manifeste à moitié écrit
+        snapshot_file = self.snapshots_path / f'{name}.json'
+        tmp_file = snapshot_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        tmp_file.replace(snapshot_file)
+        return snapshot_file
+
+    def restore(self, name, output_file):
+        """
+        Reconstruit le fichier d'une sauvegarde et vérifie son empreinte.
+
+        Args:
+            name (str): nom du manifeste (sans .json)
+            output_file (Path): fichier à écrire
+
+        Returns:
+            dict: manifeste de la sauvegarde restaurée
+        """
+        with open(self.snapshots_path / f'{name}.json', 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+
+        output_file = Path(output_file)
+        tmp_file = output_file.with_name(f'{output_file.name}.tmp')
+        content_hash = hashlib.blake2b(digest_size=16)
+        packs = {}
+        with open(tmp_file, 'wb') as out:
+            for pack, start, count in snapshot['runs']:
+                if pack not in packs:
+                    packs[pack] = self._read_pack(pack)
+                for line in packs[pack][start:start + count]:
+                    content_hash.update(line)
+                    out.write(line)
+        if content_hash.hexdigest() != snapshot['content_hash']:
+            tmp_file.unlink()
+            raise ValueError(f"Empreinte invalide pour la sauvegarde {name}: packs corrompus")
+        tmp_file.replace(output_file)
+        return snapshot
+
+    def prune(self, stem=None, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY, now=None):
+        """
+        Politique de rétention : les keep_last dernières sauvegardes de chaque fichier,
+        puis la dernière de chaque jour sur keep_daily jours ; les autres sont supprimées
+        ainsi que les packs qui ne sont plus référencés.
+
+        Avec stem, seuls les sauvegardes et packs de ce fichier sont examinés : les processus
+        qui sauvegardent d'autres fichiers en parallèle ne sont pas concernés.
+
+        Returns:
+            tuple: (sauvegardes supprimées, packs supprimés)
+        """
+        now = now or datetime.now()
+        by_stem = {}
+        for snapshot in self.snapshots(stem):
+            by_stem.setdefault(snapshot['stem'], []).append(snapshot)
+
+        removed = 0
+        for snapshots in by_stem.values():
+            keep = {s['name'] for s in snapshots[-keep_last:]} if keep_last else set()
+            daily = {}
+            for snapshot in snapshots:
+                created_at = datetime.fromisoformat(snapshot['created_at'])
+                if now - created_at <= timedelta(days=keep_daily):
+                    daily[created_at.date()] = snapshot['name']
+            keep.update(daily.values())
+            for snapshot in snapshots:
+                if snapshot['name'] not in keep:
+                    (self.snapshots_path / f"{snapshot['name']}.json").unlink()
+                    removed += 1
+
+        return removed, self.collect_garbage(stem)
+
+    def collect_garbage(self, stem=None):
+        """
+        Supprime les packs référencés par aucune sauvegarde.
+
+        Un pack porte le nom de la sauvegarde qui l'a créé et n'est référencé que par les
+        sauvegardes du même fichier : avec stem, seuls les packs de ce fichier sont examinés.
+        """
+        referenced = {pack for snapshot in self.snapshots(stem) for pack, _, _ in snapshot['runs']}
+        stem_pack = re.compile(rf'^{re.escape(stem)}_\d{{8}}_\d{{6}}(?:_\d+)?$') if stem else None
+        deadline = time.time() - GC_GRACE_SECONDS
+        removed = 0
+        for pack_file in self.packs_path.glob(f'{stem}_*.gz' if stem else '*.gz'):
+            if stem_pack and not stem_pack.match(pack_file.stem):
+                continue
+            if pack_file.stem not in referenced and pack_file.stat().st_mtime < deadline:
+                pack_file.unlink()
+                pack_file.with_suffix('.idx').unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def import_legacy(self, delete=False):
+        """
+        Convertit les copies complètes de l'ancien format (backups/*.csv) en sauvegardes incrémentales.
+
+        Returns:
+            int: nombre de fichiers importés
+        """
+        legacy_files = []
+        for legacy_file in self.backup_path.glob('*.csv'):
+            match = LEGACY_PATTERN.match(legacy_file.name)
+            if match:
+                created_at = datetime.strptime(match['timestamp'], TIMESTAMP_FORMAT)
+                legacy_files.append((created_at, match['stem'], legacy_file))
+
+        # Le manifeste porte le nom du fichier combiné d'origine, pas celui de la copie
+        for created_at, stem, legacy_file in sorted(legacy_files):
+            self.create_backup(legacy_file, created_at, stem)
+            if delete:
+                legacy_file.unlink()
+        return len(legacy_files)
+
+    def stats(self):
+        """Taille logique des sauvegardes et taille réellement occupée par les packs"""
+        snapshots = self.snapshots()
+        pack_files = list(self.packs_path.glob('*.gz')) + list(self.packs_path.glob('*.idx'))
+        return {
+            'snapshots': len(snapshots),
+            'files': len({s['stem'] for s in snapshots}),
+            'logical_bytes': sum(s['size'] for s in snapshots),
+            'stored_bytes': sum(f.stat().st_size for f in pack_files),
+            'packs': sum(1 for f in pack_files if f.suffix == '.gz'),
+        }
+
+
+def format_size(size):
+    for unit in ['o', 'Ko', 'Mo', 'Go']:
+        if size < 1024 or unit == 'Go':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sauvegardes incrémentales des CSV combinés")
+    parser.add_argument('--backup-folder', type=Path, default=DEFAULT_BACKUP_FOLDER, help="Dossier data/backups")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="Lister les sauvegardes")
+    list_parser.add_argument('stem', nargs='?', help="Nom du fichier combiné, ex. vols_ams_combines")
+
+    restore_parser = subparsers.add_parser('restore', help="Restaurer une sauvegarde")
+    restore_parser.add_argument('name', help="Nom de la sauvegarde (voir list)")
+    restore_parser.add_argument('--output', type=Path, help="Fichier à écrire (<nom>.csv dans le dossier courant par défaut)")
+
+    prune_parser = subparsers.add_parser('prune', help="Appliquer la politique de rétention")
+    prune_parser.add_argument('--keep-last', type=int, default=KEEP_LAST)
+    prune_parser.add_argument('--keep-daily', type=int, default=KEEP_DAILY)
+
+    import_parser = subparsers.add_parser('import-legacy', help="Convertir les copies complètes *.csv")
+    import_parser.add_argument('--delete', action='store_true', help="Supprimer les copies une fois importées")
+
+    subparsers.add_parser('stats', help="Taille logique et taille stockée")
+    args = parser.parse_args(argv)
+
+    manager = BackupManager(args.backup_folder.parent)
+    if args.command == 'list':
+        for snapshot in manager.snapshots(args.stem):
+            print(f"{snapshot['name']:<50} {snapshot['created_at']}  {snapshot['lines']:>8} lignes  "
+                  f"{format_size(snapshot['size']):>10}  +{snapshot['new_lines']} lignes ({format_size(snapshot['stored_bytes'])})")
+    elif args.command == 'restore':
+        output_file = args.output or Path(f"{args.name}.csv")
+        snapshot = manager.restore(args.name, output_file)
+        print(f"{args.name} restaurée dans {output_file} ({snapshot['lines']} lignes)")
+    elif args.command == 'prune':
+        snapshots, packs = manager.prune(keep_last=args.keep_last, keep_daily=args.keep_daily)
+        print(f"{snapshots} sauvegardes et {packs} packs supprimés")
+    elif args.command == 'import-legacy':
+        count = manager.import_legacy(delete=args.delete)
+        print(f"{count} copies importées")
+
+    stats = manager.stats()
+    print(f"{stats['snapshots']} sauvegardes ({stats['files']} fichiers) : {format_size(stats['logical_bytes'])} "
+          f"-> {format_size(stats['stored_bytes'])} stockés dans {stats['packs']} packs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Chargement incrémental du dataset Parquet (data/parquet) dans BigQuery.
+
+Table cible unique, partitionnée par search_date et clusterisée par destination
+(source combined_flights du projet dbt). Un run ne charge que les partitions Parquet
+(destination, search_date) ajoutées, réécrites avec un contenu différent ou supprimées
+depuis le dernier chargement réussi, d'après le fichier de watermark local
+data/bigquery_watermark.json (empreinte du contenu de chaque partition chargée).
+
+Déroulement :
+    1. une table de staging temporaire est créée avec le schéma explicite BIGQUERY_SCHEMA ;
+    2. chaque partition modifiée est sérialisée en Parquet et chargée dans le staging :
+       tous les jobs sont soumis en parallèle, puis attendus ;
+    3. un MERGE remplace dans la cible les partitions modifiées par le contenu du staging ;
+    4. le watermark n'est écrit qu'après le succès du MERGE.
+
+Le client BigQuery est injecté (BigQueryLoader(client, ...)) : n'importe quel objet
+exposant create_table, delete_table, load_table_from_file et query convient.
+"""
+import hashlib
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+from src.data.parquet_store import FLIGHT_SCHEMA, PARQUET_FOLDER, build_filter, flights_dataset
+
+
+TABLE_NAME = 'combined_flights'  # Table cible, source bigquery_raw.combined_flights du projet dbt
+WATERMARK_NAME = 'bigquery_watermark.json'  # Partitions chargées avec succès, dans base_folder
+LOAD_WORKERS = 4  # Partitions sérialisées et envoyées simultanément
+STAGING_EXPIRATION = timedelta(days=1)  # Un staging laissé par un run interrompu expire seul
+
+logger = logging.getLogger('automated_pipeline.bigquery_loader')
+
+
+def bigquery_type(arrow_type):
+    """Type BigQuery d'une colonne du schéma Parquet"""
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if pa.types.is_string(arrow_type):
+        return 'STRING'
+    if pa.types.is_date(arrow_type):
+        return 'DATE'
+    if pa.types.is_timestamp(arrow_type):
+        return 'TIMESTAMP'
+    if pa.types.is_boolean(arrow_type):
+        return 'BOOLEAN'
+    if pa.types.is_integer(arrow_type):
+        return 'INTEGER'
+    if pa.types.is_floating(arrow_type):
+        return 'FLOAT'
+    raise ValueError(f"Type Arrow sans équivalent BigQuery : {arrow_type}")
+
+
+# search_date est une chaîne dans le dataset (colonne de partition) : DATE dans BigQuery
+LOAD_SCHEMA = pa.schema([
+    pa.field(field.name, pa.date32()) if field.name == 'search_date'
+    else pa.field(field.name, pa.timestamp('s', tz='UTC')) if pa.types.is_timestamp(field.type)
+    else pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type)
+    else field
+    for field in FLIGHT_SCHEMA
+])
+BIGQUERY_SCHEMA = [(field.name, bigquery_type(field.type)) for field in LOAD_SCHEMA]
+
+
+def schema_fields():
+    return [bigquery.SchemaField(name, field_type, mode='NULLABLE') for name, field_type in BIGQUERY_SCHEMA]
+
+
+def hash_file(file_path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_watermark(path):
+    path = Path(path)
+    if not path.exists():
+        return {'table': None, 'partitions': {}, 'files': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermark(watermark, path):
+    """Écrit le watermark (fichier temporaire puis remplacement)"""
+    path = Path(path)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, indent=4, ensure_ascii=False)
+    tmp_path.replace(path)
+
+
+def partition_fingerprints(root, known_files=None):
+    """
+    Empreinte du contenu de chaque partition du dataset Parquet.
+
+    Le concatenator réécrit toutes les partitions d'une destination à chaque run :
+    l'empreinte porte sur le contenu des fichiers, pas sur leur mtime. Un fichier dont
+    la taille et le mtime n'ont pas changé depuis le watermark n'est pas relu.
+
+    Args:
+        known_files (dict): chemin -> {size, mtime_ns, hash} du dernier chargement
+
+    Returns:
+        tuple: ({'AMS/2024-11-19': empreinte}, {chemin: {size, mtime_ns, hash}})
+    """
+    root = Path(root)
+    known_files = known_files or {}
+    partitions = {}
+    files = {}
+    for folder in sorted(root.glob('destination=*/search_date=*')):
+        parquet_files = sorted(folder.glob('*.parquet'))
+        if not parquet_files:
+            continue
+        destination = folder.parent.name.split('=', 1)[1]
+        search_date = folder.name.split('=', 1)[1]
+        digest = hashlib.blake2b(digest_size=16)
+        for parquet_file in parquet_files:
+            path = parquet_file.relative_to(root).as_posix()
+            stat = parquet_file.stat()
+            known = known_files.get(path)
+            if known and (known['size'], known['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                content_hash = known['hash']
+            else:
+                content_hash = hash_file(parquet_file)
+            files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+            digest.update(f"{parquet_file.name}:{content_hash};".encode())
+        partitions[f'{destination}/{search_date}'] = digest.hexdigest()
+    return partitions, files
+
+
+def changed_partitions(current, loaded):
+    """Partitions à recharger (nouvelles ou modifiées) et partitions disparues du dataset"""
+    changed = sorted(key for key, fingerprint in current.items() if loaded.get(key) != fingerprint)
+    removed = sorted(set(loaded) - set(current))
+    return changed, removed
+
+
+def partition_parquet(root, partition):
+    """Contenu d'une partition au schéma de chargement, sérialisé en Parquet (tampon mémoire)"""
+    destination, search_date = partition.split('/', 1)
+    table = flights_dataset(root).to_table(filter=build_filter([destination], search_date, search_date))
+    table = pa.Table.from_arrays(
+        [column.cast(field.type) if field.name != 'search_date'
+         else pa.array([datetime.strptime(search_date, '%Y-%m-%d').date()] * table.num_rows, type=pa.date32())
+         for column, field in zip(table.select(LOAD_SCHEMA.names).columns, LOAD_SCHEMA)],
+        schema=LOAD_SCHEMA
+    )
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression='snappy')
+    buffer.seek(0)
+    return buffer, table.num_rows
+
+
+class BigQueryLoader:
+    def __init__(self, client, project_id, dataset_id, base_folder, table_name=TABLE_NAME, workers=LOAD_WORKERS):
+        self.client = client
+        self.table_id = f"{project_id}.{dataset_id}.{table_name}"
+        self.base_folder = Path(base_folder)
+        self.root = self.base_folder / PARQUET_FOLDER
+        self.watermark_path = self.base_folder / WATERMARK_NAME
+        self.workers = workers
+
+    def ensure_table(self, table_id, expires=False):
+        table = bigquery.Table(table_id, schema=schema_fields())
+        table.time_partitioning = bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.DAY, field='search_date')
+        table.clustering_fields = ['destination']
+        if expires:
+            table.expires = datetime.now(timezone.utc) + STAGING_EXPIRATION
+        return self.client.create_table(table, exists_ok=True)
+
+    def submit_partition(self, staging_id, partition):
+        """Sérialise une partition et soumet son job de chargement (sans l'attendre)"""
+        buffer, rows = partition_parquet(self.root, partition)
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            schema=schema_fields(),
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        job = self.client.load_table_from_file(buffer, staging_id, job_config=job_config)
+        logger.info(f"Job de chargement soumis pour {partition} ({rows} lignes, {buffer.getbuffer().nbytes} octets)")
+        return job, rows, buffer.getbuffer().nbytes
+
+    def merge_partitions(self, staging_id, partitions):
+        """Remplace dans la cible les partitions données par les lignes du staging"""
+        search_dates = sorted({partition.split('/', 1)[1] for partition in partitions})
+        query = f"""
+            MERGE `{self.table_id}` T
+            USING `{staging_id}` S
+            ON FALSE
+            WHEN NOT MATCHED BY SOURCE
+                AND T.search_date IN UNNEST(@search_dates)
+                AND CONCAT(T.destination, '/', CAST(T.search_date AS STRING)) IN UNNEST(@partitions)
+                THEN DELETE
+            WHEN NOT MATCHED BY TARGET THEN INSERT ROW
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter('partitions', 'STRING', list(partitions)),
+            bigquery.ArrayQueryParameter('search_dates', 'DATE', search_dates),
+        ])
+        job = self.client.query(query, job_config=job_config)
+        job.result()
+        return job
+
+    def load(self, full=False):
+        """
+        Charge les partitions modifiées depuis le dernier chargement réussi.
+
+        Args:
+            full (bool): ignorer le watermark et recharger tout le dataset
+
+        Returns:
+            dict: partitions chargées et supprimées, lignes et octets envoyés
+        """
+        if not self.root.exists():
+            raise FileNotFoundError(f"Dataset Parquet introuvable: {self.root}")
+
+        watermark = load_watermark(self.watermark_path)
+        if full or watermark.get('table') != self.table_id:
+            watermark = {'table': self.table_id, 'partitions': {}, 'files': {}}
+        current, files = partition_fingerprints(self.root, watermark['files'])
+        changed, removed = changed_partitions(current, watermark['partitions'])
+        stats = {'partitions': len(changed), 'removed': len(removed), 'unchanged': len(current) - len(changed),
+                 'rows': 0, 'bytes': 0}
+        logger.info(f"{len(current)} partitions Parquet : {len(changed)} à charger, {len(removed)} supprimées, "
+                    f"{stats['unchanged']} inchangées")
+        if not changed and not removed:
+            return stats
+
+        self.ensure_table(self.table_id)
+        staging_id = f"{self.table_id}_staging_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.ensure_table(staging_id, expires=True)
+        try:
+            # Tous les jobs sont soumis avant d'en attendre un seul
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                submitted = list(executor.map(lambda partition: self.submit_partition(staging_id, partition), changed))
+            for partition, (job, rows, size) in zip(changed, submitted):
+                try:
+                    job.result()
+                except Exception as e:
+                    logger.error(f"Erreur lors du chargement de {partition}: {e}")
+                    raise
+                stats['rows'] += rows
+                stats['bytes'] += size
+
+            self.merge_partitions(staging_id, changed + removed)
+            logger.info(f"MERGE terminé dans {self.table_id}: {stats['rows']} lignes, "
+                        f"{len(changed)} partitions remplacées, {len(removed)} supprimées")
+        finally:
+            self.client.delete_table(staging_id, not_found_ok=True)
+
+        watermark.update({'partitions': current, 'files': files, 'loaded_at': datetime.now().isoformat()})
+        save_watermark(watermark, self.watermark_path)
+        return stats
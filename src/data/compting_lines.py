@@ -1,6 +1,12 @@
+import sys
 import pandas as pd
 from pathlib import Path
 
+# Permet l'import de src.* quand le script est lancé directement
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.data.parquet_store import count_flights
+
 def count_lines_in_folder(folder_path: str) -> dict:
     """
     Compte le nombre de lignes dans chaque fichier CSV du dossier spécifié
@@ -35,6 +41,35 @@ def count_lines_in_folder(folder_path: str) -> dict:
     
     return results
 
+def count_rows_in_parquet(folder_path: str) -> dict:
+    """
+    Compte le nombre de vols par destination du dataset Parquet partitionné.
+
+    Seules les métadonnées des fichiers sont lues, pas les données.
+
+    Args:
+        folder_path (str): Racine du dataset Parquet (ex. data/parquet)
+
+    Returns:
+        dict: Dictionnaire avec les destinations et leur nombre de lignes
+    """
+    folder = Path(folder_path)
+    if not folder.exists():
+        raise FileNotFoundError(f"Le dossier {folder_path} n'existe pas")
+
+    results = count_flights(folder)
+    results['TOTAL'] = sum(results.values())
+    return results
+
+def print_counts(results: dict):
+    print("-" * 40)
+    for filename, count in results.items():
+        if filename == 'TOTAL':
+            print("-" * 40)
+            print(f"TOTAL: {count:,} lignes")
+        else:
+            print(f"{filename}: {count:,} lignes")
+
 def main():
     # Chemin vers votre dossier combined_old
     folder_path = "data/combined"
@@ -44,13 +79,12 @@ def main():
         
         # Afficher les résultats
         print("\nNombre de lignes par fichier:")
-        print("-" * 40)
-        for filename, count in results.items():
-            if filename == 'TOTAL':
-                print("-" * 40)
-                print(f"TOTAL: {count:,} lignes")
-            else:
-                print(f"{filename}: {count:,} lignes")
+        print_counts(results)
+
+        parquet_path = Path(folder_path).parent / 'parquet'
+        if parquet_path.exists():
+            print("\nNombre de lignes par destination (Parquet):")
+            print_counts(count_rows_in_parquet(parquet_path))
                 
     except Exception as e:
         print(f"Une erreur est survenue: {e}")
@@ -1,4 +1,6 @@
+import argparse
 import json
+import numpy as np
 import pandas as pd
 import os
 from pathlib import Path
@@ -7,16 +9,54 @@ import logging
 from datetime import datetime
 import time
 from contextlib import contextmanager
-import shutil
-from geopy.geocoders import Nominatim
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import sqlite3
+import tempfile
 from geopy.distance import geodesic
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from functools import lru_cache
+import sys
+import xxhash
+import psutil
+import threading
+
+# Permet l'import de src.* quand le script est lancé directement
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.data.backup_store import BackupManager
+from src.data.geocoding import (CITY_TABLE_PATH, DEFAULT_COUNTRY, city_coordinates, geocode_city,
+                                load_city_table, route_distances, save_city_table)
+from src.data.parquet_store import PARQUET_FOLDER, write_flights
+from src.data.raw_store import destination_files, find_destinations
 
 
 # Coordonnées fixes de Bordeaux
 BORDEAUX_COORDS = (44.837789, -0.57918)  # Latitude, Longitude
 
+# Dossier data/ du projet, modifiable avec --base-folder
+DEFAULT_BASE_FOLDER = Path(__file__).resolve().parents[2] / 'data'
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Processus du pool d'ingestion
+CHUNK_SIZE = 5000  # Vols aplatis accumulés avant conversion en DataFrame
+MANIFEST_NAME = 'ingestion_manifest.sqlite'  # Manifeste des fichiers JSON déjà ingérés, dans base_folder
+FLIGHT_ID_MASK = (1 << 63) - 1  # flight_id tient dans un INT64 positif (pandas, BigQuery)
+MERGE_MODES = ['auto', 'memory', 'external']  # Fusion avec le CSV combiné existant (voir use_external_merge)
+EXTERNAL_MERGE_BYTES = 64 << 20  # En mode auto, fusion par blocs au-delà de cette taille (fichier existant ou nouveaux vols)
+MERGE_CHUNK_ROWS = 20000  # Lignes du fichier existant lues à la fois en fusion par blocs
+ID_SAMPLE_ROWS = 1000  # Lignes du fichier existant lues pour vérifier le schéma des flight_id
+PRICE_LABELS = ['cheap', 'standard', 'high']
+# Types numériques écrits dans les CSV : entiers pouvant manquer (sans ".0") et durées de correspondance
+CSV_NUMERIC_TYPES = {'duration': 'Int64', 'days_until_flight': 'Int64',
+                     'layover_duration': 'float64', 'second_flight_duration': 'float64'}
+DROPPED_COLUMNS = ['flight_number', 'equipment_type']  # Colonnes retirées avant l'écriture du CSV combiné
+# Étapes instrumentées, dans l'ordre du traitement (discovery est mesurée une fois par run, dans main)
+STAGES = ['discovery', 'parse', 'flatten', 'clean', 'ids', 'backup', 'dedup', 'geocode', 'write', 'parquet']
+RSS_SAMPLE_INTERVAL = 0.05  # Période d'échantillonnage de la mémoire résidente (secondes)
+REGRESSION_THRESHOLD = 0.25  # Écart relatif signalé comme régression entre deux runs
+REGRESSION_MIN_SECONDS = 0.5  # Étapes plus courtes ignorées dans la comparaison (bruit de mesure)
+
+# Les handlers sont ajoutés par setup_logger dans run() : importer le module n'écrit rien
+logger = logging.getLogger('concatenator')
+
 # Déplacer le dictionnaire city_country_mapping au niveau global pour le rendre accessible partout
 city_country_mapping = {
     'London': 'United Kingdom',
@@ -82,10 +122,16 @@ city_country_mapping = {
     'Nairobi': 'Kenya'
 }
 
-@lru_cache(maxsize=128)
+# Table ville -> coordonnées livrée avec le dépôt et distances depuis Bordeaux, calculées une fois par processus
+CITY_TABLE = load_city_table()
+ROUTE_DISTANCES = route_distances(CITY_TABLE, BORDEAUX_COORDS)
+# Villes géocodées en réseau pendant l'exécution : renvoyées au processus principal qui complète la table
+NEW_CITIES = {}
+
+@lru_cache(maxsize=None)
 def get_city_coordinates(city_name):
     """
-    Obtient les coordonnées d'une ville avec mise en cache.
+    Obtient les coordonnées d'une ville : table locale d'abord, Nominatim en dernier recours.
     
     Args:
         city_name (str): Nom de la ville
@@ -95,30 +141,36 @@ def get_city_coordinates(city_name):
     """
     if not city_name or city_name == 'N/A':
         return None
-    
-    try:
-        geolocator = Nominatim(user_agent="flight_scraper")
-        
-        # Utiliser le mapping ville-pays
-        if city_name in city_country_mapping:
-            search_query = f"{city_name}, {city_country_mapping[city_name]}"
-        else:
-            search_query = f"{city_name}, France"  # Par défaut
-            logger.warning(f"Ville non trouvée dans le mapping: {city_name}, recherche avec pays par défaut")
-            
-        logger.debug(f"Recherche de géolocalisation pour: {search_query}")
-        location = geolocator.geocode(search_query)
-        
-        if location:
-            logger.debug(f"Coordonnées trouvées pour {search_query}: {location.latitude}, {location.longitude}")
-            return (location.latitude, location.longitude)
-            
-        logger.warning(f"Aucune coordonnée trouvée pour {search_query}")
-        return None
-        
-    except (GeocoderTimedOut, GeocoderUnavailable) as e:
-        logger.error(f"Erreur de géocodage pour {city_name}: {str(e)}")
-        return None
+
+    coords = city_coordinates(CITY_TABLE, city_name)
+    if coords is not None:
+        return coords
+
+    logger.warning(f"Ville absente de la table {CITY_TABLE_PATH.name}: {city_name}, géocodage en ligne")
+    if city_name not in city_country_mapping:
+        logger.warning(f"Ville non trouvée dans le mapping: {city_name}, recherche avec pays par défaut")
+    country = city_country_mapping.get(city_name)
+    coords = geocode_city(city_name, country)
+    if coords is not None:
+        NEW_CITIES[city_name] = {'code': None, 'country': country or DEFAULT_COUNTRY,
+                                 'latitude': coords[0], 'longitude': coords[1]}
+    return coords
+
+@lru_cache(maxsize=None)
+def destination_geo(city_name):
+    """
+    Coordonnées formatées et distance depuis Bordeaux d'une ville, calculées une seule fois.
+
+    Returns:
+        tuple: (destination_coordinates, distance_km), (None, None) si la ville est inconnue
+    """
+    coords = get_city_coordinates(city_name)
+    if coords is None:
+        return None, None
+    distance = ROUTE_DISTANCES.get(city_name)
+    if distance is None:
+        distance = round(geodesic(BORDEAUX_COORDS, coords).kilometers, 2)
+    return format_coordinates(coords), distance
 
 def format_coordinates(coords):
     """
@@ -135,32 +187,28 @@ def calculate_distance_and_coordinates(row):
     Returns:
         dict: Dictionnaire contenant les coordonnées et la distance
     """
-    origin_coords = BORDEAUX_COORDS
-    dest_coords = get_city_coordinates(row['destination_city'])
-    
+    destination_coordinates, distance_km = destination_geo(row['destination_city'])
     result = {
-        'origin_coordinates': format_coordinates(origin_coords),
-        'destination_coordinates': format_coordinates(dest_coords),
-        'distance_km': None
+        'origin_coordinates': format_coordinates(BORDEAUX_COORDS),
+        'destination_coordinates': destination_coordinates,
+        'distance_km': distance_km
     }
-    
-    if origin_coords and dest_coords:
-        result['distance_km'] = round(geodesic(origin_coords, dest_coords).kilometers, 2)
-    
     return pd.Series(result)
 
 # Configuration du logging
-def setup_logger(base_folder):
+def setup_logger(base_folder, log_filename=None):
     # Créer un dossier pour les logs s'il n'existe pas
     log_folder = base_folder / 'logs'
     log_folder.mkdir(exist_ok=True)
     
     # Créer un nom de fichier avec la date
-    log_filename = log_folder / f'concatenator_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
+    if log_filename is None:
+        log_filename = log_folder / f'concatenator_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
     
     # Configuration du logger
     logger = logging.getLogger('concatenator')
     logger.setLevel(logging.INFO)
+    logger.handlers.clear()
     
     # Handler pour fichier
     file_handler = logging.FileHandler(log_filename, encoding='utf-8')
@@ -181,10 +229,6 @@ def setup_logger(base_folder):
     
     return logger
 
-# Initialisation du logger (à mettre après la définition de base_folder)
-base_folder = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\data")
-logger = setup_logger(base_folder)
-
 def clean_time_format(time_str):
     if not isinstance(time_str, str) or time_str == 'N/A':
         return 'N/A'
@@ -202,17 +246,93 @@ def split_time(time_str):
         return parts[0].strip(), parts[1].strip()
     return 'N/A', 'N/A'
 
-class BackupManager:
-    def __init__(self, base_path):
-        self.backup_path = base_path / 'backups'
-        self.backup_path.mkdir(exist_ok=True)
+def hash_file(file_path, block_size=1 << 20):
+    """Empreinte du contenu d'un fichier (blake2b)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IngestionManifest:
+    """
+    Fichiers JSON déjà ingérés (chemin, taille, mtime, empreinte du contenu).
+
+    Un fichier n'est ré-ingéré que si sa taille ou son mtime ont changé et que
+    son contenu diffère de la dernière ingestion.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                path TEXT PRIMARY KEY,
+                destination TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                rows INTEGER NOT NULL DEFAULT 0,
+                ingested_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def pending_files(self, base_folder, destination, force=False):
+        """
+        Fichiers nouveaux ou modifiés d'une destination.
+
+        Returns:
+            list: enregistrements {path, destination, size, mtime_ns, content_hash} à ingérer
+        """
+        known = {path: (size, mtime_ns, content_hash) for path, size, mtime_ns, content_hash in self.conn.execute(
+            "SELECT path, size, mtime_ns, content_hash FROM ingested_files WHERE destination = ?", (destination,))}
+        pending = []
+        unchanged_stats = []
+        for json_file in destination_files(base_folder, destination):
+            path = json_file.relative_to(base_folder).as_posix()
+            stat = json_file.stat()
+            previous = known.get(path)
+            if not force and previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            content_hash = hash_file(json_file)
+            if not force and previous and previous[2] == content_hash:
+                # Fichier touché mais contenu identique : on met seulement à jour taille et mtime
+                unchanged_stats.append((stat.st_size, stat.st_mtime_ns, path))
+                continue
+            pending.append({'path': path, 'destination': destination, 'size': stat.st_size,
+                            'mtime_ns': stat.st_mtime_ns, 'content_hash': content_hash})
+        if unchanged_stats:
+            with self.conn:
+                self.conn.executemany("UPDATE ingested_files SET size = ?, mtime_ns = ? WHERE path = ?", unchanged_stats)
+        return pending
+
+    def record(self, records):
+        """Enregistre des fichiers ingérés avec succès"""
+        ingested_at = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO ingested_files (path, destination, size, mtime_ns, content_hash, rows, ingested_at)
+                VALUES (:path, :destination, :size, :mtime_ns, :content_hash, :rows, :ingested_at)
+                ON CONFLICT (path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, content_hash = excluded.content_hash,
+                    rows = excluded.rows, ingested_at = excluded.ingested_at
+            """, [dict(record, ingested_at=ingested_at) for record in records])
+
+    def forget(self, folders):
+        """Oublie les fichiers de dossiers migrés ou supprimés (chemins commençant par <dossier>/)"""
+        with self.conn:
+            for folder in folders:
+                self.conn.execute("DELETE FROM ingested_files WHERE path LIKE ? ESCAPE '\\'",
+                                  (folder.replace('_', '\\_') + '/%',))
+
+    def summary(self):
+        files, rows = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM ingested_files").fetchone()
+        return {'files': files, 'rows': rows}
+
+    def close(self):
+        self.conn.close()
 
-    def create_backup(self, file_path):
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = self.backup_path / f"{file_path.stem}_{timestamp}{file_path.suffix}"
-        shutil.copy2(file_path, backup_file)
-        return backup_file
-    
 def clean_price(price, destination, file_name):
     try:
         if pd.isna(price):
@@ -249,6 +369,9 @@ def flatten_flight_data(json_data, file_name, destination):
         }
         
         logger.debug(f"Données de base extraites pour {file_name}: {base_data}")
+
+        # Même ville pour tous les vols du fichier : une seule recherche dans la table
+        destination_coordinates, distance_km = destination_geo(base_data['destination_city'])
         
         for idx, flight in enumerate(json_data['flights'], 1):
             try:
@@ -279,9 +402,8 @@ def flatten_flight_data(json_data, file_name, destination):
                     'flight_connection_company': connection_airline,
                     'fare_class': flight.get('fare_class', 'N/A'),
                     'origin_coordinates': format_coordinates(BORDEAUX_COORDS),
-                    'destination_coordinates': format_coordinates(get_city_coordinates(row['destination_city'])),
-                    'distance_km': round(geodesic(BORDEAUX_COORDS, get_city_coordinates(row['destination_city'])).kilometers, 2) 
-                                 if get_city_coordinates(row['destination_city']) else None
+                    'destination_coordinates': destination_coordinates,
+                    'distance_km': distance_km
                 }
                 row.update(flight_data)
                 flattened_data.append(row)
@@ -295,148 +417,497 @@ def flatten_flight_data(json_data, file_name, destination):
         logger.error(f"[{destination}] Erreur lors du traitement global du fichier {file_name}: {str(e)}")
         return []
 
-# Remplacer la partie du traitement des fichiers par :
-base_folder = Path(r"C:\Users\antob\Documents\Arctusol\Scrapping_project\Scraping\data")
-output_folder = base_folder / 'final_csv'  # Nouveau dossier de sortie
+class MemorySampler:
+    """
+    Échantillonne la mémoire résidente du processus dans un thread.
 
-# Création du dossier s'il n'existe pas
-output_folder.mkdir(exist_ok=True)
+    Pendant qu'un échantillonneur est actif (MemorySampler.active), timer() mesure le
+    pic de RSS de chaque étape, y compris entre deux appels (ex. au milieu d'un pd.concat).
+    """
+    active = None
 
-# Trouver automatiquement tous les dossiers commençant par 3 lettres
-destination_folders = [folder.name for folder in base_folder.iterdir() 
-                      if folder.is_dir() and folder.name[:3].isalpha()]
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.open_peaks = []  # Pic de chaque étape en cours (étapes imbriquées possibles)
+        self.peak = 0.0
+        self.samples = 0
 
-logger.info(f"Dossiers de destination trouvés : {', '.join(destination_folders)}")
+    def sample(self):
+        rss = self.process.memory_info().rss / (1 << 20)
+        with self.lock:
+            self.samples += 1
+            self.peak = max(self.peak, rss)
+            self.open_peaks = [max(peak, rss) for peak in self.open_peaks]
+        return rss
 
-for destination in destination_folders:
-    destination_path = base_folder / destination
-    logger.info(f"\n=== Début du traitement du dossier {destination} ===")
-    
-    all_data = []
-    
-    for json_file in destination_path.glob('*.json'):
+    def begin_stage(self):
+        rss = self.sample()
+        with self.lock:
+            self.open_peaks.append(rss)
+
+    def end_stage(self):
+        """Pic de RSS (Mo) de l'étape qui se termine"""
+        self.sample()
+        with self.lock:
+            return self.open_peaks.pop()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        MemorySampler.active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        MemorySampler.active = None
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+
+def new_stage():
+    return {'seconds': 0.0, 'calls': 0, 'items': 0, 'peak_rss_mb': 0.0}
+
+@contextmanager
+def timer(description, stages=None):
+    """
+    Chronomètre une étape.
+
+    Sans stages, le temps est seulement logué. Sinon il est cumulé dans stages[description]
+    avec le nombre d'appels et le pic de RSS ; le dictionnaire de l'étape est renvoyé pour
+    que l'appelant y ajoute le nombre d'éléments traités (stage['items'] += ...).
+    """
+    start = time.perf_counter()
+    stage = new_stage() if stages is None else stages.setdefault(description, new_stage())
+    sampler = MemorySampler.active
+    if sampler is not None:
+        sampler.begin_stage()
+    try:
+        yield stage
+    finally:
+        elapsed_time = time.perf_counter() - start
+        peak = sampler.end_stage() if sampler is not None else current_rss_mb()
+        stage['seconds'] += elapsed_time
+        stage['calls'] += 1
+        stage['peak_rss_mb'] = round(max(stage['peak_rss_mb'], peak), 1)
+        if stages is None:
+            logger.info(f"{description}: {elapsed_time:.2f} secondes")
+
+def clean_duration(duration):
+    if not isinstance(duration, str) or duration == 'N/A':
+        return None
+    try:
+        # Convertit "6h 20min" en minutes
+        parts = duration.lower().replace('h', ' ').replace('min', '').split()
+        total_minutes = int(parts[0]) * 60 + (int(parts[1]) if len(parts) > 1 else 0)
+        return total_minutes
+    except:
+        return None
+
+def format_dates(date_str, keep_time=False):
+    if not isinstance(date_str, str) or date_str == 'N/A':
+        return None
+    try:
+        if keep_time:
+            return pd.to_datetime(date_str).strftime('%Y-%m-%d %H:%M:%S')
+        return pd.to_datetime(date_str).strftime('%Y-%m-%d')
+    except:
+        return None
+
+def clean_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if value == 'true':
+        return True
+    if value == 'false':
+        return False
+    return None
+
+def parse_layover_duration(duration):
+    if not isinstance(duration, str) or duration == 'N/A':
+        return None
+    try:
+        # Convertit "2h 30min" en minutes
+        parts = duration.lower().replace('h', ' ').replace('min', '').split()
+        total_minutes = int(parts[0]) * 60 + (int(parts[1]) if len(parts) > 1 else 0)
+        return total_minutes
+    except:
+        return None
+
+def create_datetime_with_time(date_str, time_str):
+    if date_str == 'N/A' or time_str == 'N/A':
+        return None
+    try:
+        # Vérifier si le temps contient "+1"
+        next_day = '+1' in time_str
+        time_str = time_str.replace('+1', '').strip()
+
+        # Créer l'objet datetime
+        base_date = pd.to_datetime(date_str)
+        if next_day:
+            base_date = base_date + pd.Timedelta(days=1)
+
+        time_parts = time_str.split(':')
+        final_datetime = base_date.replace(
+            hour=int(time_parts[0]),
+            minute=int(time_parts[1])
+        )
+        return final_datetime.strftime('%Y-%m-%d %H:%M:00')
+    except:
+        return None
+
+def calculate_second_flight_duration(row):
+    if row['is_direct'] or pd.isna(row['duration']) or pd.isna(row['layover_duration']):
+        return None
+    try:
+        total_duration = row['duration']
+        layover_duration = row['layover_duration']
+        second_flight = total_duration - layover_duration
+        return second_flight if second_flight >= 0 else None
+    except Exception as e:
+        print(f"Erreur dans le calcul de second_flight_duration: {str(e)}")
+        return None
+
+# Classification des vols par période
+def get_time_period(time):
+    if pd.isna(time):
+        return None
+    hour = pd.to_datetime(time).hour
+    if 5 <= hour < 12:
+        return 'morning'
+    elif 12 <= hour < 17:
+        return 'afternoon'
+    elif 17 <= hour < 22:
+        return 'evening'
+    else:
+        return 'night'
+
+# Classification des vols par durée
+def classify_flight_duration(duration):
+    if pd.isna(duration):
+        return None
+    elif duration <= 90:  # 1h30
+        return 'très_court'
+    elif duration <= 180:  # 3h
+        return 'court'
+    elif duration <= 360:  # 6h
+        return 'moyen'
+    elif duration <= 720:  # 12h
+        return 'long'
+    else:
+        return 'très_long'
+
+def stable_flight_hash(unique_string):
+    """Hash xxh3 64 bits de la clé d'un vol : identique d'un processus et d'un run à l'autre"""
+    return xxhash.xxh3_64_intdigest(unique_string.encode('utf-8')) & FLIGHT_ID_MASK
+
+def generate_flight_id(row):
+    try:
+        # Extraire seulement la date de search_date (format YYYY-MM-DD)
+        search_date = str(row.get('search_date', '')).split()[0] if row.get('search_date') else ''
+
+        components = [
+            search_date,  # Uniquement la date de recherche, sans l'heure
+            str(row.get('flight_date', '')),
+            str(row.get('origin', '')),
+            str(row.get('destination', '')),
+            str(row.get('departure_time', '')),
+            str(row.get('arrival_time', ''))
+        ]
+        unique_string = '_'.join(filter(None, components))
+        return stable_flight_hash(unique_string) if unique_string else None
+    except Exception as e:
+        print(f"Erreur dans la génération de l'ID: {str(e)}")
+        return None
+
+# Versions vectorisées des nettoyages ci-dessus.
+# Les valeurs au format attendu sont traitées colonne entière ; les autres (rares)
+# repassent par la fonction ligne à ligne, ce qui garantit une sortie identique.
+DURATION_PATTERN = r'^([0-9]{1,6})h ([0-9]{1,2})min$'
+DATE_PATTERN = r'^[0-9]{4}-[0-9]{2}-[0-9]{2}(?: [0-9]{2}:[0-9]{2}:[0-9]{2})?$'
+TIME_PATTERN = r'^([0-9]{1,2}):([0-9]{2})(\+1)?$'
+FLIGHT_ID_COLUMNS = ['search_date', 'flight_date', 'origin', 'destination', 'departure_time', 'arrival_time']
+
+def _is_str(values):
+    """Masque des cellules de type str (le résultat de .str vaut NaN pour les autres)"""
+    if values.dtype != object:
+        return pd.Series(False, index=values.index)
+    try:
+        return values.str.len().notna()
+    except AttributeError:
+        # Colonne sans aucune chaîne (ex. uniquement des booléens)
+        return pd.Series(False, index=values.index)
+
+def _as_applied(result, index):
+    """Reproduit l'inférence de type de Series.apply : int64, float64 si None, object si tout est None"""
+    return pd.Series(result, index=index, dtype=object).infer_objects()
+
+def _apply_fallback(result, values, mask, func):
+    """Applique func ligne à ligne sur les cellules hors du format attendu"""
+    positions = np.flatnonzero(mask.to_numpy())
+    if len(positions):
+        result[positions] = [func(value) for value in values.iloc[positions]]
+    return result
+
+def duration_to_minutes(values):
+    """Équivalent vectorisé de clean_duration / parse_layover_duration"""
+    result = np.full(len(values), None, dtype=object)
+    is_str = _is_str(values)
+    parts = values.where(is_str).str.extract(DURATION_PATTERN)
+    matched = parts[0].notna()
+    minutes = parts[0][matched].astype('int64') * 60 + parts[1][matched].astype('int64')
+    result[matched.to_numpy()] = minutes.to_numpy()
+    fallback = is_str & ~matched & (values != 'N/A')
+    return _as_applied(_apply_fallback(result, values, fallback, clean_duration), values.index)
+
+def format_date_column(values, keep_time=False):
+    """Équivalent vectorisé de format_dates"""
+    result = np.full(len(values), None, dtype=object)
+    is_str = _is_str(values)
+    matched = is_str & values.where(is_str).str.match(DATE_PATTERN, na=False)
+    dates = pd.to_datetime(values.where(matched), format='ISO8601', errors='coerce')
+    matched &= dates.notna()
+    formatted = dates[matched].dt.strftime('%Y-%m-%d %H:%M:%S' if keep_time else '%Y-%m-%d')
+    result[matched.to_numpy()] = formatted.to_numpy()
+    fallback = is_str & ~matched & (values != 'N/A')
+    return _as_applied(_apply_fallback(result, values, fallback, lambda x: format_dates(x, keep_time=keep_time)),
+                       values.index)
+
+def clean_boolean_column(values):
+    """Équivalent vectorisé de clean_boolean"""
+    if pd.api.types.is_bool_dtype(values):
+        return values.copy()
+    return values.apply(clean_boolean)
+
+def datetime_with_time_column(dates, times):
+    """Équivalent vectorisé de create_datetime_with_time"""
+    result = np.full(len(times), None, dtype=object)
+    is_str = _is_str(times)
+    parts = times.where(is_str).str.extract(TIME_PATTERN)
+    base_dates = pd.to_datetime(dates.where(_is_str(dates) & (dates != 'N/A')), format='ISO8601', errors='coerce')
+    hours = pd.to_numeric(parts[0])
+    minutes = pd.to_numeric(parts[1])
+    matched = parts[0].notna() & base_dates.notna()
+    valid = matched & (hours <= 23) & (minutes <= 59)
+    combined = (base_dates + pd.to_timedelta(parts[2].notna().astype('int64'), unit='D')
+                + pd.to_timedelta(hours, unit='h') + pd.to_timedelta(minutes, unit='m'))
+    result[valid.to_numpy()] = combined[valid].dt.strftime('%Y-%m-%d %H:%M:00').to_numpy()
+
+    # Heures hors format (ex. "+2") ou dates non standard : calcul ligne à ligne
+    fallback = (~parts[0].notna() & is_str & (times != 'N/A')) | (parts[0].notna() & dates.notna() & base_dates.isna())
+    positions = np.flatnonzero(fallback.to_numpy())
+    if len(positions):
+        result[positions] = [create_datetime_with_time(date_str, time_str)
+                             for date_str, time_str in zip(dates.iloc[positions], times.iloc[positions])]
+    return _as_applied(result, times.index)
+
+def second_flight_duration_column(df):
+    """Équivalent vectorisé de calculate_second_flight_duration"""
+    is_direct = df['is_direct'].astype(object).where(df['is_direct'].notna(), False).astype(bool)
+    second_flight = df['duration'].astype('float64') - df['layover_duration'].astype('float64')
+    valid = ~is_direct & df['duration'].notna() & df['layover_duration'].notna() & (second_flight >= 0)
+    result = np.full(len(df), None, dtype=object)
+    integer = (pd.api.types.is_integer_dtype(df['duration'].dtype)
+               and pd.api.types.is_integer_dtype(df['layover_duration'].dtype))
+    values = second_flight[valid].to_numpy()
+    result[valid.to_numpy()] = values.astype('int64') if integer else values.astype('float64')
+    return _as_applied(result, df.index)
+
+def time_period_column(datetimes):
+    """Équivalent vectorisé de get_time_period"""
+    hours = pd.to_datetime(datetimes, errors='coerce').dt.hour
+    periods = np.select(
+        [hours.between(5, 11), hours.between(12, 16), hours.between(17, 21), hours.notna()],
+        ['morning', 'afternoon', 'evening', 'night'],
+        default=None
+    )
+    return _as_applied(periods, datetimes.index)
+
+def flight_duration_class_column(durations):
+    """Équivalent vectorisé de classify_flight_duration"""
+    durations = durations.astype('float64')
+    classes = np.select(
+        [durations <= 90, durations <= 180, durations <= 360, durations <= 720, durations.notna()],
+        ['très_court', 'court', 'moyen', 'long', 'très_long'],
+        default=None
+    )
+    return _as_applied(classes, durations.index)
+
+def flight_id_column(df):
+    """Équivalent vectorisé de generate_flight_id"""
+    columns = [df[col] if col in df else pd.Series('', index=df.index) for col in FLIGHT_ID_COLUMNS]
+    # Chemin rapide : les six composantes sont des chaînes non vides
+    matched = pd.Series(True, index=df.index)
+    for values in columns:
+        is_str = _is_str(values)
+        matched &= is_str & (values.where(is_str).str.len() > 0)
+    search_day = columns[0].where(matched).str.split(n=1).str[0]
+    matched &= search_day.notna()
+
+    unique_strings = search_day[matched]
+    for values in columns[1:]:
+        unique_strings = unique_strings + '_' + values[matched]
+
+    result = np.full(len(df), None, dtype=object)
+    result[matched.to_numpy()] = [stable_flight_hash(unique_string) for unique_string in unique_strings]
+    positions = np.flatnonzero(~matched.to_numpy())
+    if len(positions):
+        result[positions] = [generate_flight_id(row) for _, row in df.iloc[positions].iterrows()]
+    return _as_applied(result, df.index)
+
+def find_destination_folders(base_folder):
+    """
+    Codes destination à traiter : partitions de data/raw et dossiers historiques.
+
+    Les dossiers par jour de scraping (AMS_19_11, AMS_21_11...) sont regroupés avec
+    leur destination : un seul CSV combiné et un seul dossier source Parquet par code.
+    """
+    return find_destinations(base_folder)
+
+def iter_flight_chunks(json_files, destination, chunk_size=CHUNK_SIZE, stages=None, counts=None):
+    """
+    Lit les fichiers JSON donnés et produit les vols aplatis par blocs.
+
+    Chaque bloc est converti en DataFrame dès qu'il atteint chunk_size lignes :
+    seules les lignes d'un bloc sont gardées sous forme de dictionnaires.
+
+    Yields:
+        DataFrame: bloc d'au plus chunk_size vols (plus le dernier fichier lu)
+    """
+    stages = {} if stages is None else stages
+    counts = {} if counts is None else counts
+    rows = []
+
+    file_rows = counts.setdefault('file_rows', {})
+
+    for json_file in json_files:
         file_name = json_file.name
         logger.info(f"[{destination}] === Début du traitement de {file_name} ===")
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-                logger.debug(f"[{destination}] Fichier {file_name} chargé avec succès")
-                
-                flattened_data = flatten_flight_data(json_data, file_name, destination)
-                all_data.extend(flattened_data)
-                
-                logger.info(f"[{destination}] === Fin du traitement de {file_name} ===")
-                logger.info(f"[{destination}] Nombre de vols extraits: {len(flattened_data)}")
+            with timer('parse', stages) as stage:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    json_data = json.load(f)
+                stage['items'] += 1
+            logger.debug(f"[{destination}] Fichier {file_name} chargé avec succès")
+
+            with timer('flatten', stages) as stage:
+                # Fichier historique regroupant plusieurs observations (kayak_data_all.json)
+                observations = json_data if isinstance(json_data, list) else [json_data]
+                flattened_data = [row for observation in observations
+                                  for row in flatten_flight_data(observation, file_name, destination)]
+                stage['items'] += len(flattened_data)
+            rows.extend(flattened_data)
+            counts['files'] = counts.get('files', 0) + 1
+            # Même nom de fichier possible dans plusieurs partitions : compteur par chemin ;
+            # un fichier en erreur n'y figure pas et n'est pas enregistré dans le manifeste
+            file_rows[json_file.as_posix()] = len(flattened_data)
+
+            logger.info(f"[{destination}] === Fin du traitement de {file_name} ===")
+            logger.info(f"[{destination}] Nombre de vols extraits: {len(flattened_data)}")
         except json.JSONDecodeError as e:
             logger.error(f"[{destination}] Erreur de décodage JSON pour {file_name}: {str(e)}")
+            counts.setdefault('errors', []).append(f"{destination}/{file_name}: JSON invalide ({str(e)})")
         except Exception as e:
             logger.error(f"[{destination}] Erreur inattendue lors du traitement de {file_name}: {str(e)}")
+            counts.setdefault('errors', []).append(f"{destination}/{file_name}: {str(e)}")
 
-    if not all_data:
-        logger.warning(f"Aucune donnée n'a été chargée pour {destination}.")
-        continue
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows)
+            rows = []
 
-    df = pd.DataFrame(all_data)
-    
-    print(f"Colonnes disponibles dans le DataFrame : {df.columns.tolist()}")
+    if rows:
+        yield pd.DataFrame(rows)
 
-    def clean_duration(duration):
-        if not isinstance(duration, str) or duration == 'N/A':
-            return None
-        try:
-            # Convertit "6h 20min" en minutes
-            parts = duration.lower().replace('h', ' ').replace('min', '').split()
-            total_minutes = int(parts[0]) * 60 + (int(parts[1]) if len(parts) > 1 else 0)
-            return total_minutes
-        except:
-            return None
+def add_price_category(df):
+    """Classification des prix en terciles, sur l'ensemble des vols de la destination"""
+    df['price_category'] = pd.qcut(df['price'].fillna(-1),
+                                 q=3,
+                                 labels=PRICE_LABELS)
+    df.loc[df['price'] == -1, 'price_category'] = None
+    return df
 
-    df['duration'] = df['duration'].apply(clean_duration)
+def price_category_edges(prices):
+    """Bornes des terciles utilisées par pd.qcut dans add_price_category, calculées sur les seuls prix"""
+    return pd.Series(prices, dtype='float64').fillna(-1).quantile(np.linspace(0, 1, 4)).to_numpy()
 
-    def format_dates(date_str, keep_time=False):
-        if not isinstance(date_str, str) or date_str == 'N/A':
-            return None
-        try:
-            if keep_time:
-                return pd.to_datetime(date_str).strftime('%Y-%m-%d %H:%M:%S')
-            return pd.to_datetime(date_str).strftime('%Y-%m-%d')
-        except:
-            return None
+def apply_price_category(df, edges):
+    """Équivalent d'add_price_category pour un bloc de vols, avec des bornes calculées sur tout le fichier"""
+    prices = pd.to_numeric(df['price'], errors='coerce')
+    df['price_category'] = pd.cut(prices.fillna(-1), bins=edges, labels=PRICE_LABELS, include_lowest=True)
+    df.loc[prices == -1, 'price_category'] = None
+    return df
+
+def clean_flights(df):
+    """Nettoie et enrichit les vols aplatis d'une destination (colonnes entières)"""
+    df['duration'] = duration_to_minutes(df['duration'])
+
+    # Modification de l'application du format de date
+    df['search_date_with_hour'] = format_date_column(df['search_date'], keep_time=True)
+    df['search_date'] = format_date_column(df['search_date'])
+    df['flight_date'] = format_date_column(df['flight_date'])
+
+    df['is_direct'] = clean_boolean_column(df['is_direct'])
+
+    # Conversion de layover_duration en minutes
+    df['layover_duration'] = duration_to_minutes(df['layover_duration'])
+
+    # Création des colonnes datetime
+    df['flight_date_with_time'] = datetime_with_time_column(df['flight_date'], df['departure_time'])
+    df['flight_arrival_with_time'] = datetime_with_time_column(df['flight_date'], df['arrival_time'])
+
+    # Ajout de la nouvelle colonne
+    df['second_flight_duration'] = second_flight_duration_column(df)
+
+    # Calcul du délai entre la recherche et le vol
+    flight_dates = pd.to_datetime(df['flight_date'])
+    df['days_until_flight'] = (flight_dates - pd.to_datetime(df['search_date'])).dt.days
+
+    # Ajout du jour de la semaine
+    df['day_of_week'] = flight_dates.dt.day_name()
+
+    df['departure_period'] = time_period_column(df['flight_date_with_time'])
+
+    df['flight_type'] = flight_duration_class_column(df['duration'])
+
+    # Conversion des colonnes en types appropriés
+    df['is_direct'] = df['is_direct'].astype('boolean')
+    df['price'] = df['price'].astype('float32')
+    df['duration'] = df['duration'].astype('Int64')  # Int64 permet les valeurs NULL
+    # Terciles calculés à la fusion sur tous les vols de la destination ; la colonne garde sa place
+    df['price_category'] = pd.Categorical([None] * len(df), categories=PRICE_LABELS)
+    return df
+
+def clean_flights_rowwise(df):
+    """Version ligne à ligne de clean_flights, conservée comme référence (voir benchmarks/)"""
+    df['duration'] = df['duration'].apply(clean_duration)
 
     # Modification de l'application du format de date
     df['search_date_with_hour'] = df['search_date'].apply(lambda x: format_dates(x, keep_time=True))
     df['search_date'] = df['search_date'].apply(format_dates)
     df['flight_date'] = df['flight_date'].apply(format_dates)
 
-    def clean_boolean(value):
-        if isinstance(value, bool):
-            return value
-        if value == 'true':
-            return True
-        if value == 'false':
-            return False
-        return None
-
     df['is_direct'] = df['is_direct'].apply(clean_boolean)
 
-    def parse_layover_duration(duration):
-        if not isinstance(duration, str) or duration == 'N/A':
-            return None
-        try:
-            # Convertit "2h 30min" en minutes
-            parts = duration.lower().replace('h', ' ').replace('min', '').split()
-            total_minutes = int(parts[0]) * 60 + (int(parts[1]) if len(parts) > 1 else 0)
-            return total_minutes
-        except:
-            return None
-
-    def create_datetime_with_time(date_str, time_str):
-        if date_str == 'N/A' or time_str == 'N/A':
-            return None
-        try:
-            # Vérifier si le temps contient "+1"
-            next_day = '+1' in time_str
-            time_str = time_str.replace('+1', '').strip()
-            
-            # Créer l'objet datetime
-            base_date = pd.to_datetime(date_str)
-            if next_day:
-                base_date = base_date + pd.Timedelta(days=1)
-            
-            time_parts = time_str.split(':')
-            final_datetime = base_date.replace(
-                hour=int(time_parts[0]),
-                minute=int(time_parts[1])
-            )
-            return final_datetime.strftime('%Y-%m-%d %H:%M:00')
-        except:
-            return None
-
     # Conversion de layover_duration en minutes
     df['layover_duration'] = df['layover_duration'].apply(parse_layover_duration)
 
     # Création des colonnes datetime
     df['flight_date_with_time'] = df.apply(
-        lambda row: create_datetime_with_time(row['flight_date'], row['departure_time']), 
+        lambda row: create_datetime_with_time(row['flight_date'], row['departure_time']),
         axis=1
     )
     df['flight_arrival_with_time'] = df.apply(
-        lambda row: create_datetime_with_time(row['flight_date'], row['arrival_time']), 
+        lambda row: create_datetime_with_time(row['flight_date'], row['arrival_time']),
         axis=1
     )
 
-    def calculate_second_flight_duration(row):
-        if row['is_direct'] or pd.isna(row['duration']) or pd.isna(row['layover_duration']):
-            return None
-        try:
-            total_duration = row['duration']
-            layover_duration = row['layover_duration']
-            second_flight = total_duration - layover_duration
-            return second_flight if second_flight >= 0 else None
-        except Exception as e:
-            print(f"Erreur dans le calcul de second_flight_duration: {str(e)}")
-            return None
-
     # Ajout de la nouvelle colonne
     df['second_flight_duration'] = df.apply(calculate_second_flight_duration, axis=1)
 
@@ -446,139 +917,325 @@ for destination in destination_folders:
     # Ajout du jour de la semaine
     df['day_of_week'] = pd.to_datetime(df['flight_date']).dt.day_name()
 
-    # Classification des vols par période
-    def get_time_period(time):
-        if pd.isna(time):
-            return None
-        hour = pd.to_datetime(time).hour
-        if 5 <= hour < 12:
-            return 'morning'
-        elif 12 <= hour < 17:
-            return 'afternoon'
-        elif 17 <= hour < 22:
-            return 'evening'
-        else:
-            return 'night'
-
     df['departure_period'] = df['flight_date_with_time'].apply(get_time_period)
 
-    # Classification des vols par durée
-    def classify_flight_duration(duration):
-        if pd.isna(duration):
-            return None
-        elif duration <= 90:  # 1h30
-            return 'très_court'
-        elif duration <= 180:  # 3h
-            return 'court'
-        elif duration <= 360:  # 6h
-            return 'moyen'
-        elif duration <= 720:  # 12h
-            return 'long'
-        else:
-            return 'très_long'
-
     df['flight_type'] = df['duration'].apply(classify_flight_duration)
 
-    # Classification des prix
-    df['price_category'] = pd.qcut(df['price'].fillna(-1), 
-                                 q=3, 
-                                 labels=['cheap', 'standard', 'high'])
-    df.loc[df['price'] == -1, 'price_category'] = None
-
     # Conversion des colonnes en types appropriés
     df['is_direct'] = df['is_direct'].astype('boolean')
     df['price'] = df['price'].astype('float32')
     df['duration'] = df['duration'].astype('Int64')  # Int64 permet les valeurs NULL
+    # Terciles calculés à la fusion sur tous les vols de la destination ; la colonne garde sa place
+    df['price_category'] = pd.Categorical([None] * len(df), categories=PRICE_LABELS)
+    return df
 
-    # Créer un dossier 'combined' s'il n'existe pas
-    output_folder = base_folder / 'combined'
-    output_folder.mkdir(exist_ok=True)
-    
-    # Sauvegarder dans le dossier 'combined'
-    current_date = datetime.now().strftime('%Y%m%d')
-    output_file = output_folder / f'vols_{destination.lower()}_combines.csv'
+def has_stable_flight_ids(df, sample_size=100):
+    """Vérifie sur un échantillon que les flight_id enregistrés suivent le schéma actuel"""
+    if 'flight_id' not in df or not pd.api.types.is_integer_dtype(df['flight_id']):
+        return False
+    # Les "N/A" relus depuis le CSV deviennent NaN : on n'échantillonne que des clés complètes
+    complete = df[[col for col in FLIGHT_ID_COLUMNS if col in df]].notna().all(axis=1)
+    sample = df[complete].head(sample_size)
+    return not sample.empty and sample['flight_id'].equals(flight_id_column(sample))
 
-    # Avant la sauvegarde du CSV, ajoutons un ID unique
-    def generate_flight_id(row):
-        try:
-            # Extraire seulement la date de search_date (format YYYY-MM-DD)
-            search_date = str(row.get('search_date', '')).split()[0] if row.get('search_date') else ''
-            
-            components = [
-                search_date,  # Uniquement la date de recherche, sans l'heure
-                str(row.get('flight_date', '')),
-                str(row.get('origin', '')),
-                str(row.get('destination', '')),
-                str(row.get('departure_time', '')),
-                str(row.get('arrival_time', ''))
-            ]
-            unique_string = '_'.join(filter(None, components))
-            return abs(hash(unique_string)) if unique_string else None
-        except Exception as e:
-            print(f"Erreur dans la génération de l'ID: {str(e)}")
-            return None
+def with_flight_ids(df, destination):
+    """
+    Ajoute le flight_id de chaque vol. Les vols sans aucune colonne clé n'ont pas d'ID :
+    ils ne peuvent pas être fusionnés par clé et sont retirés, puis les IDs sont recalculés
+    pour rester en int64 (un seul None passerait la colonne en float64 et arrondirait les IDs).
+    """
+    ids = flight_id_column(df)
+    missing = ids.isna().to_numpy()
+    if missing.any():
+        logger.warning(f"[{destination}] {int(missing.sum())} vols sans flight_id (colonnes clés vides) ignorés")
+        df = df[~missing].copy()
+        ids = flight_id_column(df)
+    df['flight_id'] = ids
+    return df
 
-    df['flight_id'] = df.apply(generate_flight_id, axis=1)
+def backup_combined(output_file, base_folder):
+    """Sauvegarde incrémentale du fichier combiné avant sa réécriture, puis politique de rétention"""
+    backup_manager = BackupManager(base_folder)
+    backup_file = backup_manager.create_backup(output_file)
+    removed_snapshots, removed_packs = backup_manager.prune(output_file.stem)
+    logger.info(f"Backup créé: {backup_file} ({removed_snapshots} anciennes sauvegardes et "
+                f"{removed_packs} packs supprimés)")
 
-    # Pour gérer l'ajout à un fichier existant
-    if output_file.exists():
-        try:
-            backup_manager = BackupManager(base_folder)
-            backup_file = backup_manager.create_backup(output_file)
-            logger.info(f"Backup créé: {backup_file}")
-            
-            # Charger le fichier existant
-            existing_df = pd.read_csv(output_file)
-            initial_rows = len(existing_df)
-            
-            # Régénérer les IDs pour le fichier existant avec la nouvelle méthode
-            logger.info("Régénération des IDs pour les données existantes...")
-            existing_df['flight_id'] = existing_df.apply(generate_flight_id, axis=1)
-            
-            # Générer les IDs pour les nouvelles données
-            df['flight_id'] = df.apply(generate_flight_id, axis=1)
-            
-            # Concaténer et dédupliquer
-            df = pd.concat([existing_df, df], ignore_index=True)
-            df = df.drop_duplicates(subset=['flight_id'], keep='last')
-            final_rows = len(df)
-            
-            logger.info(f"[{destination}] Fusion avec fichier existant: {initial_rows} -> {final_rows} lignes")
-            logger.info(f"[{destination}] Nombre d'IDs uniques: {df['flight_id'].nunique()}")
-            
-        except pd.errors.EmptyDataError:
-            logger.warning(f"Le fichier {output_file} est vide, création d'un nouveau fichier")
-        except Exception as e:
-            logger.error(f"Erreur lors de la lecture du fichier existant: {str(e)}")
-            backup_file = output_file.with_suffix('.backup.csv')
-            df.to_csv(backup_file, index=False, encoding='utf-8')
-            logger.info(f"Backup créé: {backup_file}")
-
-    # Avant la sauvegarde du CSV, supprimer les colonnes non désirées
-    columns_to_drop = ['flight_number', 'equipment_type']
-    df = df.drop(columns=columns_to_drop, errors='ignore')
-    
-    # Calcul des coordonnées et distances
+def merge_with_existing(df, output_file, base_folder, destination):
+    """
+    Upsert des nouveaux vols dans le fichier combiné existant, par flight_id.
+
+    Les lignes existantes dont l'ID est présent dans df sont remplacées, les autres
+    sont conservées telles quelles. Un fichier existant illisible lève une exception :
+    il n'est pas réécrit et les fichiers JSON de la destination seront repris au run suivant.
+    """
+    if not output_file.exists():
+        # Les dossiers regroupés d'une destination peuvent contenir la même observation ;
+        # terciles recalculés après dédoublonnage, comme en fusion par blocs
+        return add_price_category(df.drop_duplicates(subset=['flight_id'], keep='last').copy())
+
+    try:
+        # Charger le fichier existant ; "N/A" reste une valeur (comme dans les vols nettoyés) pour que
+        # les lignes inchangées soient réécrites à l'identique et dédupliquées par les sauvegardes
+        existing_df = pd.read_csv(output_file, keep_default_na=False, na_values=[''])
+        initial_rows = len(existing_df)
+
+        # Les IDs sont stables d'un run à l'autre : ceux du fichier sont réutilisés,
+        # sauf s'il date de l'ancien schéma (hash() Python, différent à chaque run)
+        # ou s'il lui manque des IDs (la colonne n'est alors plus entière)
+        if not has_stable_flight_ids(existing_df):
+            logger.info(f"[{destination}] IDs de l'ancien schéma détectés, régénération pour les données existantes...")
+            existing_df = with_flight_ids(existing_df, destination)
+
+        # Upsert par clé : le dernier vol observé pour un ID l'emporte
+        df = df.drop_duplicates(subset=['flight_id'], keep='last')
+        existing_df = existing_df.drop_duplicates(subset=['flight_id'], keep='last')
+        kept_df = existing_df[~existing_df['flight_id'].isin(df['flight_id'])]
+        updated_rows = len(existing_df) - len(kept_df)
+        df = pd.concat([kept_df, df], ignore_index=True)
+        final_rows = len(df)
+
+        # Les terciles de prix sont recalculés sur le fichier fusionné
+        df = add_price_category(df)
+
+        logger.info(f"[{destination}] Fusion avec fichier existant: {initial_rows} -> {final_rows} lignes "
+                    f"({updated_rows} mises à jour, {final_rows - len(kept_df) - updated_rows} ajouts)")
+        logger.info(f"[{destination}] Nombre d'IDs uniques: {df['flight_id'].nunique()}")
+
+    except pd.errors.EmptyDataError:
+        logger.warning(f"Le fichier {output_file} est vide, création d'un nouveau fichier")
+        df = add_price_category(df.drop_duplicates(subset=['flight_id'], keep='last').copy())
+    except Exception as e:
+        # Réécrire le fichier avec les seuls nouveaux vols effacerait l'historique
+        logger.error(f"[{destination}] Fichier existant illisible, destination ignorée: {output_file} ({str(e)})")
+        raise
+    return df
+
+def use_external_merge(output_file, merge_mode='auto', new_bytes=0):
+    """
+    Choisit la fusion par blocs (merge_external) plutôt que la fusion en mémoire.
+
+    'memory' et 'external' forcent le mode ; 'auto' passe par blocs dès que le fichier
+    existant ou les nouveaux vols (new_bytes, taille des blocs mis de côté) dépassent
+    EXTERNAL_MERGE_BYTES. Un fichier aux IDs de l'ancien schéma est toujours fusionné
+    en mémoire : ses IDs doivent être recalculés à partir de toutes les colonnes clés.
+    """
+    if merge_mode == 'memory':
+        return False
+    exists = output_file.exists() and output_file.stat().st_size > 0
+    if merge_mode == 'auto' and new_bytes < EXTERNAL_MERGE_BYTES and (
+            not exists or output_file.stat().st_size < EXTERNAL_MERGE_BYTES):
+        return False
+    if not exists:
+        return True
+    try:
+        sample = pd.read_csv(output_file, nrows=ID_SAMPLE_ROWS)
+    except pd.errors.EmptyDataError:
+        return True
+    if 'flight_id' not in sample or not has_stable_flight_ids(sample):
+        logger.info(f"IDs de l'ancien schéma dans {output_file.name} : fusion en mémoire")
+        return False
+    return True
+
+def stage_new_flights(json_files, destination, spill_folder, chunk_size=CHUNK_SIZE, stages=None, counts=None):
+    """
+    Nettoie et identifie les nouveaux vols bloc par bloc, sans les garder en mémoire.
+
+    Chaque bloc d'iter_flight_chunks passe par clean_flights et flight_id_column, puis
+    est écrit dans spill_folder (pickle : les types du nettoyage sont conservés). Seuls
+    les flight_id et les prix restent en mémoire, pour la déduplication et les terciles.
+
+    Returns:
+        dict: fichiers des blocs, flight_id et prix de toutes les lignes, colonnes,
+            nombre de lignes et taille des blocs sur disque (octets)
+    """
+    stages = {} if stages is None else stages
+    staged = {'files': [], 'ids': [], 'prices': [], 'columns': [], 'rows': 0, 'bytes': 0}
+    for number, chunk in enumerate(iter_flight_chunks(json_files, destination, chunk_size, stages, counts)):
+        with timer('clean', stages) as stage:
+            if not number:
+                print(f"Colonnes disponibles dans le DataFrame : {chunk.columns.tolist()}")
+            chunk = clean_flights(chunk)
+            stage['items'] += len(chunk)
+
+        # Avant la sauvegarde du CSV, ajoutons un ID unique
+        with timer('ids', stages) as stage:
+            chunk = with_flight_ids(chunk, destination)
+            stage['items'] += len(chunk)
+
+        chunk = chunk.drop(columns=DROPPED_COLUMNS, errors='ignore')
+        chunk_file = Path(spill_folder) / f'chunk_{number:05d}.pkl'
+        chunk.to_pickle(chunk_file)
+        staged['files'].append(chunk_file)
+        staged['ids'].append(chunk['flight_id'].to_numpy(dtype=np.int64))
+        staged['prices'].append(pd.to_numeric(chunk['price'], errors='coerce').to_numpy(dtype=np.float64))
+        staged['columns'] += [column for column in chunk.columns if column not in staged['columns']]
+        staged['rows'] += len(chunk)
+        staged['bytes'] += chunk_file.stat().st_size
+
+    staged['ids'] = np.concatenate(staged['ids']) if staged['ids'] else np.empty(0, dtype=np.int64)
+    staged['prices'] = np.concatenate(staged['prices']) if staged['prices'] else np.empty(0, dtype=np.float64)
+    return staged
+
+def staged_frames(staged):
+    """Relit un à un les blocs mis de côté par stage_new_flights"""
+    for chunk_file in staged['files']:
+        yield pd.read_pickle(chunk_file)
+
+def last_occurrences(ids):
+    """Masque de la dernière occurrence de chaque ID"""
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    keep = np.zeros(len(ids), dtype=bool)
+    keep[len(ids) - 1 - last_from_end] = True
+    return keep
+
+def merge_external(staged, output_file, base_folder, destination, parquet=True, stages=None):
+    """
+    Upsert par flight_id des nouveaux vols (blocs de stage_new_flights) avec le fichier
+    combiné existant, à mémoire bornée ; sans fichier existant, écrit les seuls nouveaux vols.
+
+    Passe 1 : seules les colonnes flight_id et price du fichier existant sont lues, pour
+    choisir les lignes conservées (dernière occurrence de chaque ID absent des nouveaux
+    vols, eux-mêmes dédupliqués) et calculer les terciles de prix sur le fichier fusionné.
+    Passe 2 : le fichier est relu par blocs de MERGE_CHUNK_ROWS lignes, puis les blocs de
+    nouveaux vols ; chaque bloc est filtré, complété (catégorie de prix, coordonnées) et
+    écrit aussitôt dans un nouveau CSV puis dans le dataset Parquet. Les lignes existantes
+    sont relues comme texte et réécrites telles quelles, hors colonnes recalculées et
+    colonnes numériques normalisées (as_csv_types).
+
+    La mémoire dépend de MERGE_CHUNK_ROWS et de la taille d'un bloc de nouveaux vols, plus
+    17 octets par ligne (flight_id, prix, masque) au lieu des DataFrames complets.
+
+    Returns:
+        dict: lignes écrites, partitions Parquet et valeurs manquantes par colonne ;
+            None si des flight_id du fichier existant manquent (fusion en mémoire à faire)
+    """
+    stages = {} if stages is None else stages
+    exists = output_file.exists() and output_file.stat().st_size > 0
+
+    with timer('dedup', stages):
+        ids, prices = [], []
+        if exists:
+            for chunk in pd.read_csv(output_file, usecols=['flight_id', 'price'], chunksize=MERGE_CHUNK_ROWS):
+                # IDs manquants (colonne relue en float) : seule la fusion en mémoire peut les régénérer
+                if not pd.api.types.is_integer_dtype(chunk['flight_id']):
+                    logger.info(f"[{destination}] flight_id manquants dans {output_file.name} : fusion en mémoire")
+                    return None
+                ids.append(chunk['flight_id'].to_numpy(dtype=np.int64))
+                prices.append(pd.to_numeric(chunk['price'], errors='coerce').to_numpy(dtype=np.float64))
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        prices = np.concatenate(prices) if prices else np.empty(0, dtype=np.float64)
+
+        # Dernière occurrence de chaque ID, hors IDs remplacés par les nouveaux vols
+        keep = last_occurrences(ids)
+        unique_rows = int(keep.sum())
+        keep &= ~np.isin(ids, staged['ids'])
+        keep_new = last_occurrences(staged['ids'])
+        edges = price_category_edges(np.concatenate([prices[keep], staged['prices'][keep_new]]))
+        initial_rows, kept_rows = len(ids), int(keep.sum())
+        del ids, prices
+
+        columns = pd.read_csv(output_file, nrows=0).columns.tolist() if exists else []
+        columns += [column for column in staged['columns'] if column not in columns]
+        columns = [column for column in columns if column not in DROPPED_COLUMNS]
+
+    if exists:
+        with timer('backup', stages):
+            backup_combined(output_file, base_folder)
+
+    tmp_file = output_file.with_name(f'{output_file.name}.tmp')
+    stats = {'rows': 0, 'nulls': pd.Series(0, index=columns, dtype='int64')}
+
+    def merged_frames():
+        if exists:
+            offset = 0
+            existing = pd.read_csv(output_file, dtype=str, keep_default_na=False, na_values=[''],
+                                   chunksize=MERGE_CHUNK_ROWS)
+            for chunk in existing:
+                mask = keep[offset:offset + len(chunk)]
+                offset += len(chunk)
+                if mask.any():
+                    yield chunk[mask].reindex(columns=columns)
+        offset = 0
+        for chunk in staged_frames(staged):
+            mask = keep_new[offset:offset + len(chunk)]
+            offset += len(chunk)
+            if mask.any():
+                yield chunk[mask].reindex(columns=columns)
+
+    def written_frames():
+        for frame in merged_frames():
+            with timer('dedup', stages) as stage:
+                frame = apply_price_category(frame, edges)
+                stage['items'] += len(frame)
+            with timer('geocode', stages) as stage:
+                frame = add_geo_columns(frame)
+                stage['items'] += len(frame)
+            with timer('write', stages) as stage:
+                stage['items'] += len(frame)
+                frame = as_csv_types(frame)
+                frame.to_csv(tmp_file, mode='a' if stats['rows'] else 'w', header=not stats['rows'],
+                             index=False, encoding='utf-8', quoting=csv.QUOTE_ALL, escapechar='\\', doublequote=True)
+            stats['rows'] += len(frame)
+            stats['nulls'] = stats['nulls'].add(frame.isnull().sum(), fill_value=0)
+            yield frame
+
+    if parquet:
+        inner_stages = ('dedup', 'geocode', 'write')
+        before = sum(stages[stage]['seconds'] for stage in inner_stages if stage in stages)
+        with timer('parquet', stages) as stage:
+            stats['partitions'] = write_flights(written_frames(), base_folder / PARQUET_FOLDER, destination)
+            stage['items'] += stats['rows']
+        # Le dataset est écrit au fil des blocs : le temps des étapes internes est retiré
+        stage['seconds'] -= sum(stages[stage_name]['seconds'] for stage_name in inner_stages) - before
+    else:
+        for _ in written_frames():
+            pass
+    tmp_file.replace(output_file)
+
+    updated_rows = unique_rows - kept_rows
+    logger.info(f"[{destination}] Fusion par blocs avec fichier existant: {initial_rows} -> {stats['rows']} lignes "
+                f"({updated_rows} mises à jour, {stats['rows'] - kept_rows - updated_rows} ajouts)")
+    return stats
+
+def as_csv_types(df):
+    """
+    Colonnes CSV_NUMERIC_TYPES converties à leur type d'écriture, qu'elles viennent du
+    nettoyage (type variable d'un bloc à l'autre), d'un CSV relu en float (valeurs
+    manquantes) ou d'un bloc lu comme texte : les deux modes de fusion écrivent ainsi
+    les mêmes octets.
+    """
+    for column, dtype in CSV_NUMERIC_TYPES.items():
+        if column in df:
+            values = pd.to_numeric(df[column], errors='coerce')
+            df[column] = values.round().astype(dtype) if dtype == 'Int64' else values.astype(dtype)
+    return df
+
+def add_geo_columns(df):
+    """Calcul des coordonnées et distances"""
     logger.info("Calcul des coordonnées et distances...")
-    # Créer les nouvelles colonnes une par une
-    df['origin_coordinates'] = df.apply(lambda row: format_coordinates(BORDEAUX_COORDS), axis=1)
-    df['destination_coordinates'] = df.apply(lambda row: format_coordinates(get_city_coordinates(row['destination_city'])), axis=1)
-    df['distance_km'] = df.apply(lambda row: round(geodesic(BORDEAUX_COORDS, get_city_coordinates(row['destination_city'])).kilometers, 2) 
-                                if get_city_coordinates(row['destination_city']) else None, axis=1)
+    # Une recherche par ville distincte, puis jointure sur destination_city
+    geo = {city: destination_geo(city) for city in df['destination_city'].dropna().unique()}
+    df['origin_coordinates'] = format_coordinates(BORDEAUX_COORDS)
+    df['destination_coordinates'] = df['destination_city'].map({city: coords for city, (coords, _) in geo.items()})
+    df['distance_km'] = df['destination_city'].map({city: distance for city, (_, distance) in geo.items()})
+    return df
 
+def write_combined(df, output_file):
     # Sauvegarder le fichier avec toutes les colonnes
-    df.to_csv(output_file, 
-              index=False, 
+    df.to_csv(output_file,
+              index=False,
               encoding='utf-8',
               quoting=csv.QUOTE_ALL,
               escapechar='\\',
               doublequote=True)
 
+def log_data_quality(df, destination, output_file):
     logger.info(f"Les données ont été combinées et sauvegardées dans {output_file}")
     logger.info(f"Nombre total de vols pour {destination}: {len(df)}")
     logger.info(f"Colonnes du DataFrame: {df.columns.tolist()}")
     logger.info(f"Types de données:\n{df.dtypes}")
-    
+
     # Statistiques de qualité des données
     null_counts = df.isnull().sum()
     if null_counts.any():
@@ -602,17 +1259,391 @@ for destination in destination_folders:
     distance_stats = df['distance_km'].describe()
     logger.info(f"Statistiques des distances:\n{distance_stats}")
 
-@contextmanager
-def timer(description):
+def log_merge_quality(stats, destination, output_file):
+    """Qualité des données après une fusion par blocs (valeurs manquantes cumulées bloc par bloc)"""
+    logger.info(f"Les données ont été combinées et sauvegardées dans {output_file}")
+    logger.info(f"Nombre total de vols pour {destination}: {stats['rows']}")
+    null_counts = stats['nulls']
+    if null_counts.any():
+        logger.warning("Valeurs manquantes détectées:")
+        for col, count in null_counts[null_counts > 0].items():
+            logger.warning(f"  {col}: {int(count)} valeurs manquantes")
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus, en Mo"""
+    return psutil.Process().memory_info().rss / (1 << 20)
+
+def reset_peak_rss():
+    """Remet à zéro le pic de mémoire du processus (Linux) ; sans effet ailleurs"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus depuis le dernier reset_peak_rss, en Mo"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Hors Linux : pic sur toute la vie du processus quand il est disponible (Windows), sinon RSS actuelle
+    memory = psutil.Process().memory_info()
+    return getattr(memory, 'peak_wset', memory.rss) / (1 << 20)
+
+def process_destination(base_folder, destination, chunk_size=CHUNK_SIZE, files=None, parquet=True, merge_mode='auto'):
+    """
+    Traite un dossier de destination (ingest_destination) en mesurant sa mémoire.
+
+    Exécutée dans un processus du pool : ne renvoie que des statistiques légères.
+
+    Returns:
+        dict: destination, fichiers lus, lignes écrites, fichier de sortie, mesures par étape
+            (temps, appels, éléments, pic de RSS) et pic de mémoire de la destination (Mo)
+    """
+    reset_peak_rss()
+    with MemorySampler() as sampler:
+        result = ingest_destination(base_folder, destination, chunk_size, files, parquet, merge_mode)
+    # VmHWM (exact, Linux) ; à défaut le maximum échantillonné
+    result['peak_rss_mb'] = round(max(peak_rss_mb(), sampler.peak), 1)
+    result['rss_samples'] = sampler.samples
+    return result
+
+def ingest_destination(base_folder, destination, chunk_size=CHUNK_SIZE, files=None, parquet=True, merge_mode='auto'):
+    """
+    Traite un dossier de destination : lecture, nettoyage, fusion et écriture du CSV combiné.
+
+    Les fichiers JSON sont lus, nettoyés et identifiés par blocs de chunk_size vols, mis de
+    côté sur disque (stage_new_flights). En fusion par blocs, ils sont ensuite transmis un à
+    un à l'écriture du CSV et du Parquet ; seule la fusion en mémoire les réunit.
+
+    Args:
+        files (list): fichiers JSON à ingérer (chemins relatifs à base_folder) ;
+            tous les fichiers du dossier si None
+        parquet (bool): écrire aussi le dataset Parquet partitionné (data/parquet)
+        merge_mode (str): fusion avec le CSV existant, 'auto', 'memory' ou 'external'
+    """
+    base_folder = Path(base_folder)
+    logger.info(f"\n=== Début du traitement du dossier {destination} ===")
+
+    stages = {}
+    result = {'destination': destination, 'files': 0, 'rows': 0, 'output_file': None, 'stages': stages, 'errors': []}
+    start = time.time()
+
+    if files is None:
+        json_files = destination_files(base_folder, destination)
+    else:
+        json_files = [base_folder / path for path in files]
+
+    # Créer un dossier 'combined' s'il n'existe pas
+    output_folder = base_folder / 'combined'
+    output_folder.mkdir(exist_ok=True)
+    output_file = output_folder / f'vols_{destination.lower()}_combines.csv'
+
+    # Blocs nettoyés mis de côté à côté du CSV combiné, supprimés en fin de traitement
+    with tempfile.TemporaryDirectory(prefix=f'.{destination.lower()}_', dir=output_folder) as spill_folder:
+        staged = stage_new_flights(json_files, destination, spill_folder, chunk_size, stages, result)
+
+        if not staged['rows']:
+            logger.warning(f"Aucune donnée n'a été chargée pour {destination}.")
+            result['total'] = time.time() - start
+            return result
+
+        # Gros volumes : fusion par blocs, le CSV et le Parquet sont écrits au fil de la lecture
+        stats = None
+        if use_external_merge(output_file, merge_mode, staged['bytes']):
+            stats = merge_external(staged, output_file, base_folder, destination, parquet, stages)
+
+        # Fusion en mémoire : tous les nouveaux vols sont réunis dans un seul DataFrame
+        if stats is None:
+            with timer('clean', stages):
+                df = pd.concat(staged_frames(staged), ignore_index=True)
+
+    if stats is not None:
+        if parquet:
+            logger.info(f"[{destination}] Parquet : {stats['partitions']} partitions écrites dans {base_folder / PARQUET_FOLDER}")
+        log_merge_quality(stats, destination, output_file)
+        result.update({'rows': stats['rows'], 'output_file': str(output_file), 'total': time.time() - start,
+                       'geocoded': dict(NEW_CITIES), 'merge_mode': 'external'})
+        return result
+
+    # Pour gérer l'ajout à un fichier existant
+    if output_file.exists():
+        with timer('backup', stages):
+            backup_combined(output_file, base_folder)
+    with timer('dedup', stages) as stage:
+        df = merge_with_existing(df, output_file, base_folder, destination)
+        stage['items'] += len(df)
+
+    # Avant la sauvegarde du CSV, supprimer les colonnes non désirées (anciens fichiers combinés)
+    df = df.drop(columns=DROPPED_COLUMNS, errors='ignore')
+
+    with timer('geocode', stages) as stage:
+        df = add_geo_columns(df)
+        stage['items'] += len(df)
+
+    with timer('write', stages) as stage:
+        df = as_csv_types(df)
+        write_combined(df, output_file)
+        stage['items'] += len(df)
+
+    if parquet:
+        with timer('parquet', stages) as stage:
+            partitions = write_flights(df, base_folder / PARQUET_FOLDER, destination)
+            stage['items'] += len(df)
+        logger.info(f"[{destination}] Parquet : {partitions} partitions écrites dans {base_folder / PARQUET_FOLDER}")
+
+    log_data_quality(df, destination, output_file)
+    result.update({'rows': len(df), 'output_file': str(output_file), 'total': time.time() - start,
+                   'geocoded': dict(NEW_CITIES), 'merge_mode': 'memory'})
+    return result
+
+def init_worker(log_filename):
+    """Initialise le logger dans un processus du pool (nécessaire hors fork, ex. Windows)"""
+    if not logger.handlers:
+        setup_logger(Path(log_filename).parent.parent, log_filename)
+
+def run_destinations(base_folder, jobs, workers=DEFAULT_WORKERS, chunk_size=CHUNK_SIZE, log_filename=None, parquet=True,
+                     merge_mode='auto'):
+    """
+    Traite les destinations, en parallèle sur un pool de processus si workers > 1.
+
+    Args:
+        jobs (dict): destination -> fichiers à ingérer (None pour tout le dossier)
+    """
+    results = []
+    if workers <= 1 or len(jobs) <= 1:
+        for destination, files in jobs.items():
+            # Comme dans le pool : une destination en échec n'est pas enregistrée dans le manifeste
+            try:
+                results.append(process_destination(base_folder, destination, chunk_size, files, parquet, merge_mode))
+            except Exception as e:
+                logger.error(f"[{destination}] Échec du traitement du dossier: {str(e)}")
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(log_filename,)) as executor:
+        futures = {executor.submit(process_destination, base_folder, destination, chunk_size, files, parquet, merge_mode): destination
+                   for destination, files in jobs.items()}
+        for future in as_completed(futures):
+            destination = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"[{destination}] Échec du traitement du dossier: {str(e)}")
+    return sorted(results, key=lambda r: r['destination'])
+
+def save_geocoded_cities(results):
+    """Ajoute à city_coordinates.json les villes géocodées en ligne par les workers"""
+    new_cities = {}
+    for result in results:
+        new_cities.update(result.get('geocoded', {}))
+    if not new_cities:
+        return
+    table = load_city_table()
+    table.update({city: entry for city, entry in new_cities.items() if city not in table})
+    save_city_table(table)
+    logger.info(f"{len(new_cities)} villes ajoutées à {CITY_TABLE_PATH.name}: {', '.join(sorted(new_cities))}")
+
+def stage_rate(stage):
+    """Éléments traités par seconde pour une étape, None si l'étape ne compte pas d'éléments"""
+    return round(stage['items'] / stage['seconds'], 1) if stage['items'] and stage['seconds'] > 0 else None
+
+def total_stages(results, discovery=None):
+    """Mesures par étape cumulées sur toutes les destinations (temps cumulé des workers)"""
+    totals = {}
+    if discovery is not None:
+        totals['discovery'] = dict(discovery)
+    for result in results:
+        for name, stage in result.get('stages', {}).items():
+            total = totals.setdefault(name, new_stage())
+            total['seconds'] += stage['seconds']
+            total['calls'] += stage['calls']
+            total['items'] += stage['items']
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], stage['peak_rss_mb'])
+    return {name: dict(totals[name], items_per_second=stage_rate(totals[name]))
+            for name in STAGES + sorted(set(totals) - set(STAGES)) if name in totals}
+
+def log_timing_report(results, total_time, discovery, workers):
+    """Rapport par étape (temps, éléments, débit, pic de RSS), cumulé puis par destination"""
+    logger.info("=== Rapport des temps par étape ===")
+    logger.info(f"Workers: {workers} | Destinations: {len(results)} | "
+                f"Fichiers: {sum(r['files'] for r in results)} | Lignes: {sum(r['rows'] for r in results)}")
+    for name, stage in total_stages(results, discovery).items():
+        rate = f"{stage['items_per_second']:>10.0f}/s" if stage['items_per_second'] else f"{'':>12}"
+        logger.info(f"{name:<10} {stage['seconds']:8.2f}s {stage['items']:>9} él. {rate}  pic {stage['peak_rss_mb']:7.1f} Mo")
+    logger.info(f"Temps total (horloge): {total_time:.2f} secondes")
+
+    for r in results:
+        detail = ' '.join(f"{name}={stage['seconds']:.2f}s" for name, stage in r.get('stages', {}).items())
+        logger.info(f"[{r['destination']}] {r['files']} fichiers, {r['rows']} lignes, "
+                    f"{r.get('total', 0):.2f}s, pic {r.get('peak_rss_mb', 0):.0f} Mo | {detail}")
+
+# Paramètres de run() ; main() les construit à partir de la ligne de commande
+DEFAULT_RUN_CONFIG = {
+    'base_folder': DEFAULT_BASE_FOLDER,  # Dossier data/ (raw/, dossiers historiques, combined/, parquet/)
+    'workers': DEFAULT_WORKERS,
+    'chunk_size': CHUNK_SIZE,
+    'destinations': None,  # Codes destination à traiter, toutes si None
+    'full': False,  # Ré-ingérer tous les fichiers, même déjà présents dans le manifeste
+    'parquet': True,  # Écrire aussi le dataset Parquet partitionné
+    'merge_mode': 'auto',
+}
+
+def run(config=None):
+    """
+    Exécute le concatenator dans le processus appelant.
+
+    Args:
+        config (dict): valeurs de DEFAULT_RUN_CONFIG à remplacer, ex. {'workers': 1, 'destinations': ['AMS']}
+
+    Returns:
+        dict: base_folder, results (résultat de chaque destination traitée), output_files
+            (destination -> CSV combiné écrit), parquet_folder (None sans Parquet), metrics_file
+    """
+    config = dict(DEFAULT_RUN_CONFIG, **(config or {}))
+    unknown = set(config) - set(DEFAULT_RUN_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus pour le concatenator : {', '.join(sorted(unknown))}")
+    if config['merge_mode'] not in MERGE_MODES:
+        raise ValueError(f"merge_mode doit valoir {', '.join(MERGE_MODES)} : {config['merge_mode']}")
+
+    base_folder = Path(config['base_folder'])
+    log_filename = base_folder / 'logs' / f'concatenator_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
+    setup_logger(base_folder, log_filename)
+
     start = time.time()
-    yield
-    elapsed_time = time.time() - start
-    logger.info(f"{description}: {elapsed_time:.2f} secondes")
+    discovery = new_stage()
+    discovery_start = time.perf_counter()
+    destination_folders = config['destinations'] or find_destination_folders(base_folder)
+    logger.info(f"Dossiers de destination trouvés : {', '.join(destination_folders)}")
+
+    # Seuls les fichiers nouveaux ou modifiés depuis la dernière ingestion sont traités ;
+    # tout le dossier est relu si son CSV combiné n'existe pas (ou plus)
+    manifest = IngestionManifest(base_folder / MANIFEST_NAME)
+    jobs = {}
+    pending_records = {}
+    for destination in destination_folders:
+        output_file = base_folder / 'combined' / f'vols_{destination.lower()}_combines.csv'
+        records = manifest.pending_files(base_folder, destination, force=config['full'] or not output_file.exists())
+        if records:
+            jobs[destination] = [record['path'] for record in records]
+            pending_records[destination] = records
+    discovery.update({'seconds': time.perf_counter() - discovery_start, 'calls': 1,
+                      'items': sum(len(files) for files in jobs.values()), 'peak_rss_mb': round(current_rss_mb(), 1)})
+    logger.info(f"Fichiers à ingérer : {sum(len(files) for files in jobs.values())} "
+                f"({len(jobs)} destinations, {len(destination_folders) - len(jobs)} à jour)")
+
+    try:
+        results = run_destinations(base_folder, jobs, config['workers'], config['chunk_size'], log_filename,
+                                   config['parquet'], config['merge_mode'])
+        for result in results:
+            # Fichiers illisibles (result['errors']) laissés hors du manifeste : repris au run suivant
+            file_rows = result.get('file_rows', {})
+            ingested = []
+            for record in pending_records[result['destination']]:
+                path = (base_folder / record['path']).as_posix()
+                if path in file_rows:
+                    ingested.append(dict(record, rows=file_rows[path]))
+            manifest.record(ingested)
+        save_geocoded_cities(results)
+        summary = manifest.summary()
+        logger.info(f"Manifeste d'ingestion : {summary['files']} fichiers, {summary['rows']} vols")
+    finally:
+        manifest.close()
+
+    log_timing_report(results, time.time() - start, discovery, config['workers'])
+
+    metrics = ProcessMetrics(base_folder)
+    metrics.start_time = start
+    metrics.metrics['run'] = {'workers': config['workers'], 'chunk_size': config['chunk_size'],
+                              'merge_mode': config['merge_mode'], 'parquet': config['parquet'], 'full': config['full'],
+                              'destinations': len(jobs)}
+    for result in results:
+        metrics.record_result(result)
+    metrics.metrics['stages'] = total_stages(results, discovery)
+    metrics_file = metrics.save_metrics()
+
+    return {
+        'base_folder': base_folder,
+        'results': results,
+        'output_files': {result['destination']: Path(result['output_file']) for result in results if result['output_file']},
+        'parquet_folder': base_folder / PARQUET_FOLDER if config['parquet'] else None,
+        'metrics_file': metrics_file,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fusion des fichiers JSON scrapés en CSV combinés par destination")
+    parser.add_argument('--base-folder', type=Path, default=DEFAULT_BASE_FOLDER, help="Dossier data/ contenant les dossiers de destination")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Nombre de processus (1 = traitement séquentiel)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Nombre de vols aplatis par bloc")
+    parser.add_argument('--destinations', nargs='*', help="Limiter le traitement à ces destinations (codes, ex. AMS LON)")
+    parser.add_argument('--full', action='store_true', help="Ré-ingérer tous les fichiers, même déjà présents dans le manifeste")
+    parser.add_argument('--no-parquet', action='store_true', help="Ne pas écrire le dataset Parquet partitionné")
+    parser.add_argument('--merge-mode', choices=MERGE_MODES, default='auto',
+                        help="Fusion avec le CSV existant : en mémoire, par blocs (mémoire bornée) ou auto selon la taille")
+    parser.add_argument('--compare-metrics', nargs=2, type=Path, metavar=('AVANT', 'APRES'),
+                        help="Comparer deux fichiers de data/metrics par étape, sans lancer de traitement")
+    args = parser.parse_args(argv)
+
+    if args.compare_metrics:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        before, after = (json.loads(path.read_text(encoding='utf-8')) for path in args.compare_metrics)
+        return compare_metrics(before, after)
+
+    return run({
+        'base_folder': args.base_folder,
+        'workers': args.workers,
+        'chunk_size': args.chunk_size,
+        'destinations': args.destinations,
+        'full': args.full,
+        'parquet': not args.no_parquet,
+        'merge_mode': args.merge_mode,
+    })
+
+def compare_metrics(before, after, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare deux runs étape par étape.
+
+    Le temps par élément traité est comparé quand les deux runs comptent des éléments
+    (sinon le temps brut), ainsi que le pic de RSS de l'étape. Une hausse supérieure à
+    threshold est signalée comme régression, pour les étapes d'au moins REGRESSION_MIN_SECONDS.
 
-# Utilisation dans le code
-with timer("Traitement complet du dossier"):
-    # Votre code de traitement ici
-    pass
+    Returns:
+        list: régressions détectées (étape, mesure, avant, après)
+    """
+    regressions = []
+    if before.get('run') != after.get('run'):
+        logger.info(f"Configurations différentes : {before.get('run')} -> {after.get('run')}")
+    logger.info(f"=== Comparaison avec le run du {before.get('date')} ===")
+    before_stages, after_stages = before.get('stages', {}), after.get('stages', {})
+    for name in [stage for stage in STAGES if stage in after_stages] + sorted(set(after_stages) - set(STAGES)):
+        new = after_stages[name]
+        old = before_stages.get(name)
+        if old is None:
+            logger.info(f"{name:<10} nouvelle étape ({new['seconds']:.2f}s)")
+            continue
+        if old['items'] and new['items']:
+            metric, old_value, new_value = 'ms/élément', 1000 * old['seconds'] / old['items'], 1000 * new['seconds'] / new['items']
+        else:
+            metric, old_value, new_value = 'secondes', old['seconds'], new['seconds']
+        checks = [(metric, old_value, new_value, max(old['seconds'], new['seconds']) >= REGRESSION_MIN_SECONDS),
+                  ('pic Mo', old['peak_rss_mb'], new['peak_rss_mb'], True)]
+        for check_metric, old_value, new_value, significant in checks:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            flag = significant and change > threshold
+            if flag:
+                regressions.append({'stage': name, 'metric': check_metric, 'before': round(old_value, 4),
+                                    'after': round(new_value, 4), 'change': round(change, 3)})
+            log = logger.warning if flag else logger.info
+            log(f"{name:<10} {check_metric:<11} {old_value:10.3f} -> {new_value:10.3f} ({change:+.0%})"
+                f"{'  RÉGRESSION' if flag else ''}")
+    if not regressions:
+        logger.info("Aucune régression détectée")
+    return regressions
 
 class ProcessMetrics:
     def __init__(self, base_folder):
@@ -648,6 +1679,26 @@ class ProcessMetrics:
             self.metrics['destinations'][destination]['error_count'] += errors
             self.metrics['destinations'][destination]['total_rows'] += rows
 
+    def record_result(self, result):
+        """Ajoute le résultat d'une destination : compteurs, erreurs, mémoire et mesures par étape"""
+        destination = result['destination']
+        self.update(destination, processed=result['files'], errors=len(result.get('errors', [])), rows=result['rows'])
+        for error in result.get('errors', []):
+            self.add_error(error)
+        self.record_memory(destination, result.get('peak_rss_mb', 0))
+        self.metrics['destinations'][destination].update({
+            'seconds': round(result.get('total', 0), 3),
+            'merge_mode': result.get('merge_mode'),
+            'stages': {name: dict(stage, items_per_second=stage_rate(stage))
+                       for name, stage in result.get('stages', {}).items()},
+        })
+
+    def record_memory(self, destination, peak_mb):
+        """Pic de mémoire (Mo) d'une destination ; memory_usage garde le maximum du run"""
+        self.update(destination)
+        self.metrics['destinations'][destination]['peak_memory_mb'] = round(peak_mb, 1)
+        self.metrics['memory_usage'] = round(max(self.metrics['memory_usage'], peak_mb), 1)
+
     def add_error(self, error_message):
         self.metrics['errors'].append({
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -660,9 +1711,18 @@ class ProcessMetrics:
             'message': str(warning_message)
         })
 
+    def latest_metrics(self):
+        """Dernier fichier de métriques écrit dans data/metrics, None s'il n'y en a pas"""
+        metrics_files = sorted(self.metrics_folder.glob('metrics_*.json'))
+        if not metrics_files:
+            return None
+        with open(metrics_files[-1], 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     def save_metrics(self):
         # Calculer le temps total
         self.metrics['processing_time'] = time.time() - self.start_time
+        previous = self.latest_metrics()
         
         # Nom du fichier avec timestamp
         metrics_file = self.metrics_folder / f'metrics_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
@@ -677,7 +1737,14 @@ class ProcessMetrics:
         logger.info(f"Fichiers traités: {self.metrics['processed_files']}")
         logger.info(f"Erreurs rencontrées: {self.metrics['error_count']}")
         logger.info(f"Lignes totales: {self.metrics['total_rows']}")
-        
+        logger.info(f"Pic de mémoire: {self.metrics['memory_usage']} Mo")
+
+        # Comparaison avec le run précédent : les régressions apparaissent dans le log
+        if previous is not None:
+            self.metrics['regressions'] = compare_metrics(previous, self.metrics)
+            with open(metrics_file, 'w', encoding='utf-8') as f:
+                json.dump(self.metrics, f, indent=4, ensure_ascii=False)
+
         return metrics_file
 
 def correct_coordinates_and_distance(df):
@@ -693,7 +1760,7 @@ def correct_coordinates_and_distance(df):
     unique_cities = df['destination_city'].unique()
     for city in unique_cities:
         old_coords = df.loc[df['destination_city'] == city, 'destination_coordinates'].iloc[0]
-        new_coords = format_coordinates(get_city_coordinates(city))
+        new_coords, new_distance = destination_geo(city)
         
         if old_coords != new_coords:
             logger.info(f"Correction pour {city}: {old_coords} -> {new_coords}")
@@ -704,8 +1771,6 @@ def correct_coordinates_and_distance(df):
             
             # Recalcul de la distance
             if new_coords:
-                new_coords_tuple = tuple(map(float, new_coords.split(', ')))
-                new_distance = round(geodesic(BORDEAUX_COORDS, new_coords_tuple).kilometers, 2)
                 old_distance = df.loc[df['destination_city'] == city, 'distance_km'].iloc[0]
                 
                 if old_distance != new_distance:
@@ -716,3 +1781,5 @@ def correct_coordinates_and_distance(df):
     logger.info(f"Corrections effectuées: {corrections['coordonnées']} coordonnées et {corrections['distances']} distances")
     return df
 
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,122 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List
 from pathlib import Path
 
+from src.data.parquet_store import PARQUET_FOLDER, read_flights
+
+ROUTE_KEYS = ['origin', 'destination']
+SEASONS = {12: 'Winter', 1: 'Winter', 2: 'Winter',
+           3: 'Spring', 4: 'Spring', 5: 'Spring',
+           6: 'Summer', 7: 'Summer', 8: 'Summer',
+           9: 'Fall', 10: 'Fall', 11: 'Fall'}
+
+def _build_destination(data_path: Path, destination: str) -> pd.DataFrame:
+    """Features d'une destination, exécuté dans un processus du pool de process_destinations"""
+    return FlightFeatureBuilder(data_path).process_destination(destination)
+
 class FlightFeatureBuilder:
     def __init__(self, data_path: Path):
         self.data_path = data_path
         
-    def load_destination_data(self, destination: str) -> pd.DataFrame:
-        """Charge les données CSV d'une destination"""
-        file_path = self.data_path / 'combined' / f'vols_{destination.lower()}_combines.csv'
-        return pd.read_csv(file_path)
+    def load_destination_data(self, destination: str, columns: List[str] = None,
+                              search_date_from: str = None, search_date_to: str = None) -> pd.DataFrame:
+        """
+        Charge les données d'une destination.
+
+        Lit le dataset Parquet partitionné s'il contient la destination (seules les colonnes
+        et partitions de search_date demandées sont lues), sinon le CSV combiné.
+        """
+        parquet_root = Path(self.data_path) / PARQUET_FOLDER
+        if (parquet_root / f'destination={destination.upper()}').exists():
+            return read_flights(parquet_root, destinations=[destination.upper()], columns=columns,
+                                search_date_from=search_date_from, search_date_to=search_date_to)
+
+        file_path = Path(self.data_path) / 'combined' / f'vols_{destination.lower()}_combines.csv'
+        df = pd.read_csv(file_path, usecols=columns)
+        if search_date_from:
+            df = df[df['search_date'] >= search_date_from]
+        if search_date_to:
+            df = df[df['search_date'] <= search_date_to]
+        return df
     
+    def available_destinations(self) -> List[str]:
+        """Destinations du dataset Parquet, sinon des CSV combinés (ex. 'AMS', 'AMS_19_11')"""
+        parquet_root = Path(self.data_path) / PARQUET_FOLDER
+        destinations = sorted(folder.name.split('=', 1)[1] for folder in parquet_root.glob('destination=*'))
+        if destinations:
+            return destinations
+        return sorted(file.name[len('vols_'):-len('_combines.csv')].upper()
+                      for file in (Path(self.data_path) / 'combined').glob('vols_*_combines.csv'))
+
+    def load_destinations(self, destinations: List[str] = None, columns: List[str] = None,
+                          search_date_from: str = None, search_date_to: str = None) -> pd.DataFrame:
+        """
+        Charge plusieurs destinations en un seul DataFrame.
+
+        Les destinations présentes dans le dataset Parquet sont lues en un seul scan,
+        les autres depuis leur CSV combiné.
+        """
+        destinations = [destination.upper() for destination in (destinations or self.available_destinations())]
+        parquet_root = Path(self.data_path) / PARQUET_FOLDER
+        in_parquet = [destination for destination in destinations
+                      if (parquet_root / f'destination={destination}').exists()]
+        frames = []
+        if in_parquet:
+            frames.append(read_flights(parquet_root, destinations=in_parquet, columns=columns,
+                                       search_date_from=search_date_from, search_date_to=search_date_to))
+        frames.extend(self.load_destination_data(destination, columns, search_date_from, search_date_to)
+                      for destination in destinations if destination not in in_parquet)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def build_features(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        """
+        Features de prix, temporelles et de route en une passe.
+
+        Mêmes colonnes et valeurs que add_price_features, add_temporal_features puis
+        add_route_features, mais les agrégats par route (moyenne et écart-type des prix,
+        compagnies distinctes, nombre de vols) sont calculés sur un seul groupby, et les
+        colonnes sont ajoutées au DataFrame sans copie intermédiaire.
+
+        Args:
+            copy (bool): travailler sur une copie ; False modifie df (DataFrame chargé par l'appelant)
+        """
+        if copy:
+            df = df.copy()
+
+        # Agrégats par route, ramenés sur chaque ligne par le numéro de groupe
+        grouped = df.groupby(ROUTE_KEYS, sort=False)
+        routes = grouped.agg(route_avg=('price', 'mean'), route_std=('price', 'std'),
+                             route_competition=('airlines', 'nunique'))
+        routes['route_frequency'] = grouped.size()
+        codes = grouped.ngroup()
+
+        # Comme le merge de add_route_features : les lignes sans route (numéro NaN) sont retirées
+        has_route = codes.notna().to_numpy()
+        if not has_route.all():
+            df = df[has_route].reset_index(drop=True)
+        codes = codes[has_route].to_numpy(dtype=np.int64)
+        route_avg = routes['route_avg'].to_numpy()[codes]
+
+        df['price_vs_route_avg'] = df['price'].to_numpy() / route_avg
+        df['price_per_minute'] = df['price'] / df['duration']
+        df['price_volatility'] = routes['route_std'].to_numpy()[codes] / route_avg
+
+        df['search_date'] = pd.to_datetime(df['search_date'])
+        df['flight_date'] = pd.to_datetime(df['flight_date'])
+        df['search_month'] = df['search_date'].dt.month
+        df['flight_month'] = df['flight_date'].dt.month
+        df['is_weekend'] = df['day_of_week'].isin(['Saturday', 'Sunday'])
+        df['season'] = df['flight_month'].map(SEASONS)
+
+        df['route_competition'] = routes['route_competition'].to_numpy()[codes]
+        if not has_route.all():
+            # Comme transform('nunique') d'add_route_features, en float s'il y avait des lignes sans route
+            df['route_competition'] = df['route_competition'].astype('float64')
+        df['route_frequency'] = routes['route_frequency'].to_numpy()[codes]
+        return df
+
     def add_price_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Ajoute des features liées aux prix"""
         df = df.copy()
@@ -68,11 +173,20 @@ class FlightFeatureBuilder:
     def process_destination(self, destination: str) -> pd.DataFrame:
         """Traitement complet pour une destination"""
         df = self.load_destination_data(destination)
-        
-        df = (df
-            .pipe(self.add_price_features)
-            .pipe(self.add_temporal_features)
-            .pipe(self.add_route_features)
-        )
-        
-        return df
\ No newline at end of file
+        return self.build_features(df, copy=False)
+
+    def process_destinations(self, destinations: List[str] = None, workers: int = 1) -> pd.DataFrame:
+        """
+        Traitement complet de plusieurs destinations (toutes si None).
+
+        Avec workers <= 1, les destinations sont chargées ensemble et les features
+        calculées en une passe sur l'ensemble ; sinon chaque destination est traitée
+        dans un processus du pool et les résultats sont concaténés.
+        """
+        destinations = [destination.upper() for destination in (destinations or self.available_destinations())]
+        if workers <= 1 or len(destinations) <= 1:
+            return self.build_features(self.load_destinations(destinations), copy=False)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(_build_destination, [self.data_path] * len(destinations), destinations))
+        return pd.concat(frames, ignore_index=True)
\ No newline at end of file
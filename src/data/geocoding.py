@@ -0,0 +1,135 @@
+"""Table persistante ville -> coordonnées / aéroport et distances des routes depuis l'origine.
+
+La table city_coordinates.json est livrée avec le dépôt : le concatenator n'appelle
+plus Nominatim pour les villes connues. Une ville absente est géocodée une seule fois
+puis ajoutée à la table (save_city_table), les exécutions suivantes restent hors ligne.
+
+Format : {"Londres": {"code": "LON", "country": "United Kingdom", "latitude": 51.5074, "longitude": -0.1278}, ...}
+
+Usage : python src/data/geocoding.py [--refresh]   # complète la table avec DESTINATIONS
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from geopy.distance import geodesic
+from geopy.exc import GeocoderServiceError
+from geopy.geocoders import Nominatim
+
+
+CITY_TABLE_PATH = Path(__file__).resolve().parent / 'city_coordinates.json'
+DEFAULT_COUNTRY = 'France'  # Pays utilisé pour une ville absente de la table et du mapping
+
+# Enfant du logger 'concatenator' : les messages suivent ses handlers
+logger = logging.getLogger('concatenator.geocoding')
+
+
+def load_city_table(path=CITY_TABLE_PATH):
+    """Table ville -> {code, country, latitude, longitude} ; vide si le fichier n'existe pas"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_city_table(table, path=CITY_TABLE_PATH):
+    """Écrit la table (fichier temporaire puis remplacement, pour ne jamais laisser un JSON tronqué)"""
+    path = Path(path)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, indent=4)
+        f.write('\n')
+    tmp_path.replace(path)
+
+
+def city_coordinates(table, city_name):
+    """(latitude, longitude) d'une ville de la table, None si elle n'y est pas"""
+    entry = table.get(city_name)
+    if entry is None:
+        return None
+    return (entry['latitude'], entry['longitude'])
+
+
+def geocode_city(city_name, country=None):
+    """
+    Géocode une ville avec Nominatim (réseau).
+
+    Args:
+        city_name (str): nom de la ville
+        country (str): pays ajouté à la recherche (DEFAULT_COUNTRY si None)
+
+    Returns:
+        tuple: (latitude, longitude) ou None si non trouvé
+    """
+    search_query = f"{city_name}, {country or DEFAULT_COUNTRY}"
+    try:
+        logger.debug(f"Recherche de géolocalisation pour: {search_query}")
+        location = Nominatim(user_agent="flight_scraper").geocode(search_query)
+    except GeocoderServiceError as e:  # Délai dépassé, service indisponible ou hors ligne
+        logger.error(f"Erreur de géocodage pour {city_name}: {str(e)}")
+        return None
+
+    if location:
+        logger.debug(f"Coordonnées trouvées pour {search_query}: {location.latitude}, {location.longitude}")
+        return (location.latitude, location.longitude)
+    logger.warning(f"Aucune coordonnée trouvée pour {search_query}")
+    return None
+
+
+def route_distances(table, origin):
+    """Distance géodésique (km, arrondie à 2 décimales) entre l'origine et chaque ville de la table"""
+    return {city: round(geodesic(origin, city_coordinates(table, city)).kilometers, 2) for city in table}
+
+
+def seed_city_table(table, destinations, country_mapping=None, refresh=False):
+    """
+    Ajoute à la table les villes de DESTINATIONS manquantes (géocodage réseau).
+
+    Args:
+        destinations (dict): code IATA -> nom de ville (src.scraping.config.DESTINATIONS)
+        country_mapping (dict): ville -> pays, pour préciser la recherche
+        refresh (bool): géocoder à nouveau les villes déjà présentes
+
+    Returns:
+        list: villes ajoutées ou mises à jour
+    """
+    country_mapping = country_mapping or {}
+    updated = []
+    for code, city in destinations.items():
+        if city in table and not refresh:
+            continue
+        country = country_mapping.get(city) or table.get(city, {}).get('country')
+        coords = geocode_city(city, country)
+        if coords is None:
+            continue
+        table[city] = {'code': code, 'country': country or DEFAULT_COUNTRY, 'latitude': coords[0], 'longitude': coords[1]}
+        updated.append(city)
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Complète la table des coordonnées des villes de destination")
+    parser.add_argument('--refresh', action='store_true', help="Géocoder à nouveau les villes déjà présentes")
+    parser.add_argument('--path', type=Path, default=CITY_TABLE_PATH)
+    args = parser.parse_args(argv)
+
+    # Import tardif : la configuration du scraping n'est pas nécessaire pour lire la table
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from src.scraping.config import DESTINATIONS
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    table = load_city_table(args.path)
+    missing = [city for city in DESTINATIONS.values() if city not in table]
+    print(f"{len(table)} villes dans la table, {len(missing)} destinations manquantes")
+
+    updated = seed_city_table(table, DESTINATIONS, refresh=args.refresh)
+    if updated:
+        save_city_table(table, args.path)
+    print(f"{len(updated)} villes ajoutées ou mises à jour : {', '.join(updated) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
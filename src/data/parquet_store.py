@@ -0,0 +1,181 @@
+"""Stockage Parquet des vols combinés, partitionné par destination et jour de recherche.
+
+Arborescence : <racine>/destination=AMS/search_date=2024-11-23/<dossier>-<n>.parquet
+Chaque source (une destination du concatenator) écrit ses propres fichiers : réécrire
+une source ne touche pas aux données des autres sources.
+"""
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+PARQUET_FOLDER = 'parquet'  # Sous-dossier de data/ contenant le dataset Parquet
+
+# Colonnes de partition (valeurs stockées dans les noms de dossiers)
+PARTITIONING = ds.partitioning(
+    pa.schema([('destination', pa.string()), ('search_date', pa.string())]),
+    flavor='hive'
+)
+
+# Colonnes à faible cardinalité : encodées en dictionnaire
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
+FLIGHT_SCHEMA = pa.schema([
+    ('search_date', pa.string()),
+    ('flight_date', pa.date32()),
+    ('origin', _DICT),
+    ('destination', pa.string()),
+    ('destination_city', _DICT),
+    ('url', pa.string()),
+    ('departure_time', pa.string()),
+    ('arrival_time', pa.string()),
+    ('duration', pa.int32()),
+    ('price', pa.float32()),
+    ('is_direct', pa.bool_()),
+    ('origin_airport', _DICT),
+    ('destination_airport', _DICT),
+    ('checked_baggage', _DICT),
+    ('hand_baggage', _DICT),
+    ('layover_airport', _DICT),
+    ('layover_duration', pa.int32()),
+    ('airlines', _DICT),
+    ('flight_connection_company', _DICT),
+    ('fare_class', _DICT),
+    ('origin_coordinates', _DICT),
+    ('destination_coordinates', _DICT),
+    ('distance_km', pa.float64()),
+    ('search_date_with_hour', pa.timestamp('s')),
+    ('flight_date_with_time', pa.timestamp('s')),
+    ('flight_arrival_with_time', pa.timestamp('s')),
+    ('second_flight_duration', pa.int32()),
+    ('days_until_flight', pa.int32()),
+    ('day_of_week', _DICT),
+    ('departure_period', _DICT),
+    ('flight_type', _DICT),
+    ('price_category', _DICT),
+    ('flight_id', pa.int64()),
+])
+
+
+def _to_arrow_column(values, field):
+    """Convertit une colonne pandas (issue du nettoyage ou relue d'un CSV) vers le type du schéma"""
+    arrow_type = field.type
+    if pa.types.is_dictionary(arrow_type) or pa.types.is_string(arrow_type):
+        try:
+            strings = pa.array(values, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Valeurs non textuelles (ex. "0" relu comme entier depuis un CSV)
+            strings = pa.array(values.astype(str).where(values.notna(), None), type=pa.string(), from_pandas=True)
+        return strings.cast(arrow_type)
+    if pa.types.is_date(arrow_type) or pa.types.is_timestamp(arrow_type):
+        timestamps = pa.array(pd.to_datetime(values, errors='coerce').astype('datetime64[s]'), type=pa.timestamp('s'))
+        return timestamps.cast(arrow_type)
+    if pa.types.is_boolean(arrow_type):
+        if not pd.api.types.is_bool_dtype(values):
+            values = values.map({True: True, False: False, 'True': True, 'False': False, 'true': True, 'false': False})
+        return pa.array(values.astype('boolean'), type=arrow_type)
+    if pa.types.is_integer(arrow_type):
+        return pa.array(pd.to_numeric(values, errors='coerce').round().astype('Int64'), type=arrow_type)
+    return pa.array(pd.to_numeric(values, errors='coerce'), type=arrow_type)
+
+
+def to_arrow_table(df):
+    """Table Arrow au schéma FLIGHT_SCHEMA ; les colonnes absentes sont nulles"""
+    columns = []
+    for field in FLIGHT_SCHEMA:
+        if field.name in df:
+            columns.append(_to_arrow_column(df[field.name].reset_index(drop=True), field))
+        else:
+            columns.append(pa.nulls(len(df), type=field.type))
+    return pa.Table.from_arrays(columns, schema=FLIGHT_SCHEMA)
+
+
+def write_flights(data, root, source):
+    """
+    Remplace les fichiers Parquet d'un dossier source par le contenu de data.
+
+    Args:
+        data (DataFrame | iterable): vols combinés du dossier source, ou blocs de vols
+            successifs (écriture au fil de l'eau, sans assembler le DataFrame complet)
+        root (Path): racine du dataset Parquet
+        source (str): nom du dossier source (préfixe des fichiers écrits)
+
+    Returns:
+        int: nombre de partitions écrites
+    """
+    root = Path(root)
+    for old_file in root.glob(f'destination=*/search_date=*/{source}-*.parquet'):
+        old_file.unlink()
+
+    frames = [data] if isinstance(data, pd.DataFrame) else data
+    batches = (batch for df in frames for batch in to_arrow_table(df).to_batches())
+    written = []
+    ds.write_dataset(
+        pa.RecordBatchReader.from_batches(FLIGHT_SCHEMA, batches), root, format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=f'{source}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=lambda written_file: written.append(written_file.path)
+    )
+
+    # Partitions vidées par la réécriture
+    for folder in root.glob('destination=*/search_date=*'):
+        if folder.is_dir() and not any(folder.iterdir()):
+            folder.rmdir()
+    return len(written)
+
+
+def flights_dataset(root):
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING, schema=FLIGHT_SCHEMA)
+
+
+def build_filter(destinations=None, search_date_from=None, search_date_to=None):
+    """Expression de filtre sur les colonnes de partition (élagage des dossiers à la lecture)"""
+    expression = None
+    conditions = []
+    if destinations:
+        conditions.append(ds.field('destination').isin(list(destinations)))
+    if search_date_from:
+        conditions.append(ds.field('search_date') >= str(search_date_from))
+    if search_date_to:
+        conditions.append(ds.field('search_date') <= str(search_date_to))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_flights(root, destinations=None, columns=None, search_date_from=None, search_date_to=None,
+                 filter=None, categorical=False):
+    """
+    Lit les vols du dataset Parquet avec projection de colonnes et filtres poussés au scan.
+
+    Args:
+        destinations (list): codes destination à lire (toutes si None)
+        columns (list): colonnes à lire (toutes si None)
+        search_date_from, search_date_to (str): bornes incluses sur le jour de recherche (YYYY-MM-DD)
+        filter (Expression): filtre pyarrow supplémentaire, ex. ds.field('price') < 100
+        categorical (bool): garder les colonnes encodées en dictionnaire comme Categorical pandas
+
+    Returns:
+        DataFrame
+    """
+    expression = build_filter(destinations, search_date_from, search_date_to)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    table = flights_dataset(root).to_table(columns=columns, filter=expression)
+    if not categorical:
+        table = table.cast(pa.schema([
+            pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ]))
+    return table.to_pandas(date_as_object=False)
+
+
+def count_flights(root, destinations=None):
+    """Nombre de vols par destination, lu dans les métadonnées Parquet sans charger les données"""
+    dataset = flights_dataset(root)
+    if destinations is None:
+        destinations = sorted({Path(folder).name.split('=', 1)[1] for folder in Path(root).glob('destination=*')})
+    return {destination: dataset.count_rows(filter=build_filter([destination])) for destination in destinations}
@@ -0,0 +1,337 @@
+"""Stockage des JSON scrapés, partitionné par destination et jour de recherche.
+
+Arborescence : <data>/raw/destination=AMS/search_date=2024-11-19/flights_2024-11-20.json
+Une observation (destination, jour de recherche, date de vol) = un fichier ; le
+scraper écrit directement dans cette arborescence (src.scraping.manifest.get_output_path).
+
+Les anciens dossiers par jour de scraping (AMS, AMS_19_11, AMS_21_11...) restent lus
+comme des fichiers de leur destination tant qu'ils ne sont pas migrés :
+destination_files('AMS') renvoie toutes les observations d'AMS en un seul appel.
+
+Usage : python src/data/raw_store.py migrate [--base-folder data] [--keep-sources] [--dry-run]
+        python src/data/raw_store.py stats [--base-folder data]
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+RAW_FOLDER = 'raw'  # Sous-dossier de data/ contenant les JSON partitionnés
+# Dossier de destination historique : code IATA, suivi ou non du jour de scraping (AMS, AMS_19_11)
+LEGACY_FOLDER_PATTERN = re.compile(r'^([A-Z]{3})(?:_\d{2}_\d{2})?$')
+# Dossiers de data/ produits par le pipeline (ni JSON scrapés ni dossiers historiques)
+DATA_FOLDERS = {RAW_FOLDER, 'combined', 'parquet', 'backups', 'logs', 'metrics', 'processed'}
+
+logger = logging.getLogger('concatenator.raw_store')
+
+
+def partition_folder(root, destination, search_date):
+    return Path(root) / f'destination={destination}' / f'search_date={search_date}'
+
+
+def raw_file_path(root, destination, search_date, flight_date, search_time=None):
+    """
+    Chemin d'une observation dans le stockage brut.
+
+    Args:
+        search_date (str): jour de recherche (YYYY-MM-DD)
+        search_time (str): heure de recherche (HHMMSS), ajoutée au nom quand plusieurs
+            recherches du même jour existent pour une date de vol
+    """
+    name = f'flights_{flight_date}.json' if search_time is None else f'flights_{flight_date}_{search_time}.json'
+    return partition_folder(root, destination, search_date) / name
+
+
+def legacy_destination(folder_name):
+    """Code destination d'un dossier historique (AMS_19_11 -> AMS), None pour un autre dossier"""
+    match = LEGACY_FOLDER_PATTERN.match(folder_name)
+    return match.group(1) if match else None
+
+
+def legacy_folders(base_folder):
+    """Dossiers historiques de data/ groupés par destination : {'AMS': [AMS, AMS_19_11, ...]}"""
+    folders = {}
+    for folder in sorted(Path(base_folder).iterdir()):
+        destination = legacy_destination(folder.name)
+        if destination and folder.is_dir():
+            folders.setdefault(destination, []).append(folder)
+    return folders
+
+
+def other_folders(base_folder):
+    """Dossiers de data/ qui ne sont ni historiques ni produits par le pipeline (ex. original_21_11)"""
+    return [folder for folder in sorted(Path(base_folder).iterdir())
+            if folder.is_dir() and not folder.name.startswith('.') and folder.name not in DATA_FOLDERS
+            and legacy_destination(folder.name) is None]
+
+
+def raw_destinations(base_folder):
+    root = Path(base_folder) / RAW_FOLDER
+    return sorted(folder.name.split('=', 1)[1] for folder in root.glob('destination=*') if folder.is_dir())
+
+
+def find_destinations(base_folder):
+    """Destinations présentes dans le stockage brut ou dans les dossiers historiques"""
+    return sorted(set(raw_destinations(base_folder)) | set(legacy_folders(base_folder)))
+
+
+def destination_files(base_folder, destination, search_date_from=None):
+    """
+    Tous les fichiers JSON d'une destination : partitions du stockage brut puis dossiers historiques.
+
+    Args:
+        search_date_from (str): ne lister que les partitions à partir de ce jour (YYYY-MM-DD) ;
+            les dossiers historiques sont toujours listés
+    """
+    base_folder = Path(base_folder)
+    files = []
+    for partition in sorted((base_folder / RAW_FOLDER / f'destination={destination}').glob('search_date=*')):
+        if search_date_from and partition.name.split('=', 1)[1] < str(search_date_from):
+            continue
+        files.extend(sorted(partition.glob('*.json')))
+    for folder in legacy_folders(base_folder).get(destination, []):
+        files.extend(sorted(folder.glob('*.json')))
+    return files
+
+
+def observation_key(observation):
+    """(destination, jour de recherche, heure de recherche, date de vol) d'une observation JSON"""
+    search_date = str(observation['search_date'])
+    search_day, _, search_time = search_date.partition(' ')
+    return observation['destination'], search_day, search_time.replace(':', '') or None, observation['flight_date']
+
+
+def place_observation(root, observation, pending=None):
+    """
+    Emplacement d'une observation dans le stockage brut.
+
+    Args:
+        pending (dict): chemin -> observation déjà placée mais pas encore écrite (simulation)
+
+    Returns:
+        tuple: (chemin, déjà présent) ; déjà présent si le fichier cible contient la même observation
+    """
+    destination, search_day, search_time, flight_date = observation_key(observation)
+    candidates = [raw_file_path(root, destination, search_day, flight_date)]
+    if search_time:
+        candidates.append(raw_file_path(root, destination, search_day, flight_date, search_time))
+    pending = {} if pending is None else pending
+
+    def existing(path):
+        if path in pending:
+            return pending[path]
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    # Même jour et même heure mais contenu différent : rare, on ajoute un compteur
+    stem = candidates[-1].stem
+    counter = 2
+    while True:
+        for path in candidates:
+            current = existing(path)
+            if current is None:
+                return path, False
+            if current == observation:
+                return path, True
+        candidates = [candidates[-1].with_name(f'{stem}-{counter}.json')]
+        counter += 1
+
+
+def write_observation(path, observation):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(observation, f, ensure_ascii=False, indent=4)
+    tmp_path.replace(path)
+
+
+def migrate_legacy_folders(base_folder, keep_sources=False, dry_run=False):
+    """
+    Déplace les JSON des dossiers historiques dans le stockage brut partitionné.
+
+    Un fichier contenant une liste d'observations (kayak_data_all.json) est découpé,
+    les observations déjà présentes ne sont pas dupliquées. Le fichier source n'est
+    supprimé qu'une fois toutes ses observations écrites.
+
+    Les JSON des autres dossiers de data/ (other_folders) sont migrés de la même façon,
+    la destination étant lue dans chaque observation ; un dossier sans JSON (copie de
+    CSV combinés comme original_21_11) est signalé comme ignoré.
+
+    Args:
+        keep_sources (bool): copier sans supprimer les fichiers des dossiers historiques
+        dry_run (bool): calculer le rapport sans rien écrire
+
+    Returns:
+        dict: compteurs, fichiers déplacés {source: [cibles]}, fichiers et dossiers
+            ignorés {source: raison} et dossiers historiques migrés {dossier: destination}
+    """
+    base_folder = Path(base_folder)
+    root = base_folder / RAW_FOLDER
+    report = {'counts': Counter(), 'moved': {}, 'skipped': {}, 'folders': {}}
+    planned = {}  # Observations placées pendant une simulation (rien n'est écrit sur disque)
+
+    sources = [(folder, destination) for destination, folders in legacy_folders(base_folder).items()
+               for folder in folders]
+    for folder in other_folders(base_folder):
+        if any(folder.glob('*.json')):
+            sources.append((folder, None))
+            continue
+        files = sum(1 for path in folder.iterdir() if path.is_file())
+        reason = f"aucun fichier JSON ({files} autres fichiers), dossier non migré"
+        logger.warning(f"Dossier ignoré {folder.name}: {reason}")
+        report['skipped'][f'{folder.name}/'] = reason
+        report['counts']['skipped_folders'] += 1
+
+    for folder, destination in sources:
+        if destination:
+            report['folders'][folder.name] = destination
+        for json_file in sorted(folder.glob('*.json')):
+            source = json_file.relative_to(base_folder).as_posix()
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    content = json.load(f)
+                observations = content if isinstance(content, list) else [content]
+                targets = []
+                for observation in observations:
+                    path, exists = place_observation(root, observation, planned)
+                    if exists:
+                        report['counts']['duplicates'] += 1
+                    elif dry_run:
+                        planned[path] = observation
+                    else:
+                        write_observation(path, observation)
+                    report['counts']['observations'] += 1
+                    targets.append(path.relative_to(base_folder).as_posix())
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"Fichier non migré {source}: {type(e).__name__} {str(e)}")
+                report['skipped'][source] = f"{type(e).__name__}: {str(e)}"
+                report['counts']['skipped'] += 1
+                continue
+
+            report['moved'][source] = targets
+            report['counts']['files'] += 1
+            if not keep_sources and not dry_run:
+                json_file.unlink()
+
+        if not keep_sources and not dry_run and not any(folder.iterdir()):
+            folder.rmdir()
+            report['counts']['removed_folders'] += 1
+
+    report['counts'] = dict(report['counts'])
+    return report
+
+
+def retire_legacy_outputs(base_folder, folders, dry_run=False):
+    """
+    Retire les sorties des dossiers historiques regroupés dans leur destination.
+
+    Les CSV combinés vols_ams_19_11_combines.csv sont sauvegardés (BackupManager) puis
+    supprimés, les fichiers Parquet de ces dossiers supprimés et leurs entrées oubliées
+    du manifeste d'ingestion : le prochain run du concatenator ré-ingère leurs
+    observations dans le CSV et le Parquet de la destination.
+
+    Args:
+        folders (dict): nom de dossier historique -> destination (rapport de migration)
+
+    Returns:
+        list: sorties retirées (chemins relatifs à base_folder)
+    """
+    # Import tardif : le concatenator importe ce module
+    from src.data.backup_store import BackupManager
+    from src.data.concatenator import MANIFEST_NAME, IngestionManifest
+    from src.data.parquet_store import PARQUET_FOLDER
+
+    base_folder = Path(base_folder)
+    retired = []
+    snapshot_folders = [name for name, destination in folders.items() if name != destination]
+    backup_manager = BackupManager(base_folder)
+    for name in snapshot_folders:
+        combined_file = base_folder / 'combined' / f'vols_{name.lower()}_combines.csv'
+        if combined_file.exists():
+            retired.append(combined_file.relative_to(base_folder).as_posix())
+            if not dry_run:
+                backup_manager.create_backup(combined_file)
+                combined_file.unlink()
+        for parquet_file in (base_folder / PARQUET_FOLDER).glob(f'destination=*/search_date=*/{name}-*.parquet'):
+            retired.append(parquet_file.relative_to(base_folder).as_posix())
+            if not dry_run:
+                parquet_file.unlink()
+
+    if not dry_run and (base_folder / MANIFEST_NAME).exists():
+        manifest = IngestionManifest(base_folder / MANIFEST_NAME)
+        try:
+            manifest.forget(folders)
+        finally:
+            manifest.close()
+    return retired
+
+
+def storage_stats(base_folder):
+    """Fichiers par destination dans le stockage brut et dans les dossiers historiques"""
+    base_folder = Path(base_folder)
+    stats = {}
+    for destination in find_destinations(base_folder):
+        raw = list((base_folder / RAW_FOLDER / f'destination={destination}').glob('search_date=*/*.json'))
+        legacy = legacy_folders(base_folder).get(destination, [])
+        stats[destination] = {
+            'raw_files': len(raw),
+            'search_dates': len({path.parent.name for path in raw}),
+            'legacy_folders': [folder.name for folder in legacy],
+            'legacy_files': sum(1 for folder in legacy for _ in folder.glob('*.json')),
+        }
+    return stats
+
+
+def main(argv=None):
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+    parser = argparse.ArgumentParser(description="Stockage brut des JSON scrapés partitionné par destination et jour de recherche")
+    parser.add_argument('--base-folder', type=Path, default=Path(__file__).resolve().parents[2] / 'data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Migrer les dossiers historiques (AMS, AMS_19_11...) vers raw/")
+    migrate_parser.add_argument('--keep-sources', action='store_true', help="Copier sans supprimer les dossiers historiques")
+    migrate_parser.add_argument('--dry-run', action='store_true', help="Afficher le rapport sans rien modifier")
+
+    subparsers.add_parser('stats', help="Fichiers par destination, stockage brut et dossiers historiques")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'stats':
+        for destination, stats in storage_stats(args.base_folder).items():
+            legacy = ', '.join(stats['legacy_folders']) or '-'
+            print(f"{destination}: {stats['raw_files']} fichiers ({stats['search_dates']} jours de recherche), "
+                  f"historique : {stats['legacy_files']} fichiers ({legacy})")
+        return
+
+    report = migrate_legacy_folders(args.base_folder, args.keep_sources, args.dry_run)
+    report['retired'] = retire_legacy_outputs(args.base_folder, report['folders'], args.dry_run)
+
+    counts = report['counts']
+    print(f"{counts.get('files', 0)} fichiers migrés ({counts.get('observations', 0)} observations, "
+          f"{counts.get('duplicates', 0)} déjà présentes), {counts.get('skipped', 0)} ignorés, "
+          f"{counts.get('skipped_folders', 0)} dossiers ignorés, "
+          f"{counts.get('removed_folders', 0)} dossiers supprimés, {len(report['retired'])} sorties retirées")
+    for source, reason in report['skipped'].items():
+        print(f"  ignoré {source}: {reason}")
+    if args.dry_run:
+        print("Simulation : aucun fichier modifié")
+        return
+
+    report_file = args.base_folder / RAW_FOLDER / f'migration_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"Rapport de migration : {report_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Entrepôts de données du pipeline : BigQuery, ou DuckDB en local (hors ligne).
+
+Un entrepôt charge le dataset Parquet des vols combinés (data/parquet, ou à défaut les
+CSV de data/combined) dans la table combined_flights, puis exécute les modèles dbt de
+dbt_process/models/staging et les tests de leurs schema.yml. Les modèles sont rendus
+avec Jinja (source, ref, config) : le même SQL tourne sur BigQuery et sur DuckDB, ce
+qui permet de profiler tout le pipeline sur un portable.
+
+Usage : python src/data/automated_pipeline.py --warehouse duckdb [--database data/warehouse.duckdb]
+"""
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import yaml
+
+from src.data.concatenator import timer
+from src.data.parquet_store import PARQUET_FOLDER
+
+
+DBT_PROJECT_DIR = Path(__file__).resolve().parents[2] / 'dbt_process'
+SOURCE_TABLE = 'combined_flights'  # Table chargée, source bigquery_raw.combined_flights des modèles dbt
+DEFAULT_DUCKDB_PATH = Path(__file__).resolve().parents[2] / 'data' / 'warehouse.duckdb'
+
+# Tests de colonnes pris en charge : requête renvoyant le nombre de lignes en échec
+# (positive_values reprend la macro dbt_process/macros/test_positive_values.sql)
+COLUMN_TESTS = {
+    'not_null': "SELECT COUNT(*) FROM {relation} WHERE {column} IS NULL",
+    'unique': ("SELECT COUNT(*) FROM (SELECT {column} FROM {relation} WHERE {column} IS NOT NULL "
+               "GROUP BY {column} HAVING COUNT(*) > 1) AS duplicates"),
+    'positive_values': "SELECT COUNT(*) FROM {relation} WHERE {column} <= 0",
+}
+
+logger = logging.getLogger('automated_pipeline.warehouse')
+
+
+class Warehouse(ABC):
+    """
+    Interface commune des entrepôts.
+
+    load charge la table SOURCE_TABLE, execute exécute une instruction SQL, scalar renvoie
+    la première valeur d'une requête et relation le nom qualifié d'une table ou d'une vue.
+    Un entrepôt qui n'implémente pas l'une de ces méthodes ne peut pas être instancié.
+    """
+    name = None
+
+    @abstractmethod
+    def relation(self, name):
+        pass
+
+    @abstractmethod
+    def load(self, base_folder, full=False):
+        pass
+
+    @abstractmethod
+    def execute(self, sql):
+        pass
+
+    @abstractmethod
+    def scalar(self, sql):
+        pass
+
+    def materialize(self, name, sql, materialized='view'):
+        """Crée ou remplace la vue (ou la table) d'un modèle"""
+        kind = 'TABLE' if materialized == 'table' else 'VIEW'
+        self.execute(f"CREATE OR REPLACE {kind} {self.relation(name)} AS\n{sql}")
+
+    def close(self):
+        pass
+
+
+class BigQueryWarehouse(Warehouse):
+    name = 'bigquery'
+
+    def __init__(self, client, project_id, dataset_id):
+        self.client = client
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+
+    def relation(self, name):
+        return f"`{self.project_id}.{self.dataset_id}.{name}`"
+
+    def load(self, base_folder, full=False):
+        # Import tardif : google-cloud-bigquery n'est pas nécessaire en mode local
+        from src.data.bigquery_loader import BigQueryLoader
+        return BigQueryLoader(self.client, self.project_id, self.dataset_id, base_folder, SOURCE_TABLE).load(full=full)
+
+    def execute(self, sql):
+        return self.client.query(sql).result()
+
+    def scalar(self, sql):
+        return next(iter(self.execute(sql)))[0]
+
+
+class DuckDBWarehouse(Warehouse):
+    """Entrepôt local dans un fichier DuckDB (ou en mémoire avec ':memory:')"""
+    name = 'duckdb'
+
+    def __init__(self, database=DEFAULT_DUCKDB_PATH):
+        import duckdb  # Dépendance du seul mode local
+
+        if database != ':memory:':
+            Path(database).parent.mkdir(parents=True, exist_ok=True)
+        self.database = database
+        self.conn = duckdb.connect(str(database))
+
+    def relation(self, name):
+        return f'"{name}"'
+
+    def load(self, base_folder, full=False):
+        """
+        Recharge entièrement combined_flights (le chargement local ne coûte que quelques secondes).
+
+        Returns:
+            dict: format lu et lignes chargées
+        """
+        base_folder = Path(base_folder)
+        parquet_root = base_folder / PARQUET_FOLDER
+        if any(parquet_root.glob('destination=*/search_date=*/*.parquet')):
+            source_format = 'parquet'
+            # destination et search_date ne sont que dans les noms de dossiers (partitionnement hive)
+            source = (f"SELECT * REPLACE (CAST(search_date AS DATE) AS search_date) "
+                      f"FROM read_parquet('{parquet_root.as_posix()}/destination=*/search_date=*/*.parquet', "
+                      f"hive_partitioning = true, hive_types = {{'destination': VARCHAR, 'search_date': VARCHAR}})")
+        else:
+            combined_folder = base_folder / 'combined'
+            if not any(combined_folder.glob('*.csv')):
+                raise FileNotFoundError(f"Ni dataset Parquet ni CSV combinés dans {base_folder}")
+            source_format = 'csv'
+            source = f"SELECT * FROM read_csv('{combined_folder.as_posix()}/*.csv', header = true, union_by_name = true)"
+
+        self.execute(f"CREATE OR REPLACE TABLE {self.relation(SOURCE_TABLE)} AS {source}")
+        rows = self.scalar(f"SELECT COUNT(*) FROM {self.relation(SOURCE_TABLE)}")
+        logger.info(f"DuckDB ({self.database}) : {rows} lignes chargées depuis {source_format}")
+        return {'format': source_format, 'rows': rows}
+
+    def execute(self, sql):
+        return self.conn.execute(sql)
+
+    def scalar(self, sql):
+        return self.conn.execute(sql).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def default_materialization(project_dir, folder):
+    """Matérialisation configurée pour un dossier de modèles dans dbt_project.yml (view par défaut)"""
+    with open(Path(project_dir) / 'dbt_project.yml', 'r', encoding='utf-8') as f:
+        project = yaml.safe_load(f)
+    folders = (project.get('models') or {}).get(project['name'], {}) or {}
+    return (folders.get(folder) or {}).get('+materialized', 'view')
+
+
+def render_model(sql, warehouse, materialized='view'):
+    """
+    Rend le SQL Jinja d'un modèle dbt pour un entrepôt.
+
+    Returns:
+        tuple: (SQL rendu, matérialisation, modèles référencés par ref())
+    """
+    import jinja2  # Import tardif : importer le module (chargement seul) ne nécessite pas Jinja
+
+    settings = {'materialized': materialized}
+    refs = []
+
+    def config(**kwargs):
+        settings.update(kwargs)
+        return ''
+
+    def ref(model_name):
+        refs.append(model_name)
+        return warehouse.relation(model_name)
+
+    rendered = jinja2.Environment().from_string(sql).render(
+        config=config, ref=ref, source=lambda source_name, table_name: warehouse.relation(table_name)
+    )
+    return rendered, settings['materialized'], refs
+
+
+def model_order(dependencies):
+    """Modèles triés pour que chaque modèle soit construit après ceux qu'il référence"""
+    ordered = []
+
+    def visit(name, path=()):
+        if name in ordered:
+            return
+        if name in path:
+            raise ValueError(f"Référence circulaire entre modèles dbt : {' -> '.join(path + (name,))}")
+        for dependency in dependencies.get(name, []):
+            if dependency in dependencies:
+                visit(dependency, path + (name,))
+        ordered.append(name)
+
+    for name in sorted(dependencies):
+        visit(name)
+    return ordered
+
+
+def column_tests(schema, warehouse):
+    """Tests de colonnes (sources et modèles) déclarés dans un schema.yml : (nom, relation, colonne)"""
+    declared = []
+    for source in schema.get('sources') or []:
+        for table in source.get('tables') or []:
+            declared.append((table['name'], table.get('columns') or []))
+    for model in schema.get('models') or []:
+        declared.append((model['name'], model.get('columns') or []))
+
+    tests = []
+    for relation_name, columns in declared:
+        for column in columns:
+            for test in column.get('tests') or column.get('data_tests') or []:
+                if not isinstance(test, str) or test not in COLUMN_TESTS:
+                    logger.warning(f"Test non pris en charge en local, ignoré : {test} ({relation_name}.{column['name']})")
+                    continue
+                tests.append((test, relation_name, column['name']))
+    return tests
+
+
+def run_dbt_models(warehouse, project_dir=DBT_PROJECT_DIR, folder='staging', stages=None):
+    """
+    Construit les modèles d'un dossier dbt dans l'entrepôt, puis exécute leurs tests.
+
+    Args:
+        stages (dict): mesures par étape (concatenator.timer) complétées avec
+            model:<nom> pour chaque modèle et tests pour l'ensemble des tests
+
+    Returns:
+        dict: modèles construits et tests exécutés {test, relation, column, failures}
+    """
+    project_dir = Path(project_dir)
+    stages = {} if stages is None else stages
+    models_folder = project_dir / 'models' / folder
+    materialized = default_materialization(project_dir, folder)
+
+    rendered = {}
+    for model_file in sorted(models_folder.glob('*.sql')):
+        rendered[model_file.stem] = render_model(model_file.read_text(encoding='utf-8'), warehouse, materialized)
+    built = []
+    for name in model_order({name: refs for name, (_, _, refs) in rendered.items()}):
+        sql, model_materialized, _ = rendered[name]
+        with timer(f'model:{name}', stages):
+            warehouse.materialize(name, sql, model_materialized)
+        built.append(name)
+        logger.info(f"Modèle {name} construit ({model_materialized}) en {stages[f'model:{name}']['seconds']:.2f}s")
+
+    results = []
+    with timer('tests', stages) as stage:
+        for schema_file in sorted(models_folder.glob('*.yml')):
+            with open(schema_file, 'r', encoding='utf-8') as f:
+                schema = yaml.safe_load(f) or {}
+            for test, relation_name, column in column_tests(schema, warehouse):
+                sql = COLUMN_TESTS[test].format(relation=warehouse.relation(relation_name), column=column)
+                failures = warehouse.scalar(sql)
+                results.append({'test': test, 'relation': relation_name, 'column': column, 'failures': failures})
+                log = logger.warning if failures else logger.info
+                log(f"Test {test} {relation_name}.{column} : {'OK' if not failures else f'{failures} lignes en échec'}")
+        stage['items'] += len(results)
+    return {'models': built, 'tests': results}
@@ -0,0 +1,185 @@
+"""Configuration du scraper Kayak : constantes, destinations, proxies et sélecteurs.
+
+Module sans dépendance lourde ni effet de bord, importable instantanément.
+"""
+from datetime import timedelta
+
+
+# Ajouter ces constantes en haut du fichier
+RETRY_DELAY = (400, 600)  # Délai en secondes avant de réessayer en cas de captcha
+ERROR_RETRY_DELAY = (30, 60)  # Délai en secondes avant de réessayer après une autre erreur
+MAX_RETRIES = 3  # Nombre maximum de tentatives par URL
+DELAY_BETWEEN_REQUESTS = (25, 45)  # Dlais un peu plus longs
+MAX_CONCURRENT_SESSIONS = 3  # Augmenté de 3 à 5
+SESSION_TIMEOUT = 150  # timeout en secondes
+PROXY_BLACKLIST_DURATION = 1800  # 30 minutes en secondes
+PROXY_CHECK_WORKERS = 16  # Nombre de proxies testés en parallèle
+PROXY_CACHE_FILE = 'proxy_cache.pkl'  # Cache de santé des proxies
+PROXY_CACHE_TTL = timedelta(hours=1)  # Au-delà, le cache est re-testé en arrière-plan
+PROXY_BACKOFF_BASE = 60  # Première mise à l'écart d'un proxy en échec, doublée à chaque échec
+PROXY_DEFAULT_LATENCY = 10  # Latence supposée (s) d'un proxy sans historique de pages
+MAX_WORKERS = 8  # Nombre de workers, et donc de drivers Chrome simultanés
+DRIVER_MAX_PAGES = 40  # Nombre de pages servies avant recyclage d'un driver
+DRIVER_MAX_AGE = 1800  # Durée de vie maximale d'un driver en secondes
+EXTRACTION_MODE = 'js'  # 'js' : une seule passe execute_script, 'soup' : extraction carte par carte
+MAX_FLIGHT_CARDS = 25  # Nombre maximum de cartes analysées par page
+CAPTURE_RESULTS_XHR = True  # Lire les vols dans la réponse XHR de recherche (selenium-wire) avant le DOM
+RESULTS_XHR_PATTERN = r'.*/i/api/search/dynamic/flights/poll.*'  # Endpoint de recherche capturé
+RESULTS_XHR_TIMEOUT = 20  # Attente maximale (s) de la réponse de recherche complète
+RESOURCE_BLOCKING_PROFILE = 'light'  # Profil de blocage des ressources : 'none', 'light' ou 'aggressive'
+METRICS_FOLDER = 'data/metrics'  # Dossier des métriques de pages (octets, temps de chargement)
+REPLAY_CAPTURE_FOLDER = None  # Ex. 'data/replay' : sauvegarde le HTML des pages de résultats pour le banc de rejeu
+DATA_FOLDER = 'data'  # Dossier racine des fichiers JSON scrapés
+RAW_FOLDER = 'raw'  # Sous-dossier de DATA_FOLDER : raw/destination=AMS/search_date=2024-11-23/flights_<date>.json
+MANIFEST_PATH = 'data/scrape_manifest.sqlite'  # Manifeste des jobs de scraping
+RESCRAPE_INTERVAL_DAYS = 1  # Une observation par (destination, date de vol) tous les N jours
+
+
+# Ajouter en haut du fichier après les imports
+DESTINATIONS = {
+    # Europe
+    'LON': 'Londres',
+    'MAD': 'Madrid',
+    'BCN': 'Barcelone',
+    'ROM': 'Rome',
+    'AMS': 'Amsterdam',
+    'BER': 'Berlin',
+    'LIS': 'Lisbonne',
+    'DUB': 'Dublin',
+    'CPH': 'Copenhague',
+    'VIE': 'Vienne',
+    'PRG': 'Prague',
+    'BRU': 'Bruxelles',
+    'ATH': 'Athènes',
+    'WAW': 'Varsovie',
+    'BUD': 'Budapest',
+    'ZRH': 'Zurich',
+    'OSL': 'Oslo',
+    'STO': 'Stockholm',
+    'HEL': 'Helsinki',
+    'IST': 'Istanbul',
+    'MXP': 'Milan',
+    
+    # Amérique du Nord
+    'NYC': 'New York',
+    'LAX': 'Los Angeles',
+    'SFO': 'San Francisco',
+    'MIA': 'Miami',
+    'CHI': 'Chicago',
+    'YUL': 'Montréal',
+    'YYZ': 'Toronto',
+    'YVR': 'Vancouver',
+    'MEX': 'Mexico',
+    'CUN': 'Cancún',
+    
+    # Amérique du Sud
+    'GRU': 'São Paulo',
+    'EZE': 'Buenos Aires',
+    'SCL': 'Santiago',
+    'BOG': 'Bogota',
+    'LIM': 'Lima',
+    'RIO': 'Rio de Janeiro',
+    
+    # Asie
+    'DXB': 'Dubai',
+    'DOH': 'Doha',
+    'AUH': 'Abu Dhabi',
+    'SIN': 'Singapour',
+    'HKG': 'Hong Kong',
+    'BKK': 'Bangkok',
+    'KUL': 'Kuala Lumpur',
+    'NRT': 'Tokyo',
+    'ICN': 'Séoul',
+    'PEK': 'Pékin',
+    'PVG': 'Shanghai',
+    'DEL': 'New Delhi',
+    'BOM': 'Mumbai',
+    
+    # Océanie
+    'SYD': 'Sydney',
+    'MEL': 'Melbourne',
+    'AKL': 'Auckland',
+    'BNE': 'Brisbane',
+    'PER': 'Perth',
+    
+    # Afrique
+    'JNB': 'Johannesburg',
+    'CPT': 'Le Cap',
+    'CAI': 'Le Caire',
+    'CMN': 'Casablanca',
+    'DKR': 'Dakar',
+    'NBO': 'Nairobi'                                                                            
+}
+# Ajouter votre liste de proxies ici
+CUSTOM_PROXIES = [
+    "52.143.141.88:3128", 
+    "4.178.185.235:3128",
+    "20.199.91.99:3128",
+    "20.199.94.172:3128",
+    "4.251.124.194:3128",
+    "4.251.123.247:3128",
+    "4.178.175.105:3128",
+    "4.212.8.170:3128",
+    "4.251.113.113:3128",
+    "4.212.15.184:3128",
+    "4.251.116.117:3128",
+    "4.211.104.4:3128",
+    "4.211.105.36:3128",
+    "4.211.105.71:3128",
+    "4.178.189.175:3128",
+    "4.178.189.213:3128",
+    "4.178.189.160:3128",
+    "4.251.113.80:3128"
+]
+
+# Définir les sélecteurs en haut du fichier
+SELECTORS = {
+    # Mise à jour des sélecteurs existants et ajout de nouveaux
+    'flight_card': "//div[contains(@class, 'nrc6')]",
+    'times': ".//div[contains(@class, 'vmXl-mod-variant-large')]",
+    'duration': ".//div[contains(@class, 'xdW8')]//div[contains(@class, 'vmXl')]",
+    'price': ".//div[contains(@class, 'f8F1-price-text')]",
+    'fare_class': "//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'M_JD-large-display')]//div[contains(@class, 'DOum-name')]",
+    'hand_baggage': ".//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[1]//div[2]",
+    'checked_baggage': ".//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[2]//div[2]",
+    'airlines': ".//div[contains(@class, 'c5iUd-leg-carrier')]//img",
+    'layover': ".//div[contains(@class, 'JWEO-stops-text')]",
+    'layover_info': """
+        return document.querySelector("#listWrapper > div > div:nth-child(3) > div.Fxw9 > div:nth-child(" + arguments[0] + ") > div > div > div > div.nrc6-content-section > div.nrc6-main > div > ol > li > div > div > div.JWEO > div.c_cgF.c_cgF-mod-variant-full-airport > span > span")?.textContent || 'N/A';
+    """,
+    'airports': ".//span[contains(@class, 'jLhY-airport-info')]/span[1]",
+}
+
+# Ressources bloquées dans les navigateurs du scraper (motifs Network.setBlockedURLs).
+# Les balises <img> restent dans le DOM : les logos ne sont pas chargés mais leur
+# attribut alt (nom de la compagnie) reste lisible.
+TRACKER_PATTERNS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*facebook.net*',
+    '*facebook.com/tr*',
+    '*hotjar.com*',
+    '*criteo.*',
+    '*adsrvr.org*',
+    '*bing.com/bat*',
+]
+
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf']
+
+IMAGE_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico', '*/rimg/*']
+
+RESOURCE_BLOCKING_PROFILES = {
+    'none': {
+        'block_images': False,
+        'blocked_urls': []
+    },
+    'light': {
+        'block_images': False,
+        'blocked_urls': TRACKER_PATTERNS + FONT_PATTERNS
+    },
+    'aggressive': {
+        'block_images': True,
+        'blocked_urls': TRACKER_PATTERNS + FONT_PATTERNS + IMAGE_PATTERNS + ['*.mp4', '*.webm']
+    },
+}
@@ -0,0 +1,136 @@
+"""Manifeste des jobs de scraping, persisté dans SQLite.
+
+Chaque observation est identifiée par (search_date, destination, flight_date) :
+un même vol recherché deux jours différents donne deux observations distinctes.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .config import DATA_FOLDER, MANIFEST_PATH, RAW_FOLDER
+
+
+# Statuts possibles d'un job
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_EMPTY = 'empty'  # Page chargée mais aucun vol extrait
+STATUS_FAILED = 'failed'
+
+
+def get_output_path(destination, flight_date, search_date, data_folder=DATA_FOLDER):
+    """Chemin du fichier JSON d'une observation, partitionné par destination et jour de recherche"""
+    return os.path.join(data_folder, RAW_FOLDER, f"destination={destination}", f"search_date={search_date}",
+                        f"flights_{flight_date}.json")
+
+
+class ScrapeManifest:
+    """Journal des jobs : statut, nombre de tentatives et durée de chaque observation"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        is_new = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                search_date TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                flight_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                duration REAL,
+                flights INTEGER,
+                output_path TEXT,
+                error TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (search_date, destination, flight_date)
+            )
+        """)
+        self.conn.commit()
+        self.is_new = is_new
+
+    def start(self, search_date, destination, flight_date):
+        """Marque un job comme en cours et incrémente ses tentatives"""
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO jobs (search_date, destination, flight_date, status, attempts, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (search_date, destination, flight_date)
+                DO UPDATE SET status = excluded.status, attempts = attempts + 1, updated_at = excluded.updated_at
+            """, (search_date, destination, flight_date, STATUS_RUNNING, datetime.now().isoformat()))
+
+    def finish(self, search_date, destination, flight_date, status, duration=None,
+               flights=None, output_path=None, error=None):
+        with self.lock, self.conn:
+            self.conn.execute("""
+                UPDATE jobs SET status = ?, duration = ?, flights = ?, output_path = ?, error = ?, updated_at = ?
+                WHERE search_date = ? AND destination = ? AND flight_date = ?
+            """, (status, duration, flights, output_path, error, datetime.now().isoformat(),
+                  search_date, destination, flight_date))
+
+    def done_since(self, min_search_date):
+        """Couples (destination, flight_date) déjà scrapés depuis min_search_date inclus"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT DISTINCT destination, flight_date FROM jobs
+                WHERE status = ? AND search_date >= ?
+            """, (STATUS_DONE, min_search_date)).fetchall()
+        return set(rows)
+
+    def summary(self, search_date=None):
+        """Nombre de jobs, tentatives et durée moyenne par statut"""
+        query = "SELECT status, COUNT(*), SUM(attempts), AVG(duration) FROM jobs"
+        params = ()
+        if search_date:
+            query += " WHERE search_date = ?"
+            params = (search_date,)
+        with self.lock:
+            rows = self.conn.execute(query + " GROUP BY status", params).fetchall()
+        return {status: {'jobs': count, 'attempts': attempts, 'avg_duration': round(avg or 0, 2)}
+                for status, count, attempts, avg in rows}
+
+    def backfill(self, data_folder=DATA_FOLDER):
+        """Enregistre les fichiers JSON déjà présents comme observations terminées.
+
+        Utilisé à la création du manifeste pour ne pas re-scraper l'existant.
+        """
+        registered = 0
+        rows = []
+        # Dossiers de destination historiques (data/AMS_19_11) et partitions de data/raw
+        folders = [os.path.join(data_folder, name) for name in sorted(os.listdir(data_folder))] if os.path.isdir(data_folder) else []
+        raw_folder = os.path.join(data_folder, RAW_FOLDER)
+        if os.path.isdir(raw_folder):
+            folders.extend(sorted(root for root, _, _ in os.walk(raw_folder)))
+        for folder in folders:
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith('.json'):
+                    continue
+                file_path = os.path.join(folder, name)
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    rows.append((
+                        str(data['search_date'])[:10], data['destination'], data['flight_date'],
+                        STATUS_DONE, len(data.get('flights', [])), file_path, datetime.now().isoformat()
+                    ))
+                except Exception as e:
+                    print(f"Fichier ignoré lors de l'import dans le manifeste {file_path}: {str(e)}")
+        with self.lock, self.conn:
+            for row in rows:
+                cursor = self.conn.execute("""
+                    INSERT OR IGNORE INTO jobs
+                        (search_date, destination, flight_date, status, attempts, flights, output_path, updated_at)
+                    VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                """, row)
+                registered += cursor.rowcount
+        print(f"{registered} observations existantes importées dans le manifeste")
+        return registered
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,301 @@
+"""Normalisation des cartes de vol extraites des pages de résultats Kayak.
+
+Fonctions pures, sans driver : utilisables hors navigateur, sur des pages
+sauvegardées (voir benchmarks/bench_card_parser.py).
+"""
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from .config import MAX_FLIGHT_CARDS
+
+
+# Mapping des classes tarifaires pour normalisation
+FARE_CLASS_MAPPING = {
+    'LIGHT': 'Light',
+    'STANDARD': 'Standard',
+    'FLEX': 'Flex',
+    'BUSINESS': 'Business',
+    'PREMIÈRE': 'First',
+    'BASIC': 'Basic',           # Ajout de Basic
+    'ÉCONOMIQUE': 'Economy',    # Ajout de Économique -> Economy
+    'ECONOMIQUE': 'Economy'     # Pour gérer le cas sans accent
+}
+
+def normalize_fare_class(fare_class):
+    """Nettoie et normalise le libellé de classe tarifaire"""
+    fare_class = (fare_class or 'N/A').replace('Tarif ', '').strip()
+    return FARE_CLASS_MAPPING.get(fare_class.upper(), fare_class)
+
+def clean_layover_duration(title):
+    """Extrait la durée d'escale de l'attribut title ('... escale de 2h 10min à ...')"""
+    if not title or title == 'N/A':
+        return "N/A"
+    return title.split('escale de ')[1].split(' à')[0] if 'escale de ' in title else title
+
+# Extraction de toutes les cartes en un seul aller-retour WebDriver.
+# Reprend les sélecteurs de extract_flights_soup, évalués relativement à chaque carte.
+EXTRACT_CARDS_SCRIPT = """
+    const limit = arguments[0];
+    const text = (el) => el ? el.textContent : 'N/A';
+    const xpathFirst = (xpath, ctx) => document.evaluate(
+        xpath, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const xpathAll = (xpath, ctx) => {
+        const snapshot = document.evaluate(
+            xpath, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        return Array.from({length: snapshot.snapshotLength}, (_, i) => snapshot.snapshotItem(i));
+    };
+    const cards = Array.from(document.querySelectorAll('div.nrc6')).slice(0, limit);
+    return JSON.stringify(cards.map((card) => {
+        const times = Array.from(card.querySelectorAll('div.vmXl')).map((el) => el.textContent);
+        const fareClass = Array.from(card.querySelectorAll(
+            'div.nrc6-price-section > div > div.Oihj-bottom-booking > div > div.M_JD-large-display > div:nth-child(2) > div > div > div > div > div'))
+            .map((el) => el.textContent.trim())
+            .filter((t) => t !== '')[0]
+            || (card.querySelector('div.nrc6-price-section div.M_JD-large-display div.DOum-name') || {innerText: 'N/A'}).innerText.trim();
+        const baggage = (position) => {
+            const el = xpathFirst(".//div[contains(@class, 'nrc6-price-section')]//div[contains(@class, 'Oihj-top-fees')]//div[contains(@class, 'ac27')]//div[" + position + "]//div[2]", card);
+            return el ? el.innerText.trim() : 'N/A';
+        };
+        const airports = card.querySelectorAll('span.jLhY-airport-info');
+        const lastAirport = airports.length ? airports[airports.length - 1].querySelector('span') : null;
+        const layover = card.querySelector(
+            'div.nrc6-content-section > div.nrc6-main > div > ol > li > div > div > div.JWEO > div.c_cgF.c_cgF-mod-variant-full-airport > span > span')
+            || xpathFirst(".//div[contains(@class, 'JWEO')]//div[contains(@class, 'c_cgF')]//span/span", card);
+        return {
+            times: times,
+            last_time: (xpathFirst(".//div[contains(@class, 'vmXl')][last()]", card) || {innerText: 'N/A'}).innerText,
+            duration: text(card.querySelector('div.xdW8')),
+            price: text(card.querySelector('div.f8F1')),
+            fare_class: fareClass,
+            hand_baggage: baggage(1),
+            checked_baggage: baggage(2),
+            destination_airport: lastAirport ? lastAirport.textContent.trim() : 'N/A',
+            airlines: xpathAll(".//div[contains(@class, 'c5iUd-leg-carrier')]//img", card)
+                .map((img) => img.getAttribute('alt')).filter((alt) => alt),
+            layover_airport: layover ? layover.textContent : 'N/A',
+            layover_title: layover ? (layover.getAttribute('title') || 'N/A') : 'N/A'
+        };
+    }));
+"""
+
+def build_flight_from_card(card):
+    """Construit un vol à partir des champs bruts renvoyés par EXTRACT_CARDS_SCRIPT"""
+    times = card.get('times') or []
+    departure_time = times[0] if times else "N/A"
+    is_direct = "escale" not in (times[1] if len(times) > 1 else "")
+    if is_direct:
+        arrival_time = times[1] if len(times) > 1 else "N/A"
+    else:
+        arrival_time = card.get('last_time') or "N/A"
+
+    hand_baggage = card.get('hand_baggage') or "N/A"
+    checked_baggage = card.get('checked_baggage') or "N/A"
+
+    layover_info = "N/A"
+    layover_duration = "N/A"
+    if not is_direct:
+        layover_info = card.get('layover_airport') or "N/A"
+        if layover_info != "N/A":
+            layover_duration = clean_layover_duration(card.get('layover_title'))
+
+    return {
+        "departure_time": departure_time,
+        "arrival_time": arrival_time,
+        "duration": card.get('duration') or "N/A",
+        "price": card.get('price') or "N/A",
+        "origin_airport": "BOD",
+        "destination_airport": card.get('destination_airport') or "N/A",
+        "is_direct": is_direct,
+        "checked_baggage": checked_baggage,
+        "hand_baggage": hand_baggage,
+        "layover_airport": layover_info,
+        "layover_duration": layover_duration,
+        "airlines": card.get('airlines') or ["N/A"],
+        "fare_class": normalize_fare_class(card.get('fare_class'))
+    }
+
+def is_empty_flight(flight):
+    """Un vol dont toutes les valeurs valent N/A n'est pas conservé"""
+    return all(v == "N/A" for v in flight.values())
+
+def _nth_div_children(element, position):
+    """Descendants <div> qui sont le `position`-ième <div> de leur parent (XPath '//div[n]')"""
+    matches = []
+    for div in element.find_all('div'):
+        siblings = div.parent.find_all('div', recursive=False)
+        if len(siblings) >= position and siblings[position - 1] is div:
+            matches.append(div)
+    return matches
+
+def _baggage_text(card, position):
+    """Équivalent BeautifulSoup de SELECTORS['hand_baggage'] / SELECTORS['checked_baggage']"""
+    for fees in card.select('div.nrc6-price-section div.Oihj-top-fees div.ac27'):
+        for first in _nth_div_children(fees, position):
+            for second in _nth_div_children(first, 2):
+                text = second.get_text().strip()
+                return text or 'N/A'
+    return 'N/A'
+
+def extract_card_fields(card):
+    """Champs bruts d'une carte de vol BeautifulSoup, au même format que EXTRACT_CARDS_SCRIPT"""
+    times = [el.get_text() for el in card.find_all('div', {'class': 'vmXl'})]
+
+    fare_class = next((el.get_text().strip() for el in card.select(
+        'div.nrc6-price-section > div > div.Oihj-bottom-booking > div > div.M_JD-large-display'
+        ' > div:nth-child(2) > div > div > div > div > div') if el.get_text().strip()), None)
+    if not fare_class:
+        fare_class_element = card.select_one('div.nrc6-price-section div.M_JD-large-display div.DOum-name')
+        fare_class = fare_class_element.get_text().strip() if fare_class_element else 'N/A'
+
+    airports = card.find_all('span', {'class': 'jLhY-airport-info'})
+    last_airport = airports[-1].find('span') if airports else None
+
+    layover = (card.select_one('div.nrc6-content-section > div.nrc6-main > div > ol > li > div > div > div.JWEO'
+                               ' > div.c_cgF.c_cgF-mod-variant-full-airport > span > span')
+               or card.select_one('div.JWEO div.c_cgF span > span'))
+
+    duration = card.find('div', {'class': 'xdW8'})
+    price = card.find('div', {'class': 'f8F1'})
+    return {
+        'times': times,
+        'last_time': times[-1] if times else 'N/A',
+        'duration': duration.get_text() if duration else 'N/A',
+        'price': price.get_text() if price else 'N/A',
+        'fare_class': fare_class,
+        'hand_baggage': _baggage_text(card, 1),
+        'checked_baggage': _baggage_text(card, 2),
+        'destination_airport': last_airport.get_text().strip() if last_airport else 'N/A',
+        'airlines': [img.get('alt') for img in card.select('div.c5iUd-leg-carrier img') if img.get('alt')],
+        'layover_airport': layover.get_text() if layover else 'N/A',
+        'layover_title': (layover.get('title') or 'N/A') if layover else 'N/A'
+    }
+
+def parse_flight_cards(html, limit=MAX_FLIGHT_CARDS):
+    """Extrait les vols d'une page de résultats sauvegardée, sans navigateur"""
+    soup = BeautifulSoup(html, 'html.parser')
+    flights = []
+    for index, card in enumerate(soup.find_all('div', {'class': 'nrc6'})[:limit]):
+        try:
+            flight = build_flight_from_card(extract_card_fields(card))
+        except Exception as e:
+            print(f"Erreur lors de l'extraction du vol {index + 1}: {str(e)}")
+            continue
+        if not is_empty_flight(flight):
+            flights.append(flight)
+    return flights
+
+def format_duration(minutes):
+    """Formate une durée en minutes comme sur la page ('5h 05min')"""
+    if minutes is None:
+        return "N/A"
+    minutes = int(minutes)
+    return f"{minutes // 60}h {minutes % 60:02d}min"
+
+def format_price(price):
+    """Formate un prix comme sur la page ('191\xa0€')"""
+    if price is None:
+        return "N/A"
+    return f"{int(round(float(price)))}\xa0€"
+
+def _parse_iso(value):
+    try:
+        return datetime.fromisoformat(str(value)[:19])
+    except (TypeError, ValueError):
+        return None
+
+def _resolve(ref, table):
+    """Les legs/segments sont soit inline, soit référencés par id dans une table globale"""
+    if isinstance(ref, dict):
+        resolved = dict(table.get(ref.get('id'), {}))
+        resolved.update(ref)
+        return resolved
+    return dict(table.get(ref, {}))
+
+def _format_times(departure, arrival):
+    """'HH:MM – HH:MM', avec '+N' quand l'arrivée a lieu N jours plus tard"""
+    if not departure or not arrival:
+        return "N/A"
+    text = f"{departure:%H:%M} – {arrival:%H:%M}"
+    days = (arrival.date() - departure.date()).days
+    return text + (f"+{days}" if days > 0 else "")
+
+def parse_results_payload(payload, limit=MAX_FLIGHT_CARDS):
+    """Construit les vols depuis la réponse JSON de recherche de Kayak (XHR 'poll').
+
+    Produit les mêmes champs et formats que l'extraction depuis la page, pour
+    que la suite du pipeline ne distingue pas les deux sources. Les champs
+    absents du payload valent 'N/A'.
+    """
+    legs_table = payload.get('legs') or {}
+    segments_table = payload.get('segments') or {}
+    airlines_table = payload.get('airlines') or {}
+    flights = []
+
+    for result in payload.get('results') or []:
+        if len(flights) >= limit:
+            break
+        if result.get('type', 'core') != 'core' or not result.get('legs'):
+            continue
+        try:
+            leg = _resolve(result['legs'][0], legs_table)
+            segments = [_resolve(seg, segments_table) for seg in leg.get('segments') or []]
+            if not segments:
+                continue
+
+            departure = _parse_iso(leg.get('departure') or segments[0].get('departure'))
+            arrival = _parse_iso(leg.get('arrival') or segments[-1].get('arrival'))
+            times = _format_times(departure, arrival)
+            is_direct = len(segments) == 1
+
+            duration = leg.get('duration')
+            if duration is None and departure and arrival:
+                duration = (arrival - departure).total_seconds() // 60
+
+            booking = (result.get('bookingOptions') or [{}])[0]
+            display_price = booking.get('displayPrice') or {}
+            price = display_price.get('localizedPrice') or format_price(display_price.get('price'))
+            fare_family = booking.get('fareFamily') or {}
+
+            airlines = []
+            for segment in segments:
+                code = segment.get('airline')
+                name = (airlines_table.get(code) or {}).get('name', code) if code else None
+                if name and name not in airlines:
+                    airlines.append(name)
+
+            layover_airport = "N/A"
+            layover_duration = "N/A"
+            if not is_direct:
+                layover_airport = segments[0].get('destination') or "N/A"
+                layover = (leg.get('segments') or [{}])[0]
+                layover = layover.get('layover') if isinstance(layover, dict) else None
+                if layover and layover.get('duration') is not None:
+                    layover_duration = format_duration(layover['duration'])
+                else:
+                    first_arrival = _parse_iso(segments[0].get('arrival'))
+                    next_departure = _parse_iso(segments[1].get('departure'))
+                    if first_arrival and next_departure:
+                        layover_duration = format_duration((next_departure - first_arrival).total_seconds() // 60)
+
+            flight = {
+                "departure_time": times,
+                "arrival_time": times if not is_direct else "direct",
+                "duration": format_duration(duration),
+                "price": price,
+                "origin_airport": "BOD",
+                "destination_airport": segments[-1].get('destination') or "N/A",
+                "is_direct": is_direct,
+                "checked_baggage": "N/A",
+                "hand_baggage": "N/A",
+                "layover_airport": layover_airport,
+                "layover_duration": layover_duration,
+                "airlines": airlines or ["N/A"],
+                "fare_class": normalize_fare_class(fare_family.get('displayName'))
+            }
+            flights.append(flight)
+        except Exception as e:
+            print(f"Résultat XHR ignoré : {str(e)}")
+            continue
+
+    return flights
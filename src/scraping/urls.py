@@ -0,0 +1,20 @@
+"""Génération des dates et des URLs de recherche Kayak"""
+from datetime import datetime, timedelta
+
+
+def generate_dates(start_date_str, end_date_str=None, num_days=None):
+    """Genère une liste de dates entre start_date et end_date (ou pour num_days)"""
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+    
+    if end_date_str:
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+        delta = (end_date - start_date).days + 1
+        return [(start_date + timedelta(days=x)).strftime('%Y-%m-%d') for x in range(delta)]
+    else:
+        num_days = num_days or 30  # utilise 30 jours par défaut si non spécifié
+        return [(start_date + timedelta(days=x)).strftime('%Y-%m-%d') for x in range(num_days)]
+
+
+def get_kayak_url(date, destination):
+    """Génère l'URL Kayak pour une date et une destination données"""
+    return f"https://www.kayak.fr/flights/BOD-{destination}/{date}?sort=bestflight_a"
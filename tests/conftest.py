@@ -0,0 +1,18 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Permet l'import de src.* sans installation du projet
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+
+@pytest.fixture
+def base_folder(tmp_path):
+    """Copie de tests/fixtures/data : JSON scrapés de AMS et d'un dossier instantané AMS_19_11"""
+    folder = tmp_path / 'data'
+    shutil.copytree(FIXTURES / 'data', folder)
+    return folder
@@ -0,0 +1,38 @@
+import importlib
+import sys
+
+import pytest
+
+from src.data import concatenator
+
+GOOGLE_MODULES = ['google', 'google.cloud', 'google.cloud.bigquery', 'google.oauth2']
+
+
+@pytest.fixture
+def automated_pipeline(monkeypatch):
+    """Module du pipeline importé sans les paquets google (import google.* en échec)"""
+    for name in GOOGLE_MODULES:
+        monkeypatch.setitem(sys.modules, name, None)
+    for name in ['src.data.automated_pipeline', 'src.data.bigquery_loader']:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('src.data.automated_pipeline')
+    yield module
+    module.logger.handlers.clear()
+    sys.modules.pop('src.data.automated_pipeline', None)
+
+
+def test_pipeline_imports_without_google(automated_pipeline):
+    assert 'src.data.bigquery_loader' not in sys.modules
+    with pytest.raises(ImportError):
+        automated_pipeline.bigquery_client('projet', __file__)
+
+
+def test_duckdb_pipeline_runs_without_google(automated_pipeline, base_folder, tmp_path, monkeypatch):
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+    monkeypatch.setattr(concatenator, 'DEFAULT_BASE_FOLDER', base_folder)
+
+    automated_pipeline.main(['--warehouse', 'duckdb', '--database', str(tmp_path / 'flights.duckdb')])
+
+    assert (base_folder / 'combined' / 'vols_ams_combines.csv').exists()
+    assert list((base_folder / 'metrics').glob('pipeline_*.json'))
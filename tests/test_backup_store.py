@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from src.data import backup_store
+from src.data.backup_store import BackupManager
+
+
+def write_lines(path, lines):
+    path.write_bytes(''.join(f'{line}\n' for line in lines).encode('utf-8'))
+
+
+def test_restore_rebuilds_each_backup(tmp_path):
+    manager = BackupManager(tmp_path)
+    combined = tmp_path / 'vols_ams_combines.csv'
+    versions = [
+        ['"flight_id","price"', '"1","100.0"', '"2","120.0"', '"3","90.0"'],
+        ['"flight_id","price"', '"1","100.0"', '"2","125.0"', '"3","90.0"', '"4","80.0"'],
+        ['"flight_id","price"', '"4","80.0"', '"1","100.0"'],
+    ]
+    names = []
+    for day, lines in enumerate(versions):
+        write_lines(combined, lines)
+        names.append(manager.create_backup(combined, created_at=datetime(2024, 11, 20 + day)).stem)
+
+    snapshots = manager.snapshots('vols_ams_combines')
+    assert [s['new_lines'] for s in snapshots] == [4, 2, 0]
+    for name, lines in zip(names, versions):
+        restored = tmp_path / f'{name}.csv'
+        manager.restore(name, restored)
+        assert restored.read_text(encoding='utf-8').splitlines() == lines
+    assert not list(manager.snapshots_path.glob('*.tmp'))
+
+
+def test_unchanged_file_reuses_previous_backup(tmp_path):
+    manager = BackupManager(tmp_path)
+    combined = tmp_path / 'vols_ams_combines.csv'
+    write_lines(combined, ['"flight_id"', '"1"'])
+    first = manager.create_backup(combined, created_at=datetime(2024, 11, 20))
+    assert manager.create_backup(combined, created_at=datetime(2024, 11, 21)) == first
+
+
+def test_prune_only_touches_its_own_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, 'GC_GRACE_SECONDS', 0)
+    manager = BackupManager(tmp_path)
+    now = datetime(2024, 12, 31)
+    for stem in ('vols_ams_combines', 'vols_ams_19_11_combines'):
+        combined = tmp_path / f'{stem}.csv'
+        for day in range(3):
+            write_lines(combined, ['"flight_id"', f'"{day}"'])
+            manager.create_backup(combined, created_at=now - timedelta(days=100 - day))
+
+    removed_snapshots, removed_packs = manager.prune('vols_ams_combines', keep_last=1, now=now)
+
+    # L'en-tête de la dernière sauvegarde est lu dans le premier pack, qui est conservé
+    assert (removed_snapshots, removed_packs) == (2, 1)
+    assert len(manager.snapshots('vols_ams_combines')) == 1
+    assert len(manager.snapshots('vols_ams_19_11_combines')) == 3
+    assert len(list(manager.packs_path.glob('vols_ams_19_11_combines_*.gz'))) == 3
+    latest = manager.snapshots('vols_ams_combines')[-1]
+    manager.restore(latest['name'], tmp_path / 'restored.csv')
+    assert (tmp_path / 'restored.csv').read_bytes() == (tmp_path / 'vols_ams_combines.csv').read_bytes()
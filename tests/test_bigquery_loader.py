@@ -0,0 +1,130 @@
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+pytest.importorskip('google.cloud.bigquery')
+
+from src.data import automated_pipeline, concatenator
+from src.data.bigquery_loader import WATERMARK_NAME, BigQueryLoader, load_watermark
+from src.data.parquet_store import PARQUET_FOLDER, read_flights, write_flights
+
+TABLE_ID = 'projet.dataset.combined_flights'
+
+
+class FakeJob:
+    def __init__(self, run=None):
+        self.run = run
+
+    def result(self):
+        if self.run:
+            self.run()
+
+
+class FakeClient:
+    """Client BigQuery en mémoire : tables = listes de tables Arrow, MERGE appliqué à result()"""
+    def __init__(self, fail_merge=False):
+        self.tables = {}
+        self.loads = []
+        self.fail_merge = fail_merge
+        self.lock = threading.Lock()
+
+    def create_table(self, table, exists_ok=False):
+        self.tables.setdefault(table.table_id, [])
+        return table
+
+    def delete_table(self, table_id, not_found_ok=False):
+        self.tables.pop(table_id, None)
+
+    def load_table_from_file(self, buffer, table_id, job_config):
+        table = pq.read_table(buffer, use_threads=False)
+        assert [field.name for field in job_config.schema] == table.schema.names
+        with self.lock:
+            self.tables[table_id].append(table)
+            self.loads.append(table_id)
+        return FakeJob()
+
+    def query(self, query, job_config):
+        target = query.split('MERGE `')[1].split('`')[0]
+        staging = query.split('USING `')[1].split('`')[0]
+        replaced = set(job_config.query_parameters[0].values)
+
+        def merge():
+            if self.fail_merge:
+                raise RuntimeError("MERGE en échec")
+            kept = [table.filter(pa.array([f'{destination}/{search_date}' not in replaced for destination, search_date
+                                           in zip(table['destination'].to_pylist(), table['search_date'].to_pylist())]))
+                    for table in self.tables[target]]
+            self.tables[target] = kept + self.tables[staging]
+        return FakeJob(merge)
+
+    def rows(self, table_id=TABLE_ID):
+        return pa.concat_tables(self.tables[table_id]).to_pandas() if self.tables.get(table_id) else None
+
+
+@pytest.fixture
+def parquet_folder(base_folder):
+    """Dataset Parquet de AMS sur trois jours de recherche"""
+    result = concatenator.run({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS']})
+    flights = read_flights(result['parquet_folder'])
+    next_day = flights[flights['search_date'] == flights['search_date'].max()].assign(
+        search_date='2024-11-25', flight_id=lambda df: df['flight_id'] + 1)
+    write_flights(pd.concat([flights, next_day], ignore_index=True), result['parquet_folder'], 'AMS')
+    return base_folder
+
+
+def loader(client, base_folder):
+    return BigQueryLoader(client, 'projet', 'dataset', base_folder, workers=2)
+
+
+def test_load_only_changed_and_removed_partitions(parquet_folder):
+    root = parquet_folder / PARQUET_FOLDER
+    flights = read_flights(root)
+    search_dates = sorted(flights['search_date'].unique())
+    assert len(search_dates) == 3
+    client = FakeClient()
+
+    stats = loader(client, parquet_folder).load()
+    assert (stats['partitions'], stats['removed'], stats['rows']) == (len(search_dates), 0, len(flights))
+    assert len(client.rows()) == len(flights)
+    assert client.tables.keys() == {TABLE_ID}  # Staging supprimé
+
+    client.loads.clear()
+    stats = loader(client, parquet_folder).load()
+    assert (stats['partitions'], stats['removed'], stats['unchanged']) == (0, 0, len(search_dates))
+    assert client.loads == []
+
+    # Une partition modifiée, une supprimée, les autres inchangées
+    changed_day, removed_day = search_dates[0], search_dates[-1]
+    flights.loc[flights['search_date'] == changed_day, 'price'] += 1
+    write_flights(flights[flights['search_date'] != removed_day], root, 'AMS')
+    stats = loader(client, parquet_folder).load()
+    assert (stats['partitions'], stats['removed'], stats['unchanged']) == (1, 1, len(search_dates) - 2)
+
+    loaded = client.rows()
+    assert sorted(loaded['search_date'].astype(str).unique()) == search_dates[:-1]
+    assert len(loaded) == (flights['search_date'] != removed_day).sum()
+    expected = flights[flights['search_date'] == changed_day]['price'].astype('float32').sort_values().tolist()
+    assert loaded[loaded['search_date'].astype(str) == changed_day]['price'].sort_values().tolist() == expected
+    assert set(load_watermark(parquet_folder / WATERMARK_NAME)['partitions']) == {
+        f'AMS/{search_date}' for search_date in search_dates[:-1]}
+
+
+def test_watermark_is_written_only_after_merge(parquet_folder):
+    failing = FakeClient(fail_merge=True)
+    with pytest.raises(RuntimeError):
+        loader(failing, parquet_folder).load()
+    assert not (parquet_folder / WATERMARK_NAME).exists()
+    assert failing.tables.keys() == {TABLE_ID}  # Staging supprimé malgré l'échec
+
+    client = FakeClient()
+    stats = loader(client, parquet_folder).load()
+    assert stats['partitions'] == len(load_watermark(parquet_folder / WATERMARK_NAME)['partitions'])
+
+
+def test_upload_to_bigquery_outside_main(parquet_folder):
+    stats = automated_pipeline.upload_to_bigquery('projet', 'dataset', None, base_folder=parquet_folder,
+                                                  client=FakeClient())
+    assert stats['partitions'] > 0
@@ -0,0 +1,47 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from src.data import concatenator
+from src.data.raw_store import destination_files
+
+
+def to_csv_bytes(df):
+    return df.to_csv(index=False, encoding='utf-8', quoting=csv.QUOTE_ALL,
+                     escapechar='\\', doublequote=True).encode('utf-8')
+
+
+def flattened(base_folder, destination):
+    chunks = list(concatenator.iter_flight_chunks(destination_files(base_folder, destination), destination))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def assert_same_cleaning(df):
+    rowwise = concatenator.clean_flights_rowwise(df.copy())
+    rowwise['flight_id'] = rowwise.apply(concatenator.generate_flight_id, axis=1)
+    vectorised = concatenator.clean_flights(df.copy())
+    vectorised['flight_id'] = concatenator.flight_id_column(vectorised)
+
+    assert rowwise.dtypes.equals(vectorised.dtypes)
+    assert to_csv_bytes(rowwise) == to_csv_bytes(vectorised)
+
+
+def test_vectorised_cleaners_match_rowwise(base_folder):
+    for destination in concatenator.find_destination_folders(base_folder):
+        assert_same_cleaning(flattened(base_folder, destination))
+
+
+def test_vectorised_cleaners_match_rowwise_on_irregular_values(base_folder):
+    df = flattened(base_folder, 'AMS').head(8).copy()
+    # Valeurs hors des formats attendus : repassent par les fonctions ligne à ligne
+    df.loc[0, 'duration'] = '45min'
+    df.loc[1, 'duration'] = None
+    df.loc[2, 'departure_time'] = '7:05 – 9:40+1'
+    df.loc[3, 'layover_duration'] = 'N/A'
+    df.loc[4, 'search_date'] = '2024-11-23 14:58'
+    df['is_direct'] = df['is_direct'].astype(object)
+    df.loc[5, 'is_direct'] = 'True'
+    df.loc[6, 'price'] = np.nan
+    df.loc[7, 'arrival_time'] = ''
+    assert_same_cleaning(df)
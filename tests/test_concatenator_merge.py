@@ -0,0 +1,121 @@
+import io
+import json
+import shutil
+
+import pandas as pd
+
+from src.data import concatenator
+from src.data.raw_store import destination_files
+
+
+def run_ams(base_folder, **config):
+    return concatenator.run(dict({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS'],
+                                  'parquet': False}, **config))
+
+
+def test_unreadable_combined_csv_is_kept_and_retried(base_folder):
+    output_file = base_folder / 'combined' / 'vols_ams_combines.csv'
+    output_file.parent.mkdir()
+    corrupted = b'\xff\xfe"flight_id"\n\x00\x00'
+    output_file.write_bytes(corrupted)
+
+    result = run_ams(base_folder)
+
+    assert result['output_files'] == {}
+    assert output_file.read_bytes() == corrupted
+    manifest = concatenator.IngestionManifest(base_folder / concatenator.MANIFEST_NAME)
+    try:
+        assert manifest.pending_files(base_folder, 'AMS')
+    finally:
+        manifest.close()
+
+
+def add_search_day(base_folder, search_date):
+    """Nouvelle observation de AMS : copie d'un fichier scrapé avec un autre jour de recherche"""
+    scraped = json.loads((base_folder / 'AMS' / 'flights_2024-11-23.json').read_text(encoding='utf-8'))
+    scraped['search_date'] = f'{search_date} 10:00:00'
+    for flight in scraped['flights'][:5]:
+        flight['price'] = '99 €'
+    (base_folder / 'AMS' / f'flights_{search_date}.json').write_text(json.dumps(scraped), encoding='utf-8')
+
+
+def test_memory_and_external_merges_write_identical_csv(base_folder, tmp_path):
+    # Durées manquantes : la colonne est relue en float64 depuis le CSV existant
+    scraped_file = base_folder / 'AMS' / 'flights_2024-11-24.json'
+    scraped = json.loads(scraped_file.read_text(encoding='utf-8'))
+    for flight in scraped['flights'][:3]:
+        flight['duration'] = 'N/A'
+    scraped_file.write_text(json.dumps(scraped), encoding='utf-8')
+    run_ams(base_folder)
+
+    outputs = {}
+    for merge_mode in concatenator.MERGE_MODES[1:]:
+        folder = shutil.copytree(base_folder, tmp_path / merge_mode)
+        add_search_day(folder, '2024-11-25')
+        result = run_ams(folder, merge_mode=merge_mode, parquet=True)
+        assert result['results'][0]['merge_mode'] == merge_mode
+        outputs[merge_mode] = result['output_files']['AMS'].read_bytes()
+
+    assert pd.read_csv(io.BytesIO(outputs['memory']))['duration'].isna().any()
+    assert outputs['memory'] == outputs['external']
+
+
+def test_streamed_first_ingestion_matches_memory(base_folder, tmp_path):
+    # Sans fichier combiné : les blocs (un fichier JSON chacun) sont écrits au fil de l'eau
+    outputs = {}
+    for merge_mode in concatenator.MERGE_MODES[1:]:
+        folder = shutil.copytree(base_folder, tmp_path / merge_mode)
+        result = run_ams(folder, merge_mode=merge_mode, chunk_size=1, parquet=True)
+        assert result['results'][0]['merge_mode'] == merge_mode
+        outputs[merge_mode] = result['output_files']['AMS'].read_bytes()
+        assert not [path for path in (folder / 'combined').iterdir() if path.name.startswith('.')]
+
+    assert outputs['memory'] == outputs['external']
+
+
+def test_unparsable_json_is_not_recorded(base_folder):
+    (base_folder / 'AMS' / 'flights_2024-11-26.json').write_text('{"flights": [', encoding='utf-8')
+
+    result = run_ams(base_folder)
+
+    assert result['results'][0]['errors']
+    manifest = concatenator.IngestionManifest(base_folder / concatenator.MANIFEST_NAME)
+    try:
+        assert [record['path'] for record in manifest.pending_files(base_folder, 'AMS')] == ['AMS/flights_2024-11-26.json']
+    finally:
+        manifest.close()
+
+
+def test_missing_flight_ids_are_not_collapsed(base_folder, tmp_path, monkeypatch):
+    run_ams(base_folder)
+    output_file = base_folder / 'combined' / 'vols_ams_combines.csv'
+    combined = pd.read_csv(output_file, dtype=str, keep_default_na=False)
+    # IDs manquants après l'échantillon lu par use_external_merge
+    monkeypatch.setattr(concatenator, 'ID_SAMPLE_ROWS', 5)
+    combined.loc[[10, 20], 'flight_id'] = ''
+    concatenator.write_combined(combined, output_file)
+
+    outputs = {}
+    for merge_mode in concatenator.MERGE_MODES[1:]:
+        folder = shutil.copytree(base_folder, tmp_path / merge_mode)
+        add_search_day(folder, '2024-11-25')
+        result = run_ams(folder, merge_mode=merge_mode)
+        outputs[merge_mode] = result['output_files']['AMS'].read_bytes()
+
+    # IDs régénérés en mémoire, y compris quand la fusion par blocs est demandée
+    merged = pd.read_csv(io.BytesIO(outputs['memory']))
+    assert merged['flight_id'].dtype == 'int64'
+    assert merged['flight_id'].is_unique
+    assert outputs['memory'] == outputs['external']
+
+
+def test_flights_without_key_columns_are_dropped(base_folder):
+    chunk = next(concatenator.iter_flight_chunks(destination_files(base_folder, 'AMS'), 'AMS'))
+    df = concatenator.clean_flights(chunk.head(4).copy())
+    df.loc[0, concatenator.FLIGHT_ID_COLUMNS] = ''
+
+    df = concatenator.with_flight_ids(df, 'AMS')
+
+    assert len(df) == 3
+    assert df['flight_id'].dtype == 'int64'
+    assert df['flight_id'].equals(concatenator.flight_id_column(df))
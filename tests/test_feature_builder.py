@@ -0,0 +1,45 @@
+import pandas as pd
+
+from src.data import concatenator
+from src.data.feature_builder import FlightFeatureBuilder
+
+
+def legacy_features(builder, df):
+    return (df
+        .pipe(builder.add_price_features)
+        .pipe(builder.add_temporal_features)
+        .pipe(builder.add_route_features)
+    )
+
+
+def by_flight(df):
+    return df.sort_values('flight_id', kind='stable').reset_index(drop=True)
+
+
+def combined_folder(base_folder):
+    """CSV combiné de AMS et copie en LON (deux routes), sans dataset Parquet"""
+    result = concatenator.run({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS'], 'parquet': False})
+    ams = pd.read_csv(result['output_files']['AMS'])
+    ams.assign(destination='LON', flight_id=ams['flight_id'] + 1).to_csv(
+        base_folder / 'combined' / 'vols_lon_combines.csv', index=False)
+    return base_folder
+
+
+def test_build_features_matches_add_features(base_folder):
+    builder = FlightFeatureBuilder(combined_folder(base_folder))
+    df = builder.load_destinations()
+    df.loc[df.index[:2], 'origin'] = None  # Lignes sans route : retirées comme par le merge de add_route_features
+
+    expected = legacy_features(builder, df)
+    pd.testing.assert_frame_equal(by_flight(builder.build_features(df)), by_flight(expected), check_exact=True)
+    assert 'price_volatility' not in df
+
+
+def test_batch_and_parallel_match_per_destination(base_folder):
+    builder = FlightFeatureBuilder(combined_folder(base_folder))
+    assert builder.available_destinations() == ['AMS', 'LON']
+    per_destination = by_flight(pd.concat([legacy_features(builder, builder.load_destination_data(destination))
+                                           for destination in ('AMS', 'LON')], ignore_index=True))
+
+    pd.testing.assert_frame_equal(by_flight(builder.process_destinations()), per_destination, check_exact=True)
+    pd.testing.assert_frame_equal(by_flight(builder.process_destinations(workers=2)), per_destination, check_exact=True)
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from src.data import concatenator
+
+ROW = {'search_date': '2024-11-23 14:58:42', 'flight_date': '2024-11-23', 'origin': 'BOD',
+       'destination': 'AMS', 'departure_time': '21:45', 'arrival_time': '09:45+1'}
+# Valeur publiée dans les CSV combinés et BigQuery : ne doit pas changer
+EXPECTED_ID = 4367845230584172839
+
+
+def test_flight_id_is_pinned():
+    assert concatenator.generate_flight_id(pd.Series(ROW)) == EXPECTED_ID
+    assert concatenator.flight_id_column(pd.DataFrame([ROW])).tolist() == [EXPECTED_ID]
+
+
+def test_flight_id_does_not_depend_on_hash_seed():
+    code = ("from src.data.concatenator import stable_flight_hash; "
+            "print(stable_flight_hash('2024-11-23_2024-11-23_BOD_AMS_21:45_09:45+1'))")
+    root = Path(__file__).resolve().parents[1]
+    for seed in ('1', '2'):
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True,
+                                env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+        assert int(output) == EXPECTED_ID
+
+
+def test_existing_ids_are_recognised():
+    df = pd.DataFrame([ROW, dict(ROW, departure_time='07:10', arrival_time='09:00')])
+    df['flight_id'] = concatenator.flight_id_column(df)
+    assert (df['flight_id'] >= 0).all() and df['flight_id'].nunique() == 2
+    assert concatenator.has_stable_flight_ids(df)
+
+    df['flight_id'] = [hash('ancien'), hash('schéma')]
+    assert not concatenator.has_stable_flight_ids(df)
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from src.data import concatenator
+from src.data.parquet_store import count_flights, read_flights, write_flights
+
+
+def test_parquet_matches_combined_csv(base_folder):
+    result = concatenator.run({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS']})
+    combined = pd.read_csv(result['output_files']['AMS']).sort_values('flight_id').reset_index(drop=True)
+    flights = read_flights(result['parquet_folder']).sort_values('flight_id').reset_index(drop=True)
+
+    assert count_flights(result['parquet_folder']) == {'AMS': len(combined)}
+    assert flights['flight_id'].tolist() == combined['flight_id'].tolist()
+    assert flights['price'].astype('float64').round(2).tolist() == combined['price'].round(2).tolist()
+    assert flights['duration'].tolist() == combined['duration'].tolist()
+    assert flights['search_date'].tolist() == combined['search_date'].tolist()
+    assert (flights['flight_date'].dt.strftime('%Y-%m-%d') == combined['flight_date']).all()
+    for column in ('airlines', 'day_of_week', 'price_category', 'destination_city'):
+        assert flights[column].tolist() == combined[column].tolist()
+
+
+def test_rewriting_a_source_keeps_other_sources(base_folder):
+    result = concatenator.run({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS']})
+    root = result['parquet_folder']
+    ams = pd.read_csv(result['output_files']['AMS'])
+    write_flights(ams.assign(destination='LON', destination_city='London'), root, 'LON')
+
+    write_flights(ams.head(3), root, 'AMS')
+
+    assert count_flights(root) == {'AMS': 3, 'LON': len(ams)}
+    assert read_flights(root, destinations=['LON'], search_date_from='2099-01-01').empty
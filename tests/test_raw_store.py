@@ -0,0 +1,57 @@
+import json
+import shutil
+
+import pandas as pd
+
+from src.data import concatenator
+from src.data.raw_store import (RAW_FOLDER, destination_files, find_destinations, legacy_folders,
+                                migrate_legacy_folders, observation_key)
+
+
+def observations(base_folder, destination):
+    keys = []
+    for json_file in destination_files(base_folder, destination):
+        content = json.loads(json_file.read_text(encoding='utf-8'))
+        keys.extend(observation_key(observation) for observation in (content if isinstance(content, list) else [content]))
+    return sorted(keys)
+
+
+def flight_ids(base_folder, destination):
+    chunks = list(concatenator.iter_flight_chunks(destination_files(base_folder, destination), destination))
+    df = concatenator.clean_flights(pd.concat(chunks, ignore_index=True))
+    return set(concatenator.flight_id_column(df))
+
+
+def test_migration_keeps_every_observation(base_folder):
+    before = observations(base_folder, 'AMS')
+    ids_before = flight_ids(base_folder, 'AMS')
+
+    dry_run = migrate_legacy_folders(base_folder, dry_run=True)
+    assert not (base_folder / RAW_FOLDER).exists()
+    report = migrate_legacy_folders(base_folder)
+
+    assert report['counts'] == dict(dry_run['counts'], removed_folders=2)
+    assert report['folders'] == {'AMS': 'AMS', 'AMS_19_11': 'AMS'}
+    assert legacy_folders(base_folder) == {}
+    assert find_destinations(base_folder) == ['AMS']
+    assert observations(base_folder, 'AMS') == before
+    assert flight_ids(base_folder, 'AMS') == ids_before
+    assert migrate_legacy_folders(base_folder)['counts'] == {}
+
+
+def test_other_folders_are_migrated_or_reported(base_folder):
+    snapshot_folder = base_folder / 'original_21_11'
+    snapshot_folder.mkdir()
+    (snapshot_folder / 'vols_ams_combines.csv').write_text('"flight_id"\n"1"\n', encoding='utf-8')
+    export_folder = base_folder / 'export'
+    export_folder.mkdir()
+    shutil.move(base_folder / 'AMS' / 'flights_2024-11-23.json', export_folder / 'vols.json')
+
+    report = migrate_legacy_folders(base_folder)
+
+    assert 'original_21_11/' in report['skipped']
+    assert (snapshot_folder / 'vols_ams_combines.csv').exists()
+    assert report['moved']['export/vols.json'] == [
+        'raw/destination=AMS/search_date=2024-11-23/flights_2024-11-23.json']
+    assert not export_folder.exists()
+    assert 'export' not in report['folders']
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+import yaml
+
+from src.data import concatenator
+from src.data.warehouse import (DBT_PROJECT_DIR, BigQueryWarehouse, DuckDBWarehouse, Warehouse, column_tests,
+                                model_order, run_dbt_models)
+
+
+def test_incomplete_warehouse_cannot_be_instantiated():
+    class RelationOnly(Warehouse):
+        def relation(self, name):
+            return name
+
+    with pytest.raises(TypeError):
+        RelationOnly()
+    assert BigQueryWarehouse(None, 'projet', 'dataset').relation('stg_flights') == '`projet.dataset.stg_flights`'
+
+
+def test_model_order_follows_refs():
+    assert model_order({'marts': ['stg_flights'], 'stg_flights': []}) == ['stg_flights', 'marts']
+    with pytest.raises(ValueError):
+        model_order({'a': ['b'], 'b': ['a']})
+
+
+def test_schema_tests_are_supported():
+    schema = yaml.safe_load((DBT_PROJECT_DIR / 'models' / 'staging' / 'schema.yml').read_text(encoding='utf-8'))
+    tests = column_tests(schema, BigQueryWarehouse(None, 'projet', 'dataset'))
+    assert ('unique', 'stg_flights', 'flight_id') in tests
+    assert ('positive_values', 'combined_flights', 'price') in tests
+
+
+def test_stg_flights_keeps_one_row_per_flight(base_folder):
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+    result = concatenator.run({'base_folder': base_folder, 'workers': 1, 'destinations': ['AMS'], 'parquet': False})
+    combined = pd.read_csv(result['output_files']['AMS'])
+    # Seconde source qui recouvre la première avec des observations plus anciennes des mêmes vols
+    combined.head(5).assign(search_date='2024-11-01', search_date_with_hour='2024-11-01 08:00:00', price=1.0).to_csv(
+        base_folder / 'combined' / 'vols_ams_19_11_combines.csv', index=False)
+
+    warehouse = DuckDBWarehouse(':memory:')
+    try:
+        assert warehouse.load(base_folder)['rows'] == len(combined) + 5
+        dbt_result = run_dbt_models(warehouse)
+        assert [test for test in dbt_result['tests'] if test['relation'] == 'stg_flights' and test['failures']] == []
+        assert warehouse.scalar('SELECT COUNT(*) FROM "stg_flights"') == len(combined)
+        assert warehouse.scalar('SELECT COUNT(*) FROM "stg_flights" WHERE price = 1') == 0
+    finally:
+        warehouse.close()